@@ -0,0 +1,109 @@
+"""
+Server-side aggregation for bar, pie and histogram charts, cached per chart spec
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 20
+PIE_TOP_N = 10
+OTHER_LABEL = "Other"
+MAX_CACHED = 128
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def cached(key, build):
+    """Aggregate from the cache, or build and remember it; key None disables caching"""
+    if key is not None:
+        with _lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+
+    start = time.perf_counter()
+    result = build()
+    logger.info(f"Aggregated {key[1:] if key else 'chart data'} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    if key is not None:
+        with _lock:
+            _cache[key] = result
+            while len(_cache) > MAX_CACHED:
+                _cache.popitem(last=False)
+    return result
+
+def _keep_top(totals, n):
+    """Labels of the n largest groups, or None when every group fits"""
+    if len(totals) <= n:
+        return None
+    return set(totals.nlargest(n).index)
+
+def _fold_other(labels, keep):
+    """Labels outside keep replaced by the Other bucket"""
+    labels = labels.astype(str)
+    return labels.where(labels.isin({str(k) for k in keep}), OTHER_LABEL)
+
+def top_n_counts(series, n=TOP_N, color=None):
+    """Row counts per category: the n most frequent plus an Other bucket
+
+    Returns a DataFrame with the category column, 'count' and, when color is
+    given, the colour column.
+    """
+    name = series.name
+    if color is None:
+        counts = series.value_counts()
+        counts = counts[counts > 0]
+        keep = _keep_top(counts, n)
+        if keep is not None:
+            other = counts[~counts.index.isin(keep)].sum()
+            counts = pd.concat([counts[counts.index.isin(keep)], pd.Series({OTHER_LABEL: other})])
+        return pd.DataFrame({name: counts.index.astype(str), 'count': counts.to_numpy()})
+
+    frame = pd.DataFrame({name: series, color.name: color})
+    keep = _keep_top(frame[name].value_counts(), n)
+    if keep is not None:
+        frame[name] = _fold_other(frame[name], keep)
+    counts = frame.groupby([name, color.name], observed=True, sort=False).size().reset_index(name='count')
+    return counts.sort_values('count', ascending=False, kind='stable')
+
+def top_n_sums(df, x_col, y_col, color_col=None, n=TOP_N):
+    """Sum of y per x (and colour): the n largest x totals plus an Other bucket"""
+    totals = df.groupby(x_col, observed=True, sort=False)[y_col].sum()
+    keep = _keep_top(totals, n)
+    columns = [x_col, y_col] + ([color_col] if color_col else [])
+    frame = df[columns].copy()
+    if keep is not None:
+        frame[x_col] = _fold_other(frame[x_col], keep)
+    keys = [x_col, color_col] if color_col else [x_col]
+    sums = frame.groupby(keys, observed=True, sort=False)[y_col].sum().reset_index()
+    if keep is not None:
+        sums = sums.sort_values(y_col, ascending=False, kind='stable')
+        # Other always goes last, whatever its size
+        sums = pd.concat([sums[sums[x_col] != OTHER_LABEL], sums[sums[x_col] == OTHER_LABEL]])
+    return sums
+
+def histogram_bins(series, n_bins, color=None):
+    """NumPy histogram with edges shared across colour groups
+
+    Returns a DataFrame of bin centre, width, count and (optionally) colour.
+    """
+    values = series.to_numpy(dtype=np.float64)
+    edges = np.histogram_bin_edges(values, bins=n_bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    widths = np.diff(edges)
+
+    if color is None:
+        counts, _ = np.histogram(values, bins=edges)
+        return pd.DataFrame({'bin': centers, 'width': widths, 'count': counts})
+
+    frames = []
+    for label, group in pd.Series(values).groupby(color.to_numpy(), sort=True):
+        counts, _ = np.histogram(group.to_numpy(), bins=edges)
+        frames.append(pd.DataFrame({'bin': centers, 'width': widths, 'count': counts, color.name: label}))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,257 @@
+"""
+Static image export of Plotly figures through one long-lived Kaleido renderer
+
+Starting Chrome for every figure dominates export time, so the browser is opened
+once per process and kept warm; batches are rendered concurrently across its tabs
+and every result stays in memory.
+
+Run as a script to compare one-shot and warm exports:
+
+    python chart_export.py --figures 12 --workers 4
+"""
+import io
+import time
+import asyncio
+import logging
+import zipfile
+import argparse
+import threading
+
+logger = logging.getLogger(__name__)
+
+try:
+    import kaleido
+    # Kaleido 1.x drives an installed Chrome; 0.2.x ships its own renderer behind fig.to_image
+    kaleido_pool_available = hasattr(kaleido, 'Kaleido')
+except ImportError:
+    logger.warning("kaleido not available. Chart images will be exported as HTML.")
+    kaleido = None
+    kaleido_pool_available = False
+
+DEFAULT_WORKERS = 4
+RENDER_TIMEOUT = 90
+IMAGE_FORMATS = ('png', 'jpg', 'jpeg', 'svg', 'pdf', 'webp')
+MIME_TYPES = {
+    'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'webp': 'image/webp',
+    'svg': 'image/svg+xml', 'pdf': 'application/pdf', 'html': 'text/html',
+}
+
+def image_options(export_format):
+    """Kaleido layout options for a format: large rasters, native-size vectors"""
+    if export_format in ('png', 'jpg', 'jpeg'):
+        width, height, scale = 1400, 900, 2
+    elif export_format == 'svg':
+        width, height, scale = 1200, 800, 1
+    else:
+        width, height, scale = 1200, 800, 2
+    return {'format': export_format, 'width': width, 'height': height, 'scale': scale}
+
+def figure_html(fig):
+    """Standalone HTML of a figure; Plotly.js is loaded from the CDN"""
+    return fig.to_html(include_plotlyjs='cdn').encode('utf-8')
+
+class ChartRenderer:
+    """Kaleido browser opened once and shared by every export in the process
+
+    The browser lives on a private event loop thread; callers on any thread submit
+    figures and block on the result. When Chrome or Kaleido is missing the first
+    failure is remembered and exports fall back to HTML without retrying.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self.error = None
+        self.start_ms = None
+        self._kaleido = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return kaleido is not None and self.error is None
+
+    def _start(self):
+        """Open the browser on first use; later calls reuse it"""
+        if self._kaleido is not None or not kaleido_pool_available:
+            return
+        start = time.perf_counter()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="kaleido-renderer", daemon=True)
+        self._thread.start()
+        renderer = kaleido.Kaleido(n=self.workers, timeout=RENDER_TIMEOUT)
+        try:
+            asyncio.run_coroutine_threadsafe(renderer.__aenter__(), self._loop).result(RENDER_TIMEOUT)
+        except BaseException:
+            self._stop_loop()
+            raise
+        self._kaleido = renderer
+        self.start_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Started Kaleido renderer with {self.workers} tabs in {self.start_ms:.0f} ms")
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = self._thread = None
+
+    async def _render_all(self, jobs):
+        return await asyncio.gather(
+            *(self._kaleido.calc_fig(fig, image_options(export_format)) for fig, export_format in jobs),
+            return_exceptions=True
+        )
+
+    def render_many(self, jobs):
+        """Bytes for each (figure, format) job, rendered concurrently
+
+        Failed jobs come back as exceptions in their slot so one bad figure does
+        not lose the rest of the batch.
+        """
+        if not jobs:
+            return []
+        if kaleido is None:
+            raise RuntimeError("kaleido is not installed (pip install kaleido)")
+        if self.error is not None:
+            raise RuntimeError(self.error)
+
+        with self._lock:
+            try:
+                self._start()
+            except Exception as e:
+                self.error = f"Kaleido renderer unavailable: {e}"
+                logger.warning(self.error)
+                raise RuntimeError(self.error) from e
+
+            if self._kaleido is None:
+                # Kaleido 0.2.x keeps its own subprocess warm but is not safe to share across threads
+                results = []
+                for fig, export_format in jobs:
+                    options = image_options(export_format)
+                    try:
+                        results.append(fig.to_image(**options))
+                    except Exception as e:
+                        results.append(e)
+                return results
+
+        future = asyncio.run_coroutine_threadsafe(self._render_all(jobs), self._loop)
+        return future.result(RENDER_TIMEOUT * max(1, len(jobs) // self.workers + 1))
+
+    def render(self, fig, export_format):
+        """Bytes of one figure in an image format"""
+        result = self.render_many([(fig, export_format)])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        """Shut the browser down; the next export starts a new one"""
+        with self._lock:
+            if self._kaleido is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    self._kaleido.__aexit__(None, None, None), self._loop
+                ).result(RENDER_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Error closing Kaleido renderer: {e}")
+            self._kaleido = None
+            self._stop_loop()
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+def get_renderer():
+    """The process-wide renderer, created on first use"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = ChartRenderer()
+        return _renderer
+
+def export_figure(fig, export_format="png"):
+    """(bytes, format) for one figure; HTML when the image renderer is unavailable"""
+    export_format = export_format.lower()
+    if export_format not in IMAGE_FORMATS:
+        return figure_html(fig), 'html'
+    try:
+        return get_renderer().render(fig, export_format), export_format
+    except Exception as e:
+        logger.warning(f"Image export failed, falling back to HTML: {e}")
+        return figure_html(fig), 'html'
+
+def export_figures(figures, export_format="png"):
+    """[(bytes, format)] for many figures rendered in one concurrent batch"""
+    export_format = export_format.lower()
+    if export_format not in IMAGE_FORMATS:
+        return [(figure_html(fig), 'html') for fig in figures]
+    try:
+        results = get_renderer().render_many([(fig, export_format) for fig in figures])
+    except Exception as e:
+        logger.warning(f"Batch image export failed, falling back to HTML: {e}")
+        results = [e] * len(figures)
+    return [
+        (figure_html(fig), 'html') if isinstance(result, Exception) else (result, export_format)
+        for fig, result in zip(figures, results)
+    ]
+
+def zip_figures(named_figures, export_format="png"):
+    """ZIP archive bytes of (name, figure) pairs, plus how many fell back to HTML"""
+    names = [name for name, _ in named_figures]
+    exported = export_figures([fig for _, fig in named_figures], export_format)
+    buffer = io.BytesIO()
+    fallbacks = 0
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        used = set()
+        for name, (data, actual_format) in zip(names, exported):
+            fallbacks += actual_format != export_format.lower()
+            file_name, counter = f"{name}.{actual_format}", 1
+            while file_name in used:
+                counter += 1
+                file_name = f"{name}_{counter}.{actual_format}"
+            used.add(file_name)
+            archive.writestr(file_name, data)
+    return buffer.getvalue(), fallbacks
+
+def _sample_figure(seed):
+    import numpy as np
+    import plotly.express as px
+    rng = np.random.default_rng(seed)
+    return px.scatter(x=rng.normal(size=2000), y=rng.normal(size=2000), title=f"Figure {seed}")
+
+def _benchmark(n_figures, workers, export_format):
+    figures = [_sample_figure(i) for i in range(n_figures)]
+
+    start = time.perf_counter()
+    try:
+        figures[0].to_image(**image_options(export_format))
+    except Exception as e:
+        print(f"Kaleido cannot render here: {e}")
+        return
+    print(f"one-shot fig.to_image (cold):  {(time.perf_counter() - start) * 1000:8.0f} ms")
+
+    renderer = ChartRenderer(workers=workers)
+    start = time.perf_counter()
+    renderer.render(figures[0], export_format)
+    print(f"warm renderer first figure:    {(time.perf_counter() - start) * 1000:8.0f} ms "
+          f"(browser start {renderer.start_ms or 0:.0f} ms)")
+
+    start = time.perf_counter()
+    for fig in figures:
+        renderer.render(fig, export_format)
+    sequential = time.perf_counter() - start
+    print(f"warm sequential:               {sequential * 1000 / n_figures:8.0f} ms/figure")
+
+    start = time.perf_counter()
+    renderer.render_many([(fig, export_format) for fig in figures])
+    batched = time.perf_counter() - start
+    print(f"warm batch ({workers} tabs):           {batched * 1000 / n_figures:8.0f} ms/figure "
+          f"({sequential / batched:.1f}x faster than sequential)")
+    renderer.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Plotly static image export")
+    parser.add_argument("--figures", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--format", default="png", choices=IMAGE_FORMATS)
+    args = parser.parse_args()
+    _benchmark(args.figures, args.workers, args.format)
@@ -0,0 +1,138 @@
+"""
+Server-side reduction of large series before they are sent to Plotly
+"""
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Line and area charts above this many points are downsampled to it
+LINE_MAX_POINTS = 4000
+# Series this many times larger than the target are pre-reduced with min-max buckets before LTTB
+MINMAX_PRESELECT_RATIO = 50
+SCATTER_MAX_POINTS = 10000
+DENSITY_BINS = 120
+# Above this many source points traces are drawn with WebGL (scattergl)
+WEBGL_THRESHOLD = 5000
+RANDOM_SEED = 0
+
+def _as_float(values):
+    """Numeric view of an axis for geometry; datetimes as ns, anything else by position"""
+    series = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('int64').to_numpy(dtype=np.float64)
+    if pd.api.types.is_numeric_dtype(series) and series.is_monotonic_increasing:
+        return series.to_numpy(dtype=np.float64)
+    return np.arange(len(series), dtype=np.float64)
+
+def minmax_indices(y, n_buckets):
+    """Indices of each bucket's minimum and maximum, plus the first and last point"""
+    n = len(y)
+    size = n // n_buckets
+    if size < 2:
+        return np.arange(n)
+    body = y[:size * n_buckets].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    picks = np.concatenate(([0], offsets + body.argmin(axis=1), offsets + body.argmax(axis=1), [n - 1]))
+    return np.unique(picks)
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of the n_out points that best keep the shape"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    counts = np.maximum(ends - starts, 1)
+    # Bucket averages once up front; each step only needs the next bucket's mean
+    mean_x = np.add.reduceat(x[:n - 1], starts) / counts
+    mean_y = np.add.reduceat(y[:n - 1], starts) / counts
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = starts[i], max(ends[i], starts[i] + 1)
+        if i + 1 < len(starts):
+            next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        else:
+            next_x, next_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+def downsample_indices(x, y, n_out):
+    """LTTB, with a min-max pre-selection for very long series"""
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) > n_out * MINMAX_PRESELECT_RATIO:
+        keep = minmax_indices(y, n_out * 2)
+        return keep[lttb_indices(x[keep], y[keep], n_out)]
+    return lttb_indices(x, y, n_out)
+
+def _group_budgets(df, color_col, total):
+    """Split a point budget across colour groups in proportion to their size"""
+    if not color_col:
+        return [(df, total)]
+    groups = [group for _, group in df.groupby(color_col, sort=False, observed=True)]
+    rows = sum(len(group) for group in groups)
+    return [(group, max(3, int(total * len(group) / rows))) for group in groups]
+
+def reduce_line(df, x_col, y_col, color_col=None, max_points=LINE_MAX_POINTS):
+    """Downsampled rows for a line/area chart and a description of what was done"""
+    info = {'original_points': len(df), 'rendered_points': len(df), 'method': None,
+            'webgl': len(df) > WEBGL_THRESHOLD}
+    if len(df) <= max_points or not pd.api.types.is_numeric_dtype(df[y_col]):
+        return df, info
+
+    start = time.perf_counter()
+    parts = []
+    for group, budget in _group_budgets(df, color_col, max_points):
+        parts.append(group.iloc[downsample_indices(group[x_col].to_numpy(), group[y_col].to_numpy(), budget)])
+    reduced = pd.concat(parts) if len(parts) > 1 else parts[0]
+    info.update(rendered_points=len(reduced), method='LTTB',
+                elapsed_ms=(time.perf_counter() - start) * 1000)
+    if len(df) > max_points * MINMAX_PRESELECT_RATIO:
+        info['method'] = 'min-max + LTTB'
+    logger.info(f"Downsampled line series {len(df):,} -> {len(reduced):,} points in {info['elapsed_ms']:.1f} ms")
+    return reduced, info
+
+def reduce_scatter(df, color_col=None, max_points=SCATTER_MAX_POINTS):
+    """Uniform random sample of a large scatter, stratified by colour group"""
+    info = {'original_points': len(df), 'rendered_points': len(df), 'method': None,
+            'webgl': len(df) > WEBGL_THRESHOLD}
+    if len(df) <= max_points:
+        return df, info
+
+    start = time.perf_counter()
+    parts = [group.sample(n=min(len(group), budget), random_state=RANDOM_SEED)
+             for group, budget in _group_budgets(df, color_col, max_points)]
+    reduced = (pd.concat(parts) if len(parts) > 1 else parts[0]).sort_index()
+    info.update(rendered_points=len(reduced), method='random sample',
+                elapsed_ms=(time.perf_counter() - start) * 1000)
+    return reduced, info
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """2-D histogram computed here so only the bin counts reach the browser"""
+    counts, x_edges, y_edges = np.histogram2d(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), bins=bins)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    # Empty bins stay transparent
+    return x_centers, y_centers, np.where(counts.T > 0, counts.T, np.nan)
+
+def caption(info):
+    """Chart caption with original and rendered point counts"""
+    if not info or not info.get('original_points'):
+        return None
+    text = f"📉 Rendered {info['rendered_points']:,} of {info['original_points']:,} points"
+    details = [info['method']] if info.get('method') else []
+    if info.get('webgl'):
+        details.append("WebGL")
+    if info.get('elapsed_ms') is not None:
+        details.append(f"reduced in {info['elapsed_ms']:.0f} ms")
+    return text + (f" ({', '.join(details)})" if details else "")
@@ -0,0 +1,114 @@
+"""
+Token-aware prompt context assembly with per-model budgets
+"""
+import pandas as pd
+
+from numeric_parser import numeric_share, parse_numeric
+
+# Maximum input tokens accepted by each inference model
+MODEL_TOKEN_LIMITS = {
+    "google/flan-t5-large": 512,
+    "google/flan-t5-base": 512,
+}
+DEFAULT_TOKEN_LIMIT = 512
+MIN_TRUNCATED_TOKENS = 24
+
+def estimate_tokens(text):
+    """Rough token count for model input (about 4 characters per token)"""
+    return max(1, len(text) // 4) if text else 0
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to roughly max_tokens, preferring a line or paragraph boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    trimmed = text[:max_tokens * 4]
+    boundary = max(trimmed.rfind("\n\n"), trimmed.rfind("\n"))
+    return trimmed[:boundary] if boundary > len(trimmed) // 2 else trimmed
+
+def compress_table(table, title="Table", max_rows=6):
+    """Summarise a raw table as header, column statistics and a deduplicated row sample"""
+    if not table:
+        return f"{title}: empty"
+
+    headers = [str(h) for h in table[0]]
+    data_rows = table[1:]
+
+    # Repeated rows add tokens without adding information
+    unique_rows = list(dict.fromkeys(tuple(str(cell) for cell in row) for row in data_rows))
+    duplicates = len(data_rows) - len(unique_rows)
+
+    lines = [f"{title} ({len(data_rows)} rows, {len(headers)} columns)"]
+    lines.append(f"Columns: {', '.join(headers)}")
+
+    if unique_rows:
+        width = len(headers)
+        df = pd.DataFrame([list(row[:width]) + [''] * (width - len(row)) for row in data_rows], columns=range(width))
+        stats = []
+        for col_idx, header in enumerate(headers):
+            if numeric_share(df[col_idx]) >= 0.8:
+                numeric = parse_numeric(df[col_idx])
+                stats.append(f"{header}: min {numeric.min():g}, max {numeric.max():g}, mean {numeric.mean():.4g}, sum {numeric.sum():.6g}")
+            else:
+                top = df[col_idx].value_counts()
+                stats.append(f"{header}: {len(top)} distinct, most common '{top.index[0]}'")
+        lines.append("Stats: " + "; ".join(stats))
+
+        if len(unique_rows) <= max_rows:
+            sample = unique_rows
+        else:
+            # Keep the first rows plus an even spread through the rest of the table
+            head = max_rows // 2
+            step = (len(unique_rows) - head) / (max_rows - head)
+            sample = unique_rows[:head] + [unique_rows[head + int(i * step)] for i in range(max_rows - head)]
+        lines.append("Sample rows:")
+        lines.extend(" | ".join(row) for row in sample)
+
+    if duplicates:
+        lines.append(f"({duplicates} duplicate rows omitted)")
+    return "\n".join(lines)
+
+class ContextBuilder:
+    """Collects prioritised context sections and fills a model's token budget"""
+
+    def __init__(self, model=None):
+        self.model = model
+        self.sections = []
+        self.usage = {}
+        self.text = ""
+
+    def add(self, text, priority=1, label="context", truncatable=True):
+        """Queue a section; lower priority numbers are included first"""
+        if text:
+            self.sections.append({
+                'text': text, 'priority': priority, 'label': label,
+                'truncatable': truncatable, 'order': len(self.sections)
+            })
+        return self
+
+    def token_limit(self):
+        """Input token limit of the target model"""
+        return MODEL_TOKEN_LIMITS.get(self.model, DEFAULT_TOKEN_LIMIT)
+
+    def build(self, budget):
+        """Return the joined context that fits the budget, recording per-section usage"""
+        remaining = budget
+        chosen = []
+        report = []
+
+        for section in sorted(self.sections, key=lambda s: (s['priority'], s['order'])):
+            tokens = estimate_tokens(section['text'])
+            if tokens <= remaining:
+                chosen.append((section['order'], section['text']))
+                remaining -= tokens
+                report.append((section['label'], tokens, 'full'))
+            elif section['truncatable'] and remaining >= MIN_TRUNCATED_TOKENS:
+                text = truncate_to_tokens(section['text'], remaining)
+                chosen.append((section['order'], text))
+                remaining -= estimate_tokens(text)
+                report.append((section['label'], estimate_tokens(text), f"truncated from {tokens}"))
+            else:
+                report.append((section['label'], 0, f"dropped ({tokens})"))
+
+        self.usage = {'budget': budget, 'used': budget - remaining, 'sections': report}
+        self.text = "\n\n".join(text for _, text in sorted(chosen))
+        return self.text
@@ -0,0 +1,106 @@
+"""
+Entities found at ingest, stored as offset arrays with lookups by type and value
+
+Each entity is one row of parallel (type, start, end, page) arrays; the matched
+strings are sliced from full_text only when a page shows them.
+"""
+import logging
+from collections import Counter
+
+import numpy as np
+
+from text_analysis import ENTITY_KINDS
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_CHARS = 80
+ENTITY_LABELS = {'numbers': 'Number', 'dates': 'Date', 'emails': 'Email', 'urls': 'URL'}
+
+def page_numbers(starts, page_offsets):
+    """Page holding each offset, from (page, start, end) spans; 0 when the text has no pages"""
+    if not page_offsets:
+        return np.zeros(len(starts), dtype=np.int32)
+    page_starts = np.array([start for _, start, _ in page_offsets], dtype=np.int64)
+    pages = np.array([page for page, _, _ in page_offsets], dtype=np.int32)
+    slot = np.searchsorted(page_starts, starts, side='right') - 1
+    return np.where(slot >= 0, pages[np.clip(slot, 0, None)], 0).astype(np.int32)
+
+def with_pages(entities, page_offsets):
+    """Entity arrays from text analysis plus the page of each entity"""
+    return {**entities, 'page': page_numbers(entities['start'], page_offsets)}
+
+class EntityIndex:
+    """Lookups over a document's entity arrays
+
+    Positions per type are kept in document order; the value index is built on
+    the first lookup by value and matches case-insensitively.
+    """
+
+    def __init__(self, text, entities):
+        self.text = text
+        self.type = entities['type']
+        self.start = entities['start']
+        self.end = entities['end']
+        self.page = entities['page']
+        self._by_type = {}
+        self._by_value = None
+
+    def __len__(self):
+        return len(self.type)
+
+    def _rows(self, kind):
+        if kind not in self._by_type:
+            self._by_type[kind] = np.flatnonzero(self.type == ENTITY_KINDS.index(kind))
+        return self._by_type[kind]
+
+    def value(self, row):
+        return self.text[self.start[row]:self.end[row]]
+
+    def count(self, kind):
+        return len(self._rows(kind))
+
+    def counts(self):
+        """{type: entities found}"""
+        return {kind: self.count(kind) for kind in ENTITY_KINDS}
+
+    def values(self, kind, limit=None):
+        """Matched strings of one type in document order"""
+        return [self.value(row) for row in self._rows(kind)[:limit]]
+
+    def distinct(self, kind):
+        """Counter of the values of one type"""
+        return Counter(self.value(row).lower() for row in self._rows(kind))
+
+    def occurrence(self, row):
+        return {
+            'kind': ENTITY_KINDS[self.type[row]],
+            'value': self.value(row),
+            'start': int(self.start[row]),
+            'end': int(self.end[row]),
+            'page': int(self.page[row]),
+        }
+
+    def occurrences(self, kind, limit=None):
+        """Entities of one type with their offsets and pages"""
+        return [self.occurrence(row) for row in self._rows(kind)[:limit]]
+
+    def lookup(self, value, kind=None):
+        """Every occurrence of a value, optionally of one type, in document order"""
+        if self._by_value is None:
+            by_value = {}
+            for row in range(len(self)):
+                by_value.setdefault(self.value(row).lower(), []).append(row)
+            self._by_value = by_value
+            logger.info(f"Indexed {len(self):,} entities by value ({len(by_value):,} distinct)")
+        rows = sorted(self._by_value.get(value.strip().lower(), []), key=lambda row: self.start[row])
+        return [self.occurrence(row) for row in rows if kind is None or ENTITY_KINDS[self.type[row]] == kind]
+
+    def pages(self, value, kind=None):
+        """Sorted pages mentioning a value"""
+        return sorted({occurrence['page'] for occurrence in self.lookup(value, kind)} - {0})
+
+    def context(self, occurrence, chars=CONTEXT_CHARS):
+        """The text around an occurrence on one line, the entity in bold"""
+        before = self.text[max(occurrence['start'] - chars, 0):occurrence['start']]
+        after = self.text[occurrence['end']:occurrence['end'] + chars]
+        return ' '.join(f"…{before}**{occurrence['value']}**{after}…".split())
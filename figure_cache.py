@@ -0,0 +1,97 @@
+"""
+Memoized Plotly figures keyed by chart specification, stored as figure JSON
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import plotly.io as pio
+
+logger = logging.getLogger(__name__)
+
+MAX_FIGURES = 32
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'build_ms': 0.0, 'hit_ms': 0.0}
+
+def chart_key(fingerprint, chart_type, x_col, y_col, color_col, theme, **options):
+    """Cache key for one chart: source table fingerprint plus everything that shapes the figure"""
+    return (fingerprint, chart_type, x_col, y_col, color_col, theme) + tuple(sorted(options.items()))
+
+def get_figure(key, build):
+    """(figure, info, timing) from the cache, building and storing it on a miss
+
+    build returns (figure, info); a None figure is passed through and not cached.
+    timing holds 'hit' and 'ms' for this call plus the average build and hit times.
+    """
+    start = time.perf_counter()
+    with _lock:
+        entry = _figures.get(key)
+        if entry is not None:
+            _figures.move_to_end(key)
+
+    if entry is not None:
+        fig = pio.from_json(entry['json'])
+        elapsed = (time.perf_counter() - start) * 1000
+        with _lock:
+            stats['hits'] += 1
+            stats['hit_ms'] += elapsed
+        return fig, entry['info'], _timing(True, elapsed, entry['build_ms'])
+
+    fig, info = build()
+    elapsed = (time.perf_counter() - start) * 1000
+    if fig is None:
+        return fig, info, _timing(False, elapsed, elapsed)
+
+    entry = {'json': fig.to_json(), 'info': info, 'build_ms': elapsed}
+    with _lock:
+        stats['misses'] += 1
+        stats['build_ms'] += elapsed
+        _figures[key] = entry
+        while len(_figures) > MAX_FIGURES:
+            _figures.popitem(last=False)
+            stats['evictions'] += 1
+    logger.info(f"Built figure {key[1:5]} in {elapsed:.1f} ms ({len(entry['json']) / 1024:.0f} KB JSON)")
+    return fig, info, _timing(False, elapsed, elapsed)
+
+def load_figure(key):
+    """Cached figure for a key, or None once it has been evicted"""
+    with _lock:
+        entry = _figures.get(key)
+    return pio.from_json(entry['json']) if entry is not None else None
+
+def get_export(key, export_format, render):
+    """Export of a cached figure, rendered once per format"""
+    with _lock:
+        entry = _figures.get(key)
+        if entry is not None and export_format in entry.setdefault('exports', {}):
+            return entry['exports'][export_format]
+    data = render()
+    if entry is not None and data is not None:
+        with _lock:
+            entry['exports'][export_format] = data
+    return data
+
+def _timing(hit, ms, build_ms):
+    with _lock:
+        return {
+            'hit': hit,
+            'ms': ms,
+            'build_ms': build_ms,
+            'avg_build_ms': stats['build_ms'] / stats['misses'] if stats['misses'] else None,
+            'avg_hit_ms': stats['hit_ms'] / stats['hits'] if stats['hits'] else None,
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+        }
+
+def timing_caption(timing):
+    """One-line build versus cache-hit report for a chart"""
+    if timing['hit']:
+        text = f"⚡ Figure served from cache in {timing['ms']:.0f} ms (built in {timing['build_ms']:.0f} ms)"
+    else:
+        text = f"🛠️ Figure built in {timing['ms']:.0f} ms"
+        if timing['avg_hit_ms'] is not None:
+            text += f" · cache hits average {timing['avg_hit_ms']:.0f} ms"
+    return text + f" · {timing['hits']} hits / {timing['misses']} builds"
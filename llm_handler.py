@@ -1,8 +1,11 @@
 import streamlit as st
 import requests
 import os
+import io
 import logging
 import time
+import json
+from context_builder import ContextBuilder, estimate_tokens
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -12,7 +15,8 @@ class HuggingFaceClient:
     def __init__(self):
         self.token = self._get_token()
         self.headers = {"Authorization": f"Bearer {self.token}"} if self.token else {}
-        self.base_url = "https://api-inference.huggingface.co/models/"
+        # Overridable so a local stand-in server (mock_inference_server.py) can be used
+        self.base_url = os.getenv("HF_API_BASE_URL", "https://api-inference.huggingface.co/models/")
         
     def _get_token(self):
         """Securely get HF token from secrets or environment"""
@@ -58,19 +62,81 @@ class HuggingFaceClient:
                 time.sleep(1)
         
         return None
+    
+    def _stream_api(self, model, payload, timeout=(5, 60)):
+        """Yield generated tokens from a server-sent events response"""
+        if not self.token:
+            return
+        
+        with requests.post(self.base_url + model, headers=self.headers, json={**payload, "stream": True},
+                           stream=True, timeout=timeout) as response:
+            if response.status_code != 200:
+                logger.error(f"Streaming API error: {response.status_code}")
+                return
+            
+            # Some endpoints ignore the stream flag and answer with plain JSON
+            if response.headers.get("Content-Type", "").startswith("application/json"):
+                result = response.json()
+                if isinstance(result, list) and result and "generated_text" in result[0]:
+                    yield result[0]["generated_text"]
+                return
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                token = event.get("token") or {}
+                if token.get("text") and not token.get("special"):
+                    yield token["text"]
+                if event.get("generated_text") is not None:
+                    break
 
 # Initialize client
 hf_client = HuggingFaceClient()
 
-def get_text_response(prompt, context):
+TEXT_MODEL = "google/flan-t5-large"
+
+# Token usage of the most recent prompt, for display next to answers
+last_token_usage = {}
+
+def build_prompt(prompt, context, model=TEXT_MODEL, max_context_tokens=None):
+    """Assemble a prompt that fits the model's input limit and report its token usage
+    
+    `context` is either a plain string or a ContextBuilder holding prioritised sections.
+    """
+    global last_token_usage
+    
+    builder = context if isinstance(context, ContextBuilder) else ContextBuilder(model).add(context, label="context")
+    frame = f"Context: \n\nQuestion: {prompt}\nAnswer:"
+    budget = max(0, builder.token_limit() - estimate_tokens(frame))
+    if max_context_tokens is not None:
+        budget = min(budget, max_context_tokens)
+    
+    full_prompt = f"Context: {builder.build(budget)}\n\nQuestion: {prompt}\nAnswer:"
+    last_token_usage = {
+        'model': model,
+        'limit': builder.token_limit(),
+        'prompt_tokens': estimate_tokens(full_prompt),
+        'question_tokens': estimate_tokens(frame),
+        'context_tokens': builder.usage['used'],
+        'sections': builder.usage['sections']
+    }
+    logger.info(f"Prompt for {model}: {last_token_usage['prompt_tokens']}/{last_token_usage['limit']} tokens "
+                f"(context {builder.usage['used']}/{budget}, sections {builder.usage['sections']})")
+    return full_prompt
+
+def get_text_response(prompt, context, max_context_tokens=None):
     """Generate AI response using HuggingFace with latest models"""
     if not hf_client.token:
         return "AI service not configured. Please add HF_TOKEN to secrets.toml"
     
-    model = "google/flan-t5-large"
+    model = TEXT_MODEL
     
     # Simple prompt for better results
-    simple_prompt = f"Context: {context[:400]}\n\nQuestion: {prompt}\nAnswer:"
+    simple_prompt = build_prompt(prompt, context, model, max_context_tokens)
     
     try:
         payload = {
@@ -93,8 +159,67 @@ def get_text_response(prompt, context):
     except Exception as e:
         logger.warning(f"Model {model} failed: {e}")
     
+    if isinstance(context, ContextBuilder):
+        context = context.text
     return _get_smart_response(prompt, context)
 
+# Timing of the most recent streamed answer (time to first token is the headline metric)
+last_stream_metrics = {}
+
+def stream_text_response(prompt, context, should_cancel=None, max_context_tokens=None):
+    """Streaming variant of get_text_response that yields answer text as it is generated
+    
+    The prompt is built (and its token usage recorded) immediately; tokens are pulled from the
+    inference endpoint lazily. `should_cancel` is polled between tokens so a newer question can
+    abandon an answer that is still streaming.
+    """
+    if not hf_client.token:
+        return iter(["AI service not configured. Please add HF_TOKEN to secrets.toml"])
+    
+    model = TEXT_MODEL
+    simple_prompt = build_prompt(prompt, context, model, max_context_tokens)
+    fallback_context = context.text if isinstance(context, ContextBuilder) else context
+    payload = {
+        "inputs": simple_prompt,
+        "parameters": {
+            "max_new_tokens": 100,
+            "temperature": 0.3,
+            "do_sample": False,
+            "return_full_text": False
+        }
+    }
+    return _stream_tokens(model, payload, prompt, fallback_context, should_cancel)
+
+def _stream_tokens(model, payload, prompt, context, should_cancel):
+    """Drive the token stream, recording time to first token and falling back when nothing arrives"""
+    global last_stream_metrics
+    
+    start = time.perf_counter()
+    metrics = {'model': model, 'ttft': None, 'total': None, 'tokens': 0, 'cancelled': False}
+    last_stream_metrics = metrics
+    stream = hf_client._stream_api(model, payload)
+    
+    try:
+        for token in stream:
+            if should_cancel and should_cancel():
+                metrics['cancelled'] = True
+                logger.info("Streaming answer cancelled by a newer question")
+                break
+            if metrics['ttft'] is None:
+                metrics['ttft'] = time.perf_counter() - start
+                logger.info(f"Time to first token from {model}: {metrics['ttft']*1000:.0f} ms")
+            metrics['tokens'] += 1
+            yield token
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Streaming from {model} failed: {e}")
+    finally:
+        # Closing the generator releases the HTTP connection
+        stream.close()
+        metrics['total'] = time.perf_counter() - start
+    
+    if metrics['tokens'] == 0 and not metrics['cancelled']:
+        yield _get_smart_response(prompt, context)
+
 def _get_smart_response(prompt, context):
     """Smart rule-based responses when AI is unavailable"""
     prompt_lower = prompt.lower()
@@ -155,12 +280,13 @@ def get_image_descriptions(image_paths):
                 descriptions.append({"path": img_path, "description": "Invalid image path"})
                 continue
                 
-            with open(safe_path, "rb") as f:
-                img_data = f.read()
+            img_data, content_type = _prepare_image_for_upload(safe_path)
+            logger.info(f"Captioning {os.path.basename(safe_path)}: sending {len(img_data):,} bytes "
+                        f"(original {os.path.getsize(safe_path):,} bytes)")
             
             response = requests.post(
                 hf_client.base_url + model,
-                headers=hf_client.headers,
+                headers={**hf_client.headers, "Content-Type": content_type},
                 data=img_data,
                 timeout=20
             )
@@ -182,6 +308,25 @@ def get_image_descriptions(image_paths):
     
     return descriptions
 
+def _prepare_image_for_upload(img_path, max_side=384, quality=85):
+    """Downscale an image to the captioning model's input size and re-encode it as JPEG in memory"""
+    try:
+        from PIL import Image
+        
+        with Image.open(img_path) as img:
+            img = img.convert("RGB")
+            # BLIP resizes to 384px internally, so anything larger is wasted bandwidth
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+            
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=quality, optimize=True)
+            return buffer.getvalue(), "image/jpeg"
+            
+    except (IOError, OSError, ValueError) as e:
+        logger.warning(f"Image downscaling failed, sending original: {e}")
+        with open(img_path, "rb") as f:
+            return f.read(), "application/octet-stream"
+
 def _get_basic_image_description(img_path):
     """Generate basic image description from filename and properties"""
     try:
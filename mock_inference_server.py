@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Hugging Face inference endpoint
+
+Serves plain JSON answers and server-sent-event token streams so streaming can be
+exercised without network access or an API token:
+
+    python mock_inference_server.py --port 8808 --delay 0.05
+    HF_API_BASE_URL=http://localhost:8808/models/ HF_TOKEN=hf_local streamlit run app.py
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "This is a streamed answer from the local inference stand-in, one token at a time."
+
+class MockInferenceHandler(BaseHTTPRequestHandler):
+    """Answers POST /models/<model> like the hosted inference API"""
+
+    token_delay = 0.05
+    first_token_delay = 0.3
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            # Image captioning posts raw bytes
+            payload = {}
+
+        if not payload.get("stream"):
+            self._send_json([{"generated_text": ANSWER}])
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        time.sleep(self.first_token_delay)
+        words = ANSWER.split(" ")
+        try:
+            for i, word in enumerate(words):
+                text = word if i == 0 else " " + word
+                event = {"token": {"id": i, "text": text, "special": False}, "generated_text": None}
+                if i == len(words) - 1:
+                    event["generated_text"] = ANSWER
+                self.wfile.write(f"data:{json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(self.token_delay)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the stream
+            pass
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"🧪 {self.address_string()} {format % args}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the HF inference API")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--delay", type=float, default=0.05, help="Seconds between streamed tokens")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="Seconds before the first token")
+    args = parser.parse_args()
+
+    MockInferenceHandler.token_delay = args.delay
+    MockInferenceHandler.first_token_delay = args.first_token_delay
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockInferenceHandler)
+    print(f"🚀 Mock inference server on http://127.0.0.1:{args.port}/models/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+
+if __name__ == "__main__":
+    main()
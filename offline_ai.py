@@ -3,8 +3,13 @@ Offline AI alternative when HuggingFace is not available
 """
 import re
 import os
+import time
 from datetime import datetime
 
+import pandas as pd
+
+from numeric_parser import parse_numeric, parse_number, numeric_share
+
 class OfflineAI:
     """Simple rule-based AI for document analysis"""
     
@@ -128,6 +133,247 @@ class OfflineAI:
         
         return suggested_cols
     
+    # Aggregation keywords, checked in order so "how many" and "number of" win over "total" or "most"
+    aggregation_words = [
+        ('count', ['how many', 'count', 'number of']),
+        ('mean', ['average', 'avg', 'mean']),
+        ('sum', ['total', 'sum', 'overall']),
+        ('max', ['maximum', 'max', 'highest', 'largest', 'biggest', 'most']),
+        ('min', ['minimum', 'min', 'lowest', 'smallest', 'least'])
+    ]
+    comparison_words = {
+        '>=': '>=', '<=': '<=', '>': '>', '<': '<', '=': '==', '==': '==', '!=': '!=',
+        'over': '>', 'above': '>', 'more than': '>', 'greater than': '>',
+        'under': '<', 'below': '<', 'less than': '<',
+        'is': '==', 'equals': '==', 'is not': '!='
+    }
+    
+    def table_to_dataframe(self, table):
+        """Raw list-of-lists table to a DataFrame with the first row as unique headers"""
+        if not table or len(table) < 2:
+            return None
+        headers, used, suffixes = [], set(), {}
+        for i, header in enumerate(table[0]):
+            base = str(header).strip() if header is not None else ''
+            base = base or f"Column {i+1}"
+            # Suffixes are checked against every name so far, generated ones included
+            name, n = base, suffixes.get(base, 0)
+            while name in used:
+                n += 1
+                name = f"{base}_{n}"
+            suffixes[base] = n
+            used.add(name)
+            headers.append(name)
+        width = len(headers)
+        rows = [list(row[:width]) + [''] * (width - len(row)) for row in table[1:]]
+        return pd.DataFrame(rows, columns=headers)
+    
+    def to_numeric(self, series):
+        """Vectorised numeric conversion of formatted cells (currency, separators, %, k/m/bn, accounting negatives)"""
+        return parse_numeric(series)
+    
+    def _resolve_column(self, text, columns, numeric_only=None, df=None):
+        """Best matching column for a phrase, preferring the longest name mentioned"""
+        candidates = self.extract_columns(text, [c for c in columns if c.strip()]) if text.strip() else []
+        if numeric_only is not None and df is not None:
+            candidates = [c for c in candidates if (numeric_share(df[c]) >= 0.8) == numeric_only]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda c: (c.lower() in text.lower(), len(c)))
+    
+    def parse_table_query(self, query, df):
+        """Parse an aggregation question into an intent dict, or None if it is not one"""
+        query_lower = query.lower()
+        columns = list(df.columns)
+        
+        aggregation = None
+        for name, words in self.aggregation_words:
+            if any(re.search(rf'\b{re.escape(word)}\b', query_lower) for word in words):
+                aggregation = name
+                break
+        
+        top_match = re.search(r'\b(top|bottom)\s+(\d+)\b', query_lower)
+        if not aggregation and not top_match:
+            return None
+        
+        # Filters: "where <column> <op> <value>"
+        filters = []
+        where_match = re.search(r'\bwhere\b(.+)$', query_lower)
+        main_part = query_lower[:where_match.start()] if where_match else query_lower
+        if where_match:
+            ops = sorted(self.comparison_words, key=len, reverse=True)
+            op_pattern = '|'.join(rf'\s{re.escape(op)}\s' if op.isalpha() or ' ' in op else re.escape(op) for op in ops)
+            for clause in re.split(r'\band\b', where_match.group(1)):
+                parts = re.split(rf'({op_pattern})', clause, maxsplit=1)
+                if len(parts) != 3:
+                    continue
+                column = self._resolve_column(parts[0], columns)
+                if column:
+                    filters.append((column, self.comparison_words[parts[1].strip()], parts[2].strip(' ?.\'"')))
+        
+        # Group column comes after "by" / "per" / "for each"; the value column before it
+        group_col = None
+        split = re.split(r'\b(?:by|per|for each|for every|across)\b', main_part, maxsplit=1)
+        value_text = split[0]
+        measure_after_by = None
+        if top_match and len(split) == 2:
+            # "top 5 regions by sales": the ranked entity is named first, the measure after "by"
+            measure_after_by = self._resolve_column(split[1], columns, numeric_only=True, df=df)
+        
+        if measure_after_by:
+            value_col = measure_after_by
+            group_col = self._resolve_column(value_text, [c for c in columns if c != value_col], numeric_only=False, df=df)
+        else:
+            if len(split) == 2:
+                group_col = self._resolve_column(split[1], columns)
+            value_col = self._resolve_column(value_text, [c for c in columns if c != group_col], numeric_only=True, df=df)
+            if top_match and not group_col and not value_col:
+                group_col = self._resolve_column(value_text, columns, numeric_only=False, df=df)
+        
+        if top_match and not aggregation:
+            aggregation = 'sum' if value_col else 'count'
+        if aggregation != 'count' and not value_col:
+            return None
+        if aggregation == 'count' and not (group_col or filters or re.search(r'\b(rows|records|entries|items)\b', query_lower)):
+            return None
+        
+        return {
+            'aggregation': aggregation,
+            'value_col': value_col,
+            'group_col': group_col,
+            'top_n': int(top_match.group(2)) if top_match else None,
+            'ascending': bool(top_match and top_match.group(1) == 'bottom'),
+            'filters': filters
+        }
+    
+    def _apply_filters(self, df, filters):
+        """Vectorised row filtering for parsed where-clauses"""
+        mask = pd.Series(True, index=df.index)
+        for column, op, value in filters:
+            numeric_value = parse_number(value)
+            if op in ('>', '<', '>=', '<=') or (pd.notna(numeric_value) and op in ('==', '!=')):
+                series, target = self.to_numeric(df[column]), numeric_value
+            else:
+                series, target = df[column].astype(str).str.strip().str.lower(), value.lower()
+            if op == '>':
+                mask &= series > target
+            elif op == '<':
+                mask &= series < target
+            elif op == '>=':
+                mask &= series >= target
+            elif op == '<=':
+                mask &= series <= target
+            elif op == '!=':
+                mask &= series != target
+            else:
+                mask &= series == target
+        return df[mask]
+    
+    def execute_table_query(self, intent, df):
+        """Run a parsed intent with pandas; returns a scalar or a DataFrame"""
+        df = self._apply_filters(df, intent['filters'])
+        aggregation, value_col, group_col = intent['aggregation'], intent['value_col'], intent['group_col']
+        
+        if group_col:
+            if aggregation == 'count':
+                result = df.groupby(group_col, sort=False).size()
+            else:
+                grouped = self.to_numeric(df[value_col]).groupby(df[group_col], sort=False)
+                # Groups without a single number have no total; leave them out rather than report 0
+                result = (grouped.sum(min_count=1) if aggregation == 'sum' else grouped.agg(aggregation)).dropna()
+            result = result.sort_values(ascending=intent['ascending'])
+            if intent['top_n']:
+                result = result.head(intent['top_n'])
+            label = 'count' if aggregation == 'count' else f"{aggregation} of {value_col}"
+            return result.rename(label).reset_index()
+        
+        if aggregation == 'count':
+            return int(len(df))
+        values = self.to_numeric(df[value_col])
+        if intent['top_n']:
+            order = values.sort_values(ascending=intent['ascending']).index[:intent['top_n']]
+            return df.loc[order]
+        return values.sum(min_count=1) if aggregation == 'sum' else values.agg(aggregation)
+    
+    def answer_table_query(self, query, tables):
+        """Answer numeric questions about extracted tables without an LLM
+        
+        Returns a dict with the answer text, the result (scalar or DataFrame), the table index
+        and the elapsed time, or None when the question is not a table computation.
+        """
+        start = time.perf_counter()
+        table_ref = re.search(r'table\s*(\d+)', query.lower())
+        if table_ref:
+            candidates = [int(table_ref.group(1)) - 1]
+        else:
+            candidates = range(len(tables))
+        
+        best = None
+        for idx in candidates:
+            if not 0 <= idx < len(tables):
+                continue
+            df = self.table_to_dataframe(tables[idx])
+            if df is None:
+                continue
+            intent = self.parse_table_query(query, df)
+            if intent:
+                # Prefer the table where the most query parts resolved to columns
+                resolved = sum(1 for key in ('value_col', 'group_col') if intent[key]) + len(intent['filters'])
+                if best is None or resolved > best[0]:
+                    best = (resolved, idx, df, intent)
+        
+        if best is None:
+            return None
+        
+        _, idx, df, intent = best
+        result = self.execute_table_query(intent, df)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return {
+            'answer': self._describe_result(intent, result, idx),
+            'result': result,
+            'table_index': idx,
+            'intent': intent,
+            'elapsed_ms': elapsed_ms
+        }
+    
+    def _describe_result(self, intent, result, table_idx):
+        """Readable answer text for a computed result"""
+        names = {'sum': 'Total', 'mean': 'Average', 'min': 'Minimum', 'max': 'Maximum', 'count': 'Count'}
+        subject = names[intent['aggregation']]
+        if intent['value_col'] and intent['aggregation'] != 'count':
+            subject += f" {intent['value_col']}"
+        if intent['group_col']:
+            subject += f" by {intent['group_col']}"
+        if intent['top_n']:
+            rank = 'Bottom' if intent['ascending'] else 'Top'
+            if intent['group_col']:
+                subject = f"{rank} {intent['top_n']}: {subject}"
+            else:
+                subject = f"{rank} {intent['top_n']} rows by {intent['value_col']}"
+        conditions = " and ".join(f"{col} {op} {value}" for col, op, value in intent['filters'])
+        header = f"{subject} (Table {table_idx + 1}{', where ' + conditions if conditions else ''})"
+        
+        if isinstance(result, pd.DataFrame):
+            if result.empty:
+                return f"{header}: no matching rows."
+            lines = [f"- {', '.join(self._format_value(v) for v in row)}"
+                     for row in result.head(20).itertuples(index=False)]
+            more = f"\n... and {len(result) - 20} more" if len(result) > 20 else ""
+            return f"{header}:\n" + "\n".join(lines) + more
+        if pd.isna(result):
+            return f"{header}: no numeric values found."
+        return f"{header}: {self._format_value(result)}"
+    
+    def _format_value(self, value):
+        """Thousands-separated numbers, two decimals only when needed"""
+        if isinstance(value, bool) or not pd.api.types.is_number(value):
+            return str(value)
+        if pd.isna(value):
+            return "n/a"
+        if float(value).is_integer():
+            return f"{value:,.0f}"
+        return f"{value:,.2f}"
+    
     def describe_image(self, image_path):
         """Generate basic image description"""
         try:
@@ -10,6 +10,8 @@ from utils import (
     get_theme_css, init_session_state,
     process_document_with_progress
 )
+from profiler import get_document_profile
+import table_store
 
 st.set_page_config(
     page_title="📊 Dashboard - ArixStructure",
@@ -69,8 +71,8 @@ with st.sidebar:
     st.markdown("#### 📁 Upload Document")
     uploaded_file = st.file_uploader(
         "Choose unstructured file",
-        type=["pdf", "docx", "pptx", "txt", "html", "htm", "csv"],
-        help="📋 Supported: PDF, Word, PowerPoint, Text, HTML, CSV"
+        type=["pdf", "docx", "pptx", "txt", "html", "htm", "csv", "parquet", "feather", "arrow"],
+        help="📋 Supported: PDF, Word, PowerPoint, Text, HTML, CSV, and Parquet/Arrow tables exported from ArixStructure"
     )
     
     if uploaded_file and st.session_state.get("last_uploaded_name") != uploaded_file.name:
@@ -180,12 +182,17 @@ if st.session_state.doc_data:
     tables = st.session_state.doc_data.get('tables', [])
     if tables:
         st.markdown("#### 📊 Extracted Tables")
+        profile = get_document_profile(st.session_state.doc_data)
         
         for i, table in enumerate(tables[:2]):  # Show first 2 tables
             with st.expander(f"📊 Table {i+1} ({len(table)} rows × {len(table[0]) if table else 0} columns)", expanded=i==0):
-                df = pd.DataFrame(table)
+                df = table_store.get_table(st.session_state.doc_data, i)
                 st.dataframe(df.head(5), use_container_width=True)
                 
+                table_profile = profile['tables'][i]
+                if table_profile['numeric_columns']:
+                    st.caption(f"🔢 Numeric columns: {', '.join(table_profile['numeric_columns'])}")
+                
                 if len(df) > 5:
                     st.info(f"Showing first 5 rows of {len(df)} total rows")
         
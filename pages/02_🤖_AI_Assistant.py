@@ -1,10 +1,14 @@
 import streamlit as st
 import pandas as pd
 import sys
+import uuid
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import get_theme_css, init_session_state
 import llm_handler
+import query_planner
+import table_store
+import table_export
 
 st.set_page_config(
     page_title="🤖 AI Assistant - ArixStructure",
@@ -53,163 +57,15 @@ with nav_container:
 
 st.divider()
 
-def process_intelligent_query(query, doc_data):
-    """Enhanced AI query processing with better accuracy"""
-    query_lower = query.lower()
-    results = {
-        'type': 'text',
-        'content': '',
-        'tables': [],
-        'images': [],
-        'specific_data': None
-    }
+def process_intelligent_query(query, doc_data, should_cancel=None):
+    """Answer a question with the cheapest engine that can handle it
     
-    # Enhanced context building
-    def build_enhanced_context(tables, full_text):
-        context = f"Document Summary: {full_text[:500]}...\n\n"
-        context += f"Total Tables: {len(tables)}\n\n"
-        
-        context_parts = [f"Document Summary: {full_text[:500]}...\n\n", f"Total Tables: {len(tables)}\n\n"]
-        
-        for i, table in enumerate(tables):
-            if table:
-                headers = table[0] if table else []
-                sample_data = table[1:3] if len(table) > 1 else []
-                table_info = [f"Table {i+1} ({len(table)} rows, {len(headers)} columns):\n"]
-                table_info.append(f"Headers: {', '.join(str(h) for h in headers)}\n")
-                if sample_data:
-                    table_info.append("Sample data:\n")
-                    for row in sample_data:
-                        table_info.append(f"  {', '.join(str(cell) for cell in row)}\n")
-                table_info.append("\n")
-                context_parts.extend(table_info)
-        
-        context = ''.join(context_parts)
-        return context
-    
-    # Table-related queries
-    if any(word in query_lower for word in ['table', 'data', 'row', 'column', 'chart', 'extract', 'show']):
-        results['type'] = 'table'
-        tables = doc_data.get('tables', [])
-        
-        if 'table' in query_lower:
-            import re
-            # Specific table number
-            table_nums = re.findall(r'table\s*(\d+)', query_lower)
-            if table_nums:
-                table_idx = int(table_nums[0]) - 1
-                if 0 <= table_idx < len(tables):
-                    results['tables'] = [tables[table_idx]]
-                    results['specific_data'] = f"Table {table_nums[0]}"
-                    
-                    # Enhanced table analysis
-                    table = tables[table_idx]
-                    headers = table[0] if table else []
-                    data_rows = table[1:] if len(table) > 1 else []
-                    
-                    analysis = f"Table {table_nums[0]} Analysis:\n"
-                    analysis += f"- Rows: {len(table)}\n"
-                    analysis += f"- Columns: {len(headers)}\n"
-                    analysis += f"- Headers: {', '.join(str(h) for h in headers)}\n"
-                    
-                    # Detect data types
-                    if data_rows:
-                        numeric_cols = []
-                        text_cols = []
-                        for i, header in enumerate(headers):
-                            sample_values = [row[i] for row in data_rows[:5] if i < len(row)]
-                            if any(str(val).replace('.', '').replace('-', '').isdigit() for val in sample_values):
-                                numeric_cols.append(header)
-                            else:
-                                text_cols.append(header)
-                        
-                        if numeric_cols:
-                            analysis += f"- Numeric columns: {', '.join(str(col) for col in numeric_cols)}\n"
-                        if text_cols:
-                            analysis += f"- Text columns: {', '.join(str(col) for col in text_cols)}\n"
-                    
-                    results['content'] = analysis
-            
-            # Size-based queries
-            elif any(phrase in query_lower for phrase in ['more rows', 'most rows', 'largest', 'biggest']):
-                if tables:
-                    max_rows = max(len(table) for table in tables)
-                    largest_idx = next(i for i, table in enumerate(tables) if len(table) == max_rows)
-                    
-                    results['tables'] = [tables[largest_idx]]
-                    results['specific_data'] = f"Largest table (Table {largest_idx + 1})"
-                    results['content'] = f"Found the largest table: Table {largest_idx + 1} with {max_rows} rows and {len(tables[largest_idx][0]) if tables[largest_idx] else 0} columns."
-            
-            elif any(phrase in query_lower for phrase in ['fewer rows', 'smallest', 'least rows']):
-                if tables:
-                    min_rows = min(len(table) for table in tables)
-                    smallest_idx = next(i for i, table in enumerate(tables) if len(table) == min_rows)
-                    
-                    results['tables'] = [tables[smallest_idx]]
-                    results['specific_data'] = f"Smallest table (Table {smallest_idx + 1})"
-                    results['content'] = f"Found the smallest table: Table {smallest_idx + 1} with {min_rows} rows and {len(tables[smallest_idx][0]) if tables[smallest_idx] else 0} columns."
-            
-            # All tables overview
-            elif any(phrase in query_lower for phrase in ['all tables', 'what tables', 'list tables']):
-                results['tables'] = tables
-                overview = f"Document contains {len(tables)} tables:\n\n"
-                for i, table in enumerate(tables):
-                    headers = table[0] if table else []
-                    overview += f"Table {i+1}: {len(table)} rows, {len(headers)} columns\n"
-                    if headers:
-                        overview += f"  Headers: {', '.join(str(h) for h in headers[:5])}{'...' if len(headers) > 5 else ''}\n"
-                results['content'] = overview
-            
-            else:
-                results['tables'] = tables
-        
-        # Enhanced LLM context for better accuracy
-        if not results['content'] and results['tables']:
-            # Build detailed table context for calculations
-            table_context_parts = []
-            for i, table in enumerate(results['tables']):
-                table_context_parts.append(f"Table {i+1}:\n")
-                for row_idx, row in enumerate(table):
-                    table_context_parts.append(f"Row {row_idx+1}: {', '.join(str(cell) for cell in row)}\n")
-                table_context_parts.append("\n")
-            table_context = ''.join(table_context_parts)
-            
-            prompt = f"Based on this table data, answer the user's question: '{query}'\n\nTable Data:\n{table_context}\n\nProvide accurate calculations and specific answers based on the actual data shown."
-            results['content'] = llm_handler.get_text_response(prompt, "")
-        elif not results['tables']:
-            results['content'] = "No tables found in the document."
-    
-    # Image queries
-    elif any(word in query_lower for word in ['image', 'picture', 'photo', 'figure']):
-        results['type'] = 'image'
-        results['images'] = doc_data.get('image_descriptions', [])
-        
-        if results['images']:
-            # Enhanced image context
-            image_context = f"Found {len(results['images'])} images:\n\n"
-            for i, img in enumerate(results['images']):
-                image_context += f"Image {i+1}: {img.get('description', 'No description')}\n"
-            
-            results['content'] = llm_handler.get_image_query_response(f"{query}\n\nContext: {image_context}", results['images'])
-        else:
-            results['content'] = "No images found in the document."
-    
-    # General text queries with enhanced context
-    else:
-        full_text = doc_data.get('full_text', '')
-        tables = doc_data.get('tables', [])
-        
-        # Build comprehensive context
-        enhanced_context = f"Document Text: {full_text}\n\n"
-        if tables:
-            enhanced_context += f"Available Tables ({len(tables)} total):\n"
-            for i, table in enumerate(tables):
-                headers = table[0] if table else []
-                enhanced_context += f"Table {i+1}: {', '.join(str(h) for h in headers[:3])}{'...' if len(headers) > 3 else ''}\n"
-        
-        results['content'] = llm_handler.get_text_response(f"Query: {query}\n\nContext: {enhanced_context}", "")
-    
-    return results
+    The query planner tries the document profile, local table computation and retrieval with
+    extractive answers before falling back to the language model. LLM-backed answers are
+    returned as a token generator in results['stream']; `should_cancel` lets a newer question
+    stop an answer that is still streaming.
+    """
+    return query_planner.answer_query(query, doc_data, should_cancel=should_cancel)
 
 if st.session_state.doc_data:
     # Current document info
@@ -257,116 +113,162 @@ if st.session_state.doc_data:
     
     # Process query and show response
     if analyze_btn and user_question:
+        # A newer question invalidates any answer that is still streaming
+        query_id = uuid.uuid4().hex
+        st.session_state.active_query_id = query_id
+        
         with st.spinner("🤖 AI is thinking..."):
-            results = process_intelligent_query(user_question, st.session_state.doc_data)
-            
-            # Add to chat history
-            chat_entry = {
-                'question': user_question,
-                'answer': results['content'],
-                'type': results['type'],
-                'timestamp': pd.Timestamp.now()
-            }
-            st.session_state.chat_history.append(chat_entry)
-            
-            # Display response
-            st.markdown('<div class="content-card">', unsafe_allow_html=True)
-            st.markdown("### 🤖 AI Response")
-            
-            import html
-            safe_question = html.escape(user_question)
+            results = process_intelligent_query(
+                user_question, st.session_state.doc_data,
+                should_cancel=lambda: st.session_state.get('active_query_id') != query_id
+            )
+        
+        # Display response
+        st.markdown('<div class="content-card">', unsafe_allow_html=True)
+        st.markdown("### 🤖 AI Response")
+        
+        import html
+        safe_question = html.escape(user_question)
+        st.markdown(f"**❓ Your Question:** {safe_question}")
+        if results.get('stream') is not None:
+            st.markdown("**💡 AI Answer:**")
+            streamed = st.write_stream(results['stream'])
+            results['content'] = streamed if isinstance(streamed, str) else ''.join(str(part) for part in streamed)
+            metrics = llm_handler.last_stream_metrics
+            if metrics.get('ttft') is not None:
+                st.caption(f"⚡ First token in {metrics['ttft']*1000:.0f} ms · {metrics['tokens']} tokens in {metrics['total']:.2f}s")
+        else:
             safe_answer = html.escape(results['content'])
-            st.markdown(f"**❓ Your Question:** {safe_question}")
             st.markdown(f"**💡 AI Answer:** {safe_answer}")
-            
-            # AI Response Export Options
-            st.markdown("#### 📥 Export AI Response")
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                # Download AI response as text
-                response_text = f"Question: {user_question}\n\nAnswer: {results['content']}"
-                st.download_button(
-                    "📄 Download Response",
-                    data=response_text,
-                    file_name="ai_response.txt",
-                    mime="text/plain"
-                )
-            
-            with col2:
-                # Show response in copyable format
-                if st.button("📋 Show Copyable Text", key="copy_response"):
-                    st.text_area("Copy this text:", response_text, height=200, key="copyable_response")
-            
-            with col3:
-                # Download as JSON
-                response_json = {
-                    "question": user_question,
-                    "answer": results['content'],
-                    "timestamp": pd.Timestamp.now().isoformat(),
-                    "type": results['type']
-                }
-                import json
-                st.download_button(
-                    "📄 Download JSON",
-                    data=json.dumps(response_json, indent=2),
-                    file_name="ai_response.json",
-                    mime="application/json"
-                )
-            
-            # Display retrieved content
-            if results['type'] == 'table' and results['tables']:
-                st.markdown("**📊 Retrieved Tables:**")
-                for i, table in enumerate(results['tables']):
-                    df = pd.DataFrame(table)
-                    st.dataframe(df, use_container_width=True)
-                    
-                    # Quick export options
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        csv_data = df.to_csv(index=False).encode('utf-8')
+            if results.get('specific_data'):
+                st.caption(f"📌 {results['specific_data']}")
+        st.caption(f"🧭 Answered by {query_planner.TIER_LABELS[results['tier']]} · planned in {results['elapsed_ms']:.1f} ms")
+        if results.get('token_usage'):
+            usage = results['token_usage']
+            st.caption(f"🧮 Prompt: {usage['prompt_tokens']}/{usage['limit']} tokens (context {usage['context_tokens']}) · {usage['model']}")
+        
+        # Add to chat history
+        chat_entry = {
+            'question': user_question,
+            'answer': results['content'],
+            'type': results['type'],
+            'tier': results['tier'],
+            'elapsed_ms': results['elapsed_ms'],
+            'timestamp': pd.Timestamp.now()
+        }
+        st.session_state.chat_history.append(chat_entry)
+        
+        # AI Response Export Options
+        st.markdown("#### 📥 Export AI Response")
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            # Download AI response as text
+            response_text = f"Question: {user_question}\n\nAnswer: {results['content']}"
+            st.download_button(
+                "📄 Download Response",
+                data=response_text,
+                file_name="ai_response.txt",
+                mime="text/plain"
+            )
+        
+        with col2:
+            # Show response in copyable format
+            if st.button("📋 Show Copyable Text", key="copy_response"):
+                st.text_area("Copy this text:", response_text, height=200, key="copyable_response")
+        
+        with col3:
+            # Download as JSON
+            response_json = {
+                "question": user_question,
+                "answer": results['content'],
+                "timestamp": pd.Timestamp.now().isoformat(),
+                "type": results['type']
+            }
+            import json
+            st.download_button(
+                "📄 Download JSON",
+                data=json.dumps(response_json, indent=2),
+                file_name="ai_response.json",
+                mime="application/json"
+            )
+        
+        # Display retrieved content
+        if results['type'] == 'table' and results['tables']:
+            st.markdown("**📊 Retrieved Tables:**")
+            for i, table in enumerate(results['tables']):
+                df = table_store.lookup_table(st.session_state.doc_data, table)
+                st.dataframe(df, use_container_width=True)
+                
+                # Quick export options; columnar files are written only when clicked
+                col1, col2, col3, col4, col5 = st.columns(5)
+                with col1:
+                    csv_data = df.to_csv(index=False).encode('utf-8')
+                    st.download_button(
+                        "📥 Download CSV",
+                        data=csv_data,
+                        file_name=f"table_{i+1}.csv",
+                        mime="text/csv",
+                        key=f"csv_{i}"
+                    )
+                with col2:
+                    json_data = df.to_json(orient='records', indent=2).encode('utf-8')
+                    st.download_button(
+                        "📥 Download JSON",
+                        data=json_data,
+                        file_name=f"table_{i+1}.json",
+                        mime="application/json",
+                        key=f"json_{i}"
+                    )
+                with col3:
+                    if 'parquet' in table_export.EXPORTERS:
                         st.download_button(
-                            "📥 Download CSV",
-                            data=csv_data,
-                            file_name=f"table_{i+1}.csv",
-                            mime="text/csv",
-                            key=f"csv_{i}"
+                            "📥 Download Parquet",
+                            data=lambda df=df, name=f"table_{i+1}": table_export.to_parquet(df, name),
+                            file_name=f"table_{i+1}.parquet",
+                            mime=table_export.MIME_TYPES['parquet'],
+                            key=f"parquet_{i}"
                         )
-                    with col2:
-                        json_data = df.to_json(orient='records', indent=2).encode('utf-8')
+                with col4:
+                    if 'feather' in table_export.EXPORTERS:
                         st.download_button(
-                            "📥 Download JSON",
-                            data=json_data,
-                            file_name=f"table_{i+1}.json",
-                            mime="application/json",
-                            key=f"json_{i}"
+                            "📥 Download Arrow",
+                            data=lambda df=df, name=f"table_{i+1}": table_export.to_feather(df, name),
+                            file_name=f"table_{i+1}.feather",
+                            mime=table_export.MIME_TYPES['feather'],
+                            key=f"feather_{i}"
                         )
-                    with col3:
-                        if st.button(f"📋 Show Table {i+1}", key=f"copy_{i}"):
-                            st.text_area(f"Copy Table {i+1}:", df.to_string(index=False), height=150, key=f"copyable_table_{i}")
-            
-            elif results['type'] == 'image' and results['images']:
-                st.markdown("**🖼️ Retrieved Images:**")
-                for i, img_desc in enumerate(results['images']):
-                    col1, col2 = st.columns([1, 2])
-                    with col1:
-                        st.image(img_desc['path'], caption=f"Image {i+1}")
-                    with col2:
-                        st.markdown(f"**Description:** {img_desc['description']}")
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+                with col5:
+                    if st.button(f"📋 Show Table {i+1}", key=f"copy_{i}"):
+                        st.text_area(f"Copy Table {i+1}:", df.to_string(index=False), height=150, key=f"copyable_table_{i}")
+        
+        elif results['type'] == 'image' and results['images']:
+            st.markdown("**🖼️ Retrieved Images:**")
+            for i, img_desc in enumerate(results['images']):
+                col1, col2 = st.columns([1, 2])
+                with col1:
+                    st.image(img_desc['path'], caption=f"Image {i+1}")
+                with col2:
+                    st.markdown(f"**Description:** {img_desc['description']}")
+        
+        st.markdown('</div>', unsafe_allow_html=True)
     
     # Chat history
     if st.session_state.chat_history:
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
         st.markdown("### 📚 Chat History")
         
+        local_answers = sum(1 for chat in st.session_state.chat_history if chat.get('tier') not in (None, 'llm'))
+        st.caption(f"🏠 {local_answers} of {len(st.session_state.chat_history)} questions answered without the language model")
+        
         with st.expander(f"💬 Previous Conversations ({len(st.session_state.chat_history)} total)", expanded=False):
             for i, chat in enumerate(reversed(st.session_state.chat_history)):
                 st.markdown(f"**🕐 {chat['timestamp'].strftime('%H:%M:%S')}**")
                 st.markdown(f"**❓ Q:** {chat['question']}")
                 answer_preview = chat['answer'][:200] + "..." if len(chat['answer']) > 200 else chat['answer']
                 st.markdown(f"**💡 A:** {answer_preview}")
+                if chat.get('tier'):
+                    st.caption(f"{query_planner.TIER_LABELS[chat['tier']]} · {chat['elapsed_ms']:.1f} ms")
                 if i < len(st.session_state.chat_history) - 1:
                     st.divider()
         
@@ -5,12 +5,20 @@ import plotly.graph_objects as go
 import numpy as np
 import sys
 import os
+import time
 from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import (
     get_theme_css, init_session_state,
-    create_comprehensive_export, save_plot_as_image
+    create_comprehensive_export
 )
+from sql_engine import TableDatabase
+import table_store
+import chart_sampling
+import chart_aggregation
+import figure_cache
+import chart_export
+import table_export
 
 st.set_page_config(
     page_title="📈 Analytics - ArixStructure",
@@ -63,24 +71,21 @@ with nav_container:
 
 st.divider()
 
-def create_simple_visualization(df, chart_type, x_col, y_col=None, color_col=None, title="Chart"):
-    """Create visualization with proper axis handling and data validation"""
+def create_simple_visualization(df, chart_type, x_col, y_col=None, color_col=None, title="Chart", large_scatter="sample", data_key=None):
+    """Create visualization with proper axis handling and data validation
+    
+    Returns (figure, render_info); render_info holds the original and rendered point counts.
+    data_key identifies the source table so bar, pie and histogram aggregates can be cached.
+    """
     try:
         # Data validation
         if df.empty:
             st.error("❌ No data available for visualization")
             return None, None
             
-        # Clean data and handle missing values
-        df_clean = df.copy()
-        
-        # Convert numeric columns properly
-        for col in df_clean.columns:
-            if df_clean[col].dtype == 'object':
-                # Try to convert to numeric if possible
-                numeric_series = pd.to_numeric(df_clean[col], errors='coerce')
-                if not numeric_series.isna().all():
-                    df_clean[col] = numeric_series
+        # Columns arrive typed from the document profile
+        df_clean = df
+        render_info = {'original_points': len(df_clean), 'rendered_points': len(df_clean)}
         
         # Set theme
         template = "plotly_dark" if st.session_state.theme_mode == 'dark' else "plotly_white"
@@ -101,26 +106,42 @@ def create_simple_visualization(df, chart_type, x_col, y_col=None, color_col=Non
                         return [min_val - range_size * padding, max_val + range_size * padding]
             return None
         
+        # Aggregates are cached per table and chart spec
+        def aggregate(kind, build):
+            key = (data_key, kind, chart_type, x_col, y_col, color_col) if data_key is not None else None
+            return chart_aggregation.cached(key, build)
+        
         # Create visualizations with proper axis handling
         if chart_type == "Bar Chart":
-            if y_col and y_col in df_clean.columns:
+            if y_col and y_col in df_clean.columns and pd.api.types.is_numeric_dtype(df_clean[y_col]):
                 # Remove rows with NaN values in key columns
                 df_plot = df_clean.dropna(subset=[x_col, y_col])
-                fig = px.bar(df_plot, x=x_col, y=y_col, color=color_col, title=title)
+                bar_data = aggregate('sum', lambda: chart_aggregation.top_n_sums(df_plot, x_col, y_col, color_col))
+                fig = px.bar(bar_data, x=x_col, y=y_col, color=color_col, title=title)
+                fig.update_xaxes(type='category')
+                render_info = {'original_points': len(df_plot), 'rendered_points': len(bar_data),
+                               'method': f'sum by {x_col}, top {chart_aggregation.TOP_N}'}
                 
                 # Set custom y-axis range
-                y_range = get_axis_range(df_plot[y_col])
+                y_range = get_axis_range(bar_data.groupby(x_col, sort=False)[y_col].sum())
                 if y_range:
                     fig.update_yaxes(range=y_range)
+            elif y_col and y_col in df_clean.columns:
+                # Non-numeric y: bars per row, as before
+                df_plot = df_clean.dropna(subset=[x_col, y_col])
+                fig = px.bar(df_plot, x=x_col, y=y_col, color=color_col, title=title)
             else:
                 df_plot = df_clean.dropna(subset=[x_col])
-                value_counts = df_plot[x_col].value_counts()
-                fig = px.bar(x=value_counts.index, y=value_counts.values, title=title)
-                fig.update_xaxes(title=format_title(x_col))
+                color_series = df_plot[color_col] if color_col else None
+                counts = aggregate('count', lambda: chart_aggregation.top_n_counts(df_plot[x_col], color=color_series))
+                fig = px.bar(counts, x=x_col, y='count', color=color_col, title=title)
+                fig.update_xaxes(title=format_title(x_col), type='category')
                 fig.update_yaxes(title="Count")
+                render_info = {'original_points': len(df_plot), 'rendered_points': len(counts),
+                               'method': f'top {chart_aggregation.TOP_N} counts'}
                 
                 # Set custom y-axis range for counts
-                y_range = get_axis_range(pd.Series(value_counts.values))
+                y_range = get_axis_range(counts.groupby(x_col, sort=False)['count'].sum())
                 if y_range:
                     fig.update_yaxes(range=y_range)
             
@@ -131,7 +152,10 @@ def create_simple_visualization(df, chart_type, x_col, y_col=None, color_col=Non
         elif chart_type == "Line Chart":
             if y_col and y_col in df_clean.columns:
                 df_plot = df_clean.dropna(subset=[x_col, y_col])
-                fig = px.line(df_plot, x=x_col, y=y_col, color=color_col, title=title)
+                # Axis ranges come from every point; only the trace is downsampled
+                df_trace, render_info = chart_sampling.reduce_line(df_plot, x_col, y_col, color_col)
+                fig = px.line(df_trace, x=x_col, y=y_col, color=color_col, title=title,
+                              render_mode='webgl' if render_info['webgl'] else 'auto')
                 
                 # Set custom axis ranges
                 x_range = get_axis_range(df_plot[x_col])
@@ -151,7 +175,17 @@ def create_simple_visualization(df, chart_type, x_col, y_col=None, color_col=Non
         elif chart_type == "Scatter Plot":
             if y_col and y_col in df_clean.columns:
                 df_plot = df_clean.dropna(subset=[x_col, y_col])
-                fig = px.scatter(df_plot, x=x_col, y=y_col, color=color_col, title=title)
+                numeric_axes = all(pd.api.types.is_numeric_dtype(df_plot[c]) for c in (x_col, y_col))
+                if large_scatter == "density" and numeric_axes and len(df_plot) > chart_sampling.SCATTER_MAX_POINTS:
+                    # Binned here so only the grid is serialised, not every point
+                    x_centers, y_centers, counts = chart_sampling.density_grid(df_plot[x_col], df_plot[y_col])
+                    fig = go.Figure(go.Heatmap(x=x_centers, y=y_centers, z=counts, colorscale='Viridis', colorbar={'title': 'Points'}))
+                    render_info = {'original_points': len(df_plot), 'rendered_points': int(np.isfinite(counts).sum()),
+                                   'method': f'{chart_sampling.DENSITY_BINS}×{chart_sampling.DENSITY_BINS} density bins'}
+                else:
+                    df_trace, render_info = chart_sampling.reduce_scatter(df_plot, color_col)
+                    fig = px.scatter(df_trace, x=x_col, y=y_col, color=color_col, title=title,
+                                     render_mode='webgl' if render_info['webgl'] else 'auto')
                 
                 # Set custom axis ranges
                 x_range = get_axis_range(df_plot[x_col])
@@ -171,32 +205,48 @@ def create_simple_visualization(df, chart_type, x_col, y_col=None, color_col=Non
         elif chart_type == "Pie Chart":
             if y_col and y_col in df_clean.columns:
                 df_plot = df_clean.dropna(subset=[x_col, y_col])
-                pie_data = df_plot.groupby(x_col)[y_col].sum().head(10)
                 # Filter out zero or negative values for pie chart
-                pie_data = pie_data[pie_data > 0]
+                df_plot = df_plot[df_plot[y_col] > 0]
+                pie_data = aggregate('sum', lambda: chart_aggregation.top_n_sums(df_plot, x_col, y_col, n=chart_aggregation.PIE_TOP_N))
                 if len(pie_data) > 0:
-                    fig = px.pie(values=pie_data.values, names=pie_data.index, title=title)
+                    fig = px.pie(values=pie_data[y_col].to_numpy(), names=pie_data[x_col].astype(str), title=title)
+                    render_info = {'original_points': len(df_plot), 'rendered_points': len(pie_data),
+                                   'method': f'top {chart_aggregation.PIE_TOP_N} + {chart_aggregation.OTHER_LABEL}'}
                 else:
                     st.error("❌ No positive values found for pie chart")
                     return None, None
             else:
                 df_plot = df_clean.dropna(subset=[x_col])
-                value_counts = df_plot[x_col].value_counts().head(10)
-                fig = px.pie(values=value_counts.values, names=value_counts.index, title=title)
+                counts = aggregate('count', lambda: chart_aggregation.top_n_counts(df_plot[x_col], n=chart_aggregation.PIE_TOP_N))
+                fig = px.pie(values=counts['count'].to_numpy(), names=counts[x_col], title=title)
+                render_info = {'original_points': len(df_plot), 'rendered_points': len(counts),
+                               'method': f'top {chart_aggregation.PIE_TOP_N} + {chart_aggregation.OTHER_LABEL}'}
 
         elif chart_type == "Histogram":
             df_plot = df_clean.dropna(subset=[x_col])
             if pd.api.types.is_numeric_dtype(df_plot[x_col]):
                 # Calculate optimal number of bins
                 n_bins = min(50, max(10, int(np.sqrt(len(df_plot)))))
-                fig = px.histogram(df_plot, x=x_col, title=title, color=color_col, nbins=n_bins)
+                color_series = df_plot[color_col].astype(str) if color_col else None
+                bins = aggregate('histogram', lambda: chart_aggregation.histogram_bins(df_plot[x_col], n_bins, color=color_series))
+                # Binned here: only bin counts are sent to the browser
+                fig = px.bar(bins, x='bin', y='count', color=color_col, title=title)
+                fig.update_traces(width=bins['width'].iloc[0] if len(bins) else None)
+                fig.update_layout(bargap=0)
+                render_info = {'original_points': len(df_plot), 'rendered_points': len(bins),
+                               'method': f'{n_bins} NumPy bins'}
                 
                 # Set custom x-axis range
                 x_range = get_axis_range(df_plot[x_col])
                 if x_range:
                     fig.update_xaxes(range=x_range)
             else:
-                fig = px.histogram(df_plot, x=x_col, title=title, color=color_col)
+                color_series = df_plot[color_col] if color_col else None
+                counts = aggregate('count', lambda: chart_aggregation.top_n_counts(df_plot[x_col], color=color_series))
+                fig = px.bar(counts, x=x_col, y='count', color=color_col, title=title)
+                fig.update_xaxes(type='category')
+                render_info = {'original_points': len(df_plot), 'rendered_points': len(counts),
+                               'method': f'top {chart_aggregation.TOP_N} counts'}
                 
             fig.update_xaxes(title=format_title(x_col))
             fig.update_yaxes(title="Frequency")
@@ -253,7 +303,9 @@ def create_simple_visualization(df, chart_type, x_col, y_col=None, color_col=Non
         elif chart_type == "Area Chart":
             if y_col and y_col in df_clean.columns:
                 df_plot = df_clean.dropna(subset=[x_col, y_col])
-                fig = px.area(df_plot, x=x_col, y=y_col, color=color_col, title=title)
+                df_trace, render_info = chart_sampling.reduce_line(df_plot, x_col, y_col, color_col)
+                render_info['webgl'] = False  # px.area has no WebGL mode
+                fig = px.area(df_trace, x=x_col, y=y_col, color=color_col, title=title)
                 
                 x_range = get_axis_range(df_plot[x_col])
                 y_range = get_axis_range(df_plot[y_col])
@@ -348,12 +400,17 @@ def create_simple_visualization(df, chart_type, x_col, y_col=None, color_col=Non
             title_font={'size': 14, 'family': 'Poppins'}
         )
         
-        return fig, {}
+        return fig, render_info
         
     except Exception as e:
         st.error(f"❌ Error creating visualization: {str(e)}")
         return None, None
 
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_table_database(doc_hash, _tables):
+    """SQLite database of the document's tables, built once per document hash"""
+    return TableDatabase(_tables)
+
 # Sidebar for settings
 with st.sidebar:
     st.markdown("### 🎨 Visualization Settings")
@@ -382,32 +439,17 @@ if st.session_state.doc_data:
         )
         
         table = tables[selected_idx]
-        df = pd.DataFrame(table)
+        # A chart drawn for another document or table is stale; hide it until generated again
+        chart_source = (st.session_state.doc_data.get('doc_hash'), st.session_state.doc_data.get('filename'),
+                        len(tables), selected_idx)
+        if st.session_state.get('chart_source') != chart_source:
+            st.session_state['chart_source'] = chart_source
+            st.session_state['chart_visible'] = False
+        # Typed once per document and shared with the other pages
+        df = table_store.get_table(st.session_state.doc_data, selected_idx)
         
-        # Set proper column names if they're just numbers
         if df.empty:
             st.error("❌ Selected table is empty")
-        else:
-            # Use first row as headers if they look like headers
-            if len(df) > 1:
-                first_row = df.iloc[0].astype(str)
-                if not first_row.str.isnumeric().all():
-                    df.columns = first_row
-                    df = df.drop(df.index[0]).reset_index(drop=True)
-            
-            # Ensure column names are strings and unique
-            df.columns = [str(col) for col in df.columns]
-            
-            # Handle duplicate column names
-            cols = df.columns.tolist()
-            seen = {}
-            for i, col in enumerate(cols):
-                if col in seen:
-                    seen[col] += 1
-                    cols[i] = f"{col}_{seen[col]}"
-                else:
-                    seen[col] = 0
-            df.columns = cols
         
         # Data preview
         with st.expander("📋 Data Preview", expanded=False):
@@ -423,7 +465,7 @@ if st.session_state.doc_data:
             numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
             st.metric("🔢 Numeric Columns", len(numeric_cols))
         with col4:
-            categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+            categorical_cols = [col for col in df.columns if not pd.api.types.is_numeric_dtype(df[col])]
             st.metric("📝 Text Columns", len(categorical_cols))
         
         # AI Column Extraction
@@ -506,33 +548,33 @@ if st.session_state.doc_data:
                             if suggested_cols:
                                 st.success(f"🎯 Found {len(suggested_cols)} matching columns: {', '.join(suggested_cols)}")
                                     
-                                    extracted_df = df[suggested_cols]
-                                    st.dataframe(extracted_df.head(10), use_container_width=True)
-                                    
-                                    col_a, col_b, col_c = st.columns(3)
-                                    with col_a:
-                                        csv_data = extracted_df.to_csv(index=False).encode('utf-8')
-                                        st.download_button(
-                                            "📊 Download CSV",
-                                            data=csv_data,
-                                            file_name=f"extracted_columns.csv",
-                                            mime="text/csv"
-                                        )
-                                    with col_b:
-                                        json_data = extracted_df.to_json(orient='records', indent=2).encode('utf-8')
-                                        st.download_button(
-                                            "📄 Download JSON",
-                                            data=json_data,
-                                            file_name=f"extracted_columns.json",
-                                            mime="application/json"
-                                        )
-                                    with col_c:
-                                        if st.button("📈 Visualize Extracted Data"):
-                                            st.session_state['extracted_df'] = extracted_df.copy()
-                                            st.session_state['use_extracted'] = True
-                                            st.session_state['extracted_columns'] = suggested_cols
-                                            st.success("✅ Extracted data ready for visualization! Scroll down to create charts.")
-                                            st.rerun()
+                                extracted_df = df[suggested_cols]
+                                st.dataframe(extracted_df.head(10), use_container_width=True)
+                                
+                                col_a, col_b, col_c = st.columns(3)
+                                with col_a:
+                                    csv_data = extracted_df.to_csv(index=False).encode('utf-8')
+                                    st.download_button(
+                                        "📊 Download CSV",
+                                        data=csv_data,
+                                        file_name=f"extracted_columns.csv",
+                                        mime="text/csv"
+                                    )
+                                with col_b:
+                                    json_data = extracted_df.to_json(orient='records', indent=2).encode('utf-8')
+                                    st.download_button(
+                                        "📄 Download JSON",
+                                        data=json_data,
+                                        file_name=f"extracted_columns.json",
+                                        mime="application/json"
+                                    )
+                                with col_c:
+                                    if st.button("📈 Visualize Extracted Data"):
+                                        st.session_state['extracted_df'] = extracted_df.copy()
+                                        st.session_state['use_extracted'] = True
+                                        st.session_state['extracted_columns'] = suggested_cols
+                                        st.success("✅ Extracted data ready for visualization! Scroll down to create charts.")
+                                        st.rerun()
                             else:
                                 st.warning(f"❌ No matching columns found for '{extraction_query}'")
                                 st.info(f"**Available columns**: {', '.join(available_cols)}")
@@ -560,16 +602,10 @@ if st.session_state.doc_data:
         
         # Use extracted data if available
         if st.session_state.get('use_extracted', False) and 'extracted_df' in st.session_state:
-            viz_df = st.session_state['extracted_df'].copy()
+            # Extracted from the profiled table, so already typed
+            viz_df = st.session_state['extracted_df']
             extracted_cols = st.session_state.get('extracted_columns', [])
             
-            # Ensure viz_df has proper data types
-            for col in viz_df.columns:
-                if viz_df[col].dtype == 'object':
-                    numeric_series = pd.to_numeric(viz_df[col], errors='coerce')
-                    if not numeric_series.isna().all():
-                        viz_df[col] = numeric_series
-            
             st.success(f"🎯 Using AI-extracted columns: {', '.join(extracted_cols)}")
             
             # Show extracted data info
@@ -633,6 +669,16 @@ if st.session_state.doc_data:
             else:
                 color_column = st.selectbox("🎨 Color By (Optional)", [None] + viz_df.columns.tolist())
             
+            large_scatter = "sample"
+            if chart_type == "Scatter Plot" and len(viz_df) > chart_sampling.SCATTER_MAX_POINTS:
+                scatter_mode = st.radio(
+                    "🔵 Large scatter rendering",
+                    [f"Sample {chart_sampling.SCATTER_MAX_POINTS:,} points", "Density heatmap"],
+                    horizontal=True,
+                    help=f"{len(viz_df):,} rows is too many points to draw individually"
+                )
+                large_scatter = "density" if scatter_mode == "Density heatmap" else "sample"
+            
             # Chart title with better default
             if y_column and y_column != "None" and y_column is not None:
                 default_title = f"{y_column} by {x_column}"
@@ -666,16 +712,20 @@ if st.session_state.doc_data:
         col_gen1, col_gen2 = st.columns([3, 1])
         with col_gen1:
             generate_btn = st.button("🎨 Generate Visualization", use_container_width=True, type="primary")
+            if generate_btn:
+                # Keep the chart on screen across reruns; unchanged specs come from the figure cache
+                st.session_state['chart_visible'] = True
         with col_gen2:
             if st.button("🔄 Reset to Full Data", use_container_width=True):
                 if 'extracted_df' in st.session_state:
                     del st.session_state['extracted_df']
                 if 'use_extracted' in st.session_state:
                     del st.session_state['use_extracted']
+                st.session_state['chart_visible'] = False
                 st.success("✅ Reset to full table data")
                 st.rerun()
         
-        if generate_btn:
+        if st.session_state.get('chart_visible', False):
             # Validate data before visualization
             if viz_df.empty:
                 st.error("❌ No data available for visualization")
@@ -687,80 +737,104 @@ if st.session_state.doc_data:
                     data_source = "AI-extracted data" if st.session_state.get('use_extracted', False) else "full table data"
                     st.info(f"📈 Creating {chart_type.lower()} using {data_source} ({len(viz_df)} rows, {len(viz_df.columns)} columns)")
                     
-                    result = create_simple_visualization(
-                        viz_df, chart_type, x_column, y_column, 
-                        color_column if color_column and color_column not in ["None", None] else None, 
-                        chart_title
-                    )
+                    color_arg = color_column if color_column and color_column not in ["None", None] else None
+                    doc_hash = st.session_state.doc_data.get('doc_hash')
+                    if doc_hash and not st.session_state.get('use_extracted', False):
+                        table_fingerprint = f"{doc_hash}:{selected_idx}"
+                    else:
+                        # Extracted subsets may come from any table, so hash their contents
+                        table_fingerprint = table_store.fingerprint(viz_df)
                     
-                    if result and len(result) == 2:
-                        fig, config = result
+                    figure_key = figure_cache.chart_key(
+                        table_fingerprint, chart_type, x_column, y_column, color_arg,
+                        st.session_state.theme_mode, title=chart_title, large_scatter=large_scatter
+                    )
+                    fig, render_info, figure_timing = figure_cache.get_figure(
+                        figure_key,
+                        lambda: create_simple_visualization(
+                            viz_df, chart_type, x_column, y_column, color_arg,
+                            chart_title, large_scatter, data_key=table_fingerprint
+                        )
+                    )
                     
-                    # Create stable container for chart
-                    chart_container = st.container()
+                    if fig is None:
+                        # The error was already shown; keep the rest of the page usable
+                        st.session_state['chart_visible'] = False
+                    else:
+                        # Remembered for the batch export below
+                        st.session_state.setdefault('session_charts', {})[figure_key] = chart_title
+                        # Create stable container for chart
+                        chart_container = st.container()
                     
-                    with chart_container:
-                        # Success message
-                        st.success("✅ **Visualization Created Successfully!**")
+                        with chart_container:
+                            # Success message
+                            st.success("✅ **Visualization Created Successfully!**")
+                        
+                            # Display chart with stable container
+                            st.plotly_chart(fig, use_container_width=True, config={
+                                'displayModeBar': True,
+                                'displaylogo': False,
+                                'modeBarButtonsToRemove': ['pan2d', 'lasso2d'],
+                                'toImageButtonOptions': {
+                                    'format': 'png',
+                                    'filename': chart_title.replace(' ', '_'),
+                                    'height': 600,
+                                    'width': 1000,
+                                    'scale': 2
+                                }
+                            })
                         
-                        # Display chart with stable container
-                        st.plotly_chart(fig, use_container_width=True, config={
-                            'displayModeBar': True,
-                            'displaylogo': False,
-                            'modeBarButtonsToRemove': ['pan2d', 'lasso2d'],
-                            'toImageButtonOptions': {
-                                'format': 'png',
-                                'filename': chart_title.replace(' ', '_'),
-                                'height': 600,
-                                'width': 1000,
-                                'scale': 2
-                            }
-                        })
+                            point_caption = chart_sampling.caption(render_info)
+                            if point_caption and render_info['rendered_points'] != render_info['original_points']:
+                                st.caption(point_caption)
+                            st.caption(figure_cache.timing_caption(figure_timing))
                         
-                        # Interactive features info
-                        st.info("🎯 **Interactive Features**: Zoom, Pan, Select, Download, Reset, Hover for details")
+                            # Interactive features info
+                            st.info("🎯 **Interactive Features**: Zoom, Pan, Select, Download, Reset, Hover for details")
                     
-                    # Export and analysis options in stable container
-                    export_container = st.container()
+                        # Export and analysis options in stable container
+                        export_container = st.container()
                     
-                    with export_container:
-                        st.markdown("#### 📥 Export & Analysis Options")
+                        with export_container:
+                            st.markdown("#### 📥 Export & Analysis Options")
                         
-                        col1, col2, col3, col4, col5 = st.columns(5)
+                            col1, col2, col3, col4, col5 = st.columns(5)
                     
-                    with col1:
-                        # Image export with better error handling
-                        try:
-                            img_bytes, filepath = save_plot_as_image(fig, f"chart_{selected_idx+1}", export_format.lower())
-                            if img_bytes:
+                        with col1:
+                            # Image export through the shared Kaleido renderer, kept in memory
+                            try:
+                                img_bytes, img_format = figure_cache.get_export(
+                                    figure_key, export_format.lower(),
+                                    lambda: chart_export.export_figure(fig, export_format.lower())
+                                )
+                                if img_format != export_format.lower():
+                                    st.caption(f"⚠️ {export_format} renderer unavailable, exporting HTML")
                                 st.download_button(
-                                    f"📥 {export_format}",
+                                    f"📥 {img_format.upper()}",
                                     data=img_bytes,
-                                    file_name=f"{chart_title.replace(' ', '_')}.{export_format.lower()}",
-                                    mime=f"image/{export_format.lower()}" if export_format.lower() != 'html' else "text/html",
+                                    file_name=f"{chart_title.replace(' ', '_')}.{img_format}",
+                                    mime=chart_export.MIME_TYPES.get(img_format, 'application/octet-stream'),
                                     help=f"Download chart as {export_format} file"
                                 )
-                            else:
-                                st.warning(f"⚠️ {export_format} export not available")
-                        except Exception as e:
-                            st.error(f"❌ Export error: {str(e)[:50]}...")
+                            except Exception as e:
+                                st.error(f"❌ Export error: {str(e)[:50]}...")
                     
-                    with col2:
-                        # HTML export
-                        html_str = fig.to_html(include_plotlyjs='cdn', config=config)
-                        st.download_button(
-                            "🌐 HTML",
-                            data=html_str,
-                            file_name=f"{chart_title.replace(' ', '_')}.html",
-                            mime="text/html"
-                        )
+                        with col2:
+                            # HTML export
+                            html_str = fig.to_html(include_plotlyjs='cdn')
+                            st.download_button(
+                                "🌐 HTML",
+                                data=html_str,
+                                file_name=f"{chart_title.replace(' ', '_')}.html",
+                                mime="text/html"
+                            )
                     
-                    with col3:
-                        # Analysis Report
-                        chart_cols = [col for col in [x_column, y_column, color_column] if col and col not in ["None", None]]
-                        if chart_cols:
-                            chart_data = df[chart_cols].copy()
-                            analysis_text = f"""CHART ANALYSIS REPORT
+                        with col3:
+                            # Analysis Report
+                            chart_cols = [col for col in [x_column, y_column, color_column] if col and col not in ["None", None]]
+                            if chart_cols:
+                                chart_data = df[chart_cols].copy()
+                                analysis_text = f"""CHART ANALYSIS REPORT
 
 Chart Title: {chart_title}
 Chart Type: {chart_type}
@@ -776,77 +850,168 @@ STATISTICAL SUMMARY:
 DATA PREVIEW:
 {chart_data.head(20).to_string(index=False)}
 """
-                            st.download_button(
-                                "📄 Report",
-                                data=analysis_text.encode('utf-8'),
-                                file_name=f"{chart_title.replace(' ', '_')}_analysis.txt",
-                                mime="text/plain"
-                            )
+                                st.download_button(
+                                    "📄 Report",
+                                    data=analysis_text.encode('utf-8'),
+                                    file_name=f"{chart_title.replace(' ', '_')}_analysis.txt",
+                                    mime="text/plain"
+                                )
                     
-                    with col4:
-                        # Data export
-                        if chart_cols:
-                            chart_data = df[chart_cols].copy()
-                            csv_data = chart_data.to_csv(index=False).encode('utf-8')
+                        with col4:
+                            # Data export
+                            if chart_cols:
+                                chart_data = df[chart_cols].copy()
+                                csv_data = chart_data.to_csv(index=False).encode('utf-8')
+                                st.download_button(
+                                    "📊 Data CSV",
+                                    data=csv_data,
+                                    file_name=f"{chart_title.replace(' ', '_')}_data.csv",
+                                    mime="text/csv"
+                                )
+                    
+                        with col5:
+                            # JSON export
+                            json_str = fig.to_json()
                             st.download_button(
-                                "📊 Data CSV",
-                                data=csv_data,
-                                file_name=f"{chart_title.replace(' ', '_')}_data.csv",
-                                mime="text/csv"
+                                "📄 JSON",
+                                data=json_str,
+                                file_name=f"{chart_title.replace(' ', '_')}.json",
+                                mime="application/json"
                             )
                     
-                    with col5:
-                        # JSON export
-                        json_str = fig.to_json()
-                        st.download_button(
-                            "📄 JSON",
-                            data=json_str,
-                            file_name=f"{chart_title.replace(' ', '_')}.json",
-                            mime="application/json"
-                        )
-                    
-                    # Data summary for the chart
-                    with st.expander("📊 Chart Data Summary", expanded=False):
-                        chart_cols = [col for col in [x_column, y_column, color_column] if col and col not in ["None", None]]
-                        if chart_cols:
-                            chart_data = viz_df[chart_cols]
-                        else:
-                            chart_data = viz_df[[x_column]]
+                        # Data summary for the chart
+                        with st.expander("📊 Chart Data Summary", expanded=False):
+                            chart_cols = [col for col in [x_column, y_column, color_column] if col and col not in ["None", None]]
+                            if chart_cols:
+                                chart_data = viz_df[chart_cols]
+                            else:
+                                chart_data = viz_df[[x_column]]
                         
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.markdown("**Data Used in Chart:**")
-                            st.dataframe(chart_data.head(10), use_container_width=True)
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                st.markdown("**Data Used in Chart:**")
+                                st.dataframe(chart_data.head(10), use_container_width=True)
                         
-                        with col2:
-                            st.markdown("**Statistics:**")
-                            numeric_data = chart_data.select_dtypes(include=[np.number])
-                            if not numeric_data.empty:
-                                st.dataframe(numeric_data.describe(), use_container_width=True)
-                            else:
-                                st.info("No numeric data for statistics")
+                            with col2:
+                                st.markdown("**Statistics:**")
+                                numeric_data = chart_data.select_dtypes(include=[np.number])
+                                if not numeric_data.empty:
+                                    st.dataframe(numeric_data.describe(), use_container_width=True)
+                                else:
+                                    st.info("No numeric data for statistics")
+        
+        # Every chart generated this session, rendered in one batch by the warm renderer
+        session_charts = st.session_state.get('session_charts', {})
+        if session_charts:
+            with st.expander(f"📦 Export All Charts ({len(session_charts)})", expanded=False):
+                st.caption(", ".join(session_charts.values()))
+                if st.button("📦 Render All Charts", use_container_width=True):
+                    named_figures = []
+                    for key, title in session_charts.items():
+                        cached_fig = figure_cache.load_figure(key)
+                        if cached_fig is not None:
+                            named_figures.append((title.replace(' ', '_'), cached_fig))
+                    with st.spinner(f"Rendering {len(named_figures)} charts..."):
+                        start = time.perf_counter()
+                        archive, fallbacks = chart_export.zip_figures(named_figures, export_format.lower())
+                        elapsed = time.perf_counter() - start
+                    st.session_state['charts_archive'] = archive
+                    st.caption(f"⏱️ Rendered {len(named_figures)} charts in {elapsed:.1f} s "
+                               f"({elapsed * 1000 / max(len(named_figures), 1):.0f} ms per chart)")
+                    if fallbacks:
+                        st.warning(f"⚠️ {fallbacks} charts exported as HTML: {export_format} renderer unavailable")
+                    if len(named_figures) < len(session_charts):
+                        st.info(f"ℹ️ {len(session_charts) - len(named_figures)} older charts left the figure cache; generate them again to include them")
+                if st.session_state.get('charts_archive'):
+                    st.download_button(
+                        "📥 Download Charts (ZIP)",
+                        data=st.session_state['charts_archive'],
+                        file_name="charts.zip",
+                        mime="application/zip",
+                        use_container_width=True
+                    )
         
         st.markdown('</div>', unsafe_allow_html=True)
         
 
         
-        # Data export
+        # SQL console
         st.markdown('<div class="content-card">', unsafe_allow_html=True)
-        st.markdown("### 💾 Export Structured Data")
+        st.markdown("### 🗄️ SQL Console")
         
-        exports = create_comprehensive_export(table, f"table_{selected_idx+1}")
+        doc_hash = st.session_state.doc_data.get('doc_hash') or str(id(tables))
+        database = get_table_database(doc_hash, tables)
         
-        col1, col2, col3, col4 = st.columns(4)
+        with st.expander("📋 Database Schema", expanded=False):
+            st.code(database.describe() or "No tables loaded", language="text")
+            st.caption(f"Loaded in {database.load_time*1000:.0f} ms · cached for this document")
         
+        sql_query = st.text_area(
+            "🔍 SQL query (read-only):",
+            value=f"SELECT * FROM table_{selected_idx+1} LIMIT 10",
+            height=120,
+            key="sql_console_query"
+        )
+        col1, col2 = st.columns([3, 1])
         with col1:
-            st.download_button("📊 CSV", data=exports['csv'], file_name=f"table_{selected_idx+1}.csv", mime="text/csv")
+            run_sql = st.button("▶️ Run Query", use_container_width=True)
         with col2:
-            st.download_button("📄 JSON", data=exports['json'], file_name=f"table_{selected_idx+1}.json", mime="application/json")
-        with col3:
-            if exports.get('excel'):
-                st.download_button("📈 Excel", data=exports['excel'], file_name=f"table_{selected_idx+1}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        with col4:
-            st.download_button("📝 Text", data=exports['txt'], file_name=f"table_{selected_idx+1}.txt", mime="text/plain")
+            row_limit = st.number_input("Row limit", min_value=10, max_value=100000, value=1000, step=100)
+        
+        if run_sql and sql_query.strip():
+            try:
+                result_df, elapsed_ms, truncated = database.query(sql_query, row_limit=int(row_limit))
+                st.dataframe(result_df, use_container_width=True)
+                st.caption(f"⏱️ {len(result_df):,} rows in {elapsed_ms:.1f} ms" + (f" · truncated to {int(row_limit):,} rows" if truncated else ""))
+                st.download_button(
+                    "📥 Download Result CSV",
+                    data=result_df.to_csv(index=False).encode('utf-8'),
+                    file_name="query_result.csv",
+                    mime="text/csv"
+                )
+            except Exception as e:
+                st.error(f"❌ Query failed: {str(e)[:200]}")
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        # Data export
+        st.markdown('<div class="content-card">', unsafe_allow_html=True)
+        st.markdown("### 💾 Export Structured Data")
+        
+        compression = table_export.DEFAULT_PARQUET_COMPRESSION
+        if 'parquet' in table_export.EXPORTERS:
+            compression = st.selectbox(
+                "🗜️ Parquet compression", table_export.PARQUET_COMPRESSIONS,
+                help="zstd gives the smallest files, snappy the fastest reads"
+            )
+        
+        # Nothing is rendered until a download button is clicked
+        exports = create_comprehensive_export(table, f"table_{selected_idx+1}", typed_df=df, compression=compression)
+        labels = {'csv': "📊 CSV", 'json': "📄 JSON", 'jsonl': "🧾 JSONL", 'excel': "📈 Excel", 'txt': "📝 Text",
+                  'pdf': "📑 PDF", 'parquet': "🧱 Parquet", 'feather': "🏹 Arrow"}
+        
+        table_formats = list(exports)
+        table_cols = [col for start in range(0, len(table_formats), 4) for col in st.columns(4)]
+        for table_col, table_format in zip(table_cols, table_formats):
+            with table_col:
+                st.download_button(
+                    labels.get(table_format, table_format.upper()),
+                    data=exports.loader(table_format),
+                    file_name=exports.file_name(table_format),
+                    mime=table_export.MIME_TYPES[table_format],
+                    use_container_width=True
+                )
+        
+        if 'excel' in table_export.EXPORTERS and len(tables) > 1:
+            stem = os.path.splitext(st.session_state.doc_data.get('filename') or "document")[0]
+            st.download_button(
+                f"📚 All {len(tables)} Tables (Excel workbook)",
+                data=lambda: table_export.document_workbook(tables, [f"table_{i+1}" for i in range(len(tables))]),
+                file_name=f"{stem}_tables.xlsx",
+                mime=table_export.MIME_TYPES['excel'],
+                help="One sheet per table, written in a single streaming pass",
+                use_container_width=True
+            )
         
         st.markdown('</div>', unsafe_allow_html=True)
 
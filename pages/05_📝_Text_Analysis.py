@@ -1,11 +1,13 @@
 import streamlit as st
 import sys
 import os
+import heapq
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils import get_theme_css, init_session_state
+from profiler import get_document_profile, get_entity_index
+from entity_index import ENTITY_LABELS
+from text_pages import get_text_windows, page_window, window_at, window_label
 import pandas as pd
-import re
-from collections import Counter
 import plotly.express as px
 from datetime import datetime
 
@@ -54,55 +56,37 @@ with col5:
 
 st.divider()
 
-def analyze_text_content(text):
-    if not text:
-        return {}
-    
-    char_count = len(text)
-    word_count = len(text.split())
-    sentence_count = len(re.findall(r'[.!?]+', text))
-    paragraph_count = len([p for p in text.split('\n\n') if p.strip()])
-    
-    words = re.findall(r'\b\w+\b', text.lower())
-    word_freq = Counter(words)
-    
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'}
-    filtered_words = {word: count for word, count in word_freq.items() if word not in stop_words and len(word) > 2}
-    
-    sentences = re.split(r'[.!?]+', text)
-    sentence_lengths = [len(sentence.split()) for sentence in sentences if sentence.strip()]
-    avg_sentence_length = sum(sentence_lengths) / len(sentence_lengths) if sentence_lengths else 0
-    
-    reading_time_minutes = word_count / 200
-    
-    numbers = re.findall(r'\b\d+(?:\.\d+)?\b', text)
-    dates = re.findall(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b|\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b', text)
-    emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-    urls = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', text)
-    
-    return {
-        'char_count': char_count,
-        'word_count': word_count,
-        'sentence_count': sentence_count,
-        'paragraph_count': paragraph_count,
-        'word_freq': word_freq,
-        'filtered_words': filtered_words,
-        'sentence_lengths': sentence_lengths,
-        'avg_sentence_length': avg_sentence_length,
-        'reading_time_minutes': reading_time_minutes,
-        'numbers': numbers,
-        'dates': dates,
-        'emails': emails,
-        'urls': urls
-    }
-
 if st.session_state.doc_data:
     text_content = st.session_state.doc_data.get('full_text', '')
     
     if not text_content:
         st.info("📝 No text content found in the document")
     else:
-        analysis = analyze_text_content(text_content)
+        # Statistics and entities were computed once at ingest
+        profile = get_document_profile(st.session_state.doc_data)
+        analysis = profile['text']
+        entities = get_entity_index(st.session_state.doc_data)
+        
+        # Full Text viewer position, reset for each new document (not every document has a hash)
+        windows = get_text_windows(st.session_state.doc_data)
+        window_doc = (st.session_state.doc_data.get('doc_hash'), st.session_state.doc_data.get('filename'),
+                      windows[-1]['end'], len(windows))
+        if st.session_state.get('text_window_doc') != window_doc:
+            st.session_state.text_window_doc = window_doc
+            st.session_state.text_window = 0
+            st.session_state.text_jump = windows[0]['page'] or 1
+        st.session_state.text_window = max(0, min(st.session_state.text_window, len(windows) - 1))
+        
+        def show_window(index):
+            index = max(0, min(index, len(windows) - 1))
+            st.session_state.text_window = index
+            st.session_state.text_jump = windows[index]['page'] or index + 1
+        
+        def jump_to_page():
+            target = st.session_state.text_jump
+            index = page_window(windows, target) if windows[0]['page'] else target - 1
+            if index is not None:
+                show_window(index)
         
         st.markdown("### 📊 Text Overview")
         
@@ -128,6 +112,10 @@ if st.session_state.doc_data:
                 time_str = f"{reading_time:.1f}m"
             st.metric("⏱️ Reading Time", time_str)
         
+        if analysis['approximate']:
+            st.caption("ℹ️ Large document: word frequencies and unique words are estimates from a count-min sketch; "
+                       "other counts are exact.")
+        
         st.divider()
         
 
@@ -139,15 +127,16 @@ if st.session_state.doc_data:
             
             st.markdown('<div class="content-card">', unsafe_allow_html=True)
             
+            # Rank the vocabulary once for the table and the chart
+            top_words = heapq.nlargest(20, analysis['filtered_words'].items(), key=lambda x: x[1])
+            
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("#### 🔝 Most Frequent Words")
                 
-                if analysis['filtered_words']:
-                    top_words = dict(sorted(analysis['filtered_words'].items(), key=lambda x: x[1], reverse=True)[:20])
-                    
-                    word_df = pd.DataFrame(list(top_words.items()), columns=['Word', 'Frequency'])
+                if top_words:
+                    word_df = pd.DataFrame(top_words, columns=['Word', 'Frequency'])
                     word_df['Percentage'] = (word_df['Frequency'] / analysis['word_count'] * 100).round(2)
                     
                     st.dataframe(word_df, use_container_width=True)
@@ -165,17 +154,17 @@ if st.session_state.doc_data:
             with col2:
                 st.markdown("#### 📈 Word Statistics")
                 
-                unique_words = len(set(analysis['word_freq'].keys()))
-                avg_word_length = sum(len(word) * count for word, count in analysis['word_freq'].items()) / analysis['word_count'] if analysis['word_count'] > 0 else 0
+                unique_words = analysis['unique_words']
+                avg_word_length = analysis['avg_word_length']
                 
-                st.metric("🔤 Unique Words", f"{unique_words:,}")
+                st.metric("🔤 Unique Words", f"{'~' if analysis['approximate'] else ''}{unique_words:,}")
                 st.metric("📏 Avg Word Length", f"{avg_word_length:.1f} chars")
                 st.metric("📊 Vocabulary Richness", f"{(unique_words / analysis['word_count'] * 100):.1f}%" if analysis['word_count'] > 0 else "0%")
                 
-                if analysis['filtered_words']:
+                if top_words:
                     fig = px.bar(
-                        x=list(dict(sorted(analysis['filtered_words'].items(), key=lambda x: x[1], reverse=True)[:10]).values()),
-                        y=list(dict(sorted(analysis['filtered_words'].items(), key=lambda x: x[1], reverse=True)[:10]).keys()),
+                        x=[count for _, count in top_words[:10]],
+                        y=[word for word, _ in top_words[:10]],
                         orientation='h',
                         title="Top 10 Words"
                     )
@@ -190,49 +179,75 @@ if st.session_state.doc_data:
             
             st.markdown('<div class="content-card">', unsafe_allow_html=True)
             
+            def page_ref(occurrence):
+                return f" *(p. {occurrence['page']})*" if occurrence['page'] else ""
+            
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("#### 🔢 Numbers Found")
-                if analysis['numbers']:
-                    st.markdown(f"**Total Numbers:** {len(analysis['numbers'])}")
-                    numbers_to_show = analysis['numbers'][:20]
+                total = entities.count('numbers')
+                if total:
+                    st.markdown(f"**Total Numbers:** {total}")
+                    numbers_to_show = entities.values('numbers', limit=20)
                     st.markdown("**Sample Numbers:**")
                     st.code(", ".join(numbers_to_show))
-                    if len(analysis['numbers']) > 20:
-                        st.markdown(f"*... and {len(analysis['numbers']) - 20} more*")
+                    if total > 20:
+                        st.markdown(f"*... and {total - 20} more*")
                 else:
                     st.info("🔍 No numbers found in the text.")
                 
                 st.markdown("#### 📅 Dates Found")
-                if analysis['dates']:
-                    st.markdown(f"**Total Dates:** {len(analysis['dates'])}")
-                    for date in analysis['dates'][:10]:
-                        st.markdown(f"- {date}")
-                    if len(analysis['dates']) > 10:
-                        st.markdown(f"*... and {len(analysis['dates']) - 10} more*")
+                total = entities.count('dates')
+                if total:
+                    st.markdown(f"**Total Dates:** {total}")
+                    for date in entities.occurrences('dates', limit=10):
+                        st.markdown(f"- {date['value']}{page_ref(date)}")
+                    if total > 10:
+                        st.markdown(f"*... and {total - 10} more*")
                 else:
                     st.info("📅 No dates found in the text.")
             
             with col2:
                 st.markdown("#### 📧 Email Addresses")
-                if analysis['emails']:
-                    st.markdown(f"**Total Emails:** {len(analysis['emails'])}")
-                    for email in analysis['emails']:
-                        st.markdown(f"- {email}")
+                total = entities.count('emails')
+                if total:
+                    st.markdown(f"**Total Emails:** {total}")
+                    for email in entities.occurrences('emails'):
+                        st.markdown(f"- {email['value']}{page_ref(email)}")
                 else:
                     st.info("📧 No email addresses found.")
                 
                 st.markdown("#### 🌐 URLs Found")
-                if analysis['urls']:
-                    st.markdown(f"**Total URLs:** {len(analysis['urls'])}")
-                    for url in analysis['urls'][:5]:
-                        st.markdown(f"- {url}")
-                    if len(analysis['urls']) > 5:
-                        st.markdown(f"*... and {len(analysis['urls']) - 5} more*")
+                total = entities.count('urls')
+                if total:
+                    st.markdown(f"**Total URLs:** {total}")
+                    for url in entities.occurrences('urls', limit=5):
+                        st.markdown(f"- {url['value']}{page_ref(url)}")
+                    if total > 5:
+                        st.markdown(f"*... and {total - 5} more*")
                 else:
                     st.info("🌐 No URLs found in the text.")
             
+            st.markdown("#### 🔎 Find an Entity")
+            search = st.text_input("Number, date, email or URL", key="entity_search",
+                                   placeholder="e.g. 2024-01-31 or name@example.com")
+            if search:
+                found = entities.lookup(search)
+                if found:
+                    pages = entities.pages(search)
+                    where = f" on page{'s' if len(pages) > 1 else ''} {', '.join(map(str, pages))}" if pages else ""
+                    st.markdown(f"**{len(found)}** occurrence{'s' if len(found) > 1 else ''}{where}")
+                    for occurrence in found[:20]:
+                        st.markdown(f"- {ENTITY_LABELS[occurrence['kind']]}{page_ref(occurrence)}: "
+                                    f"{entities.context(occurrence)}")
+                    if len(found) > 20:
+                        st.markdown(f"*... and {len(found) - 20} more*")
+                    st.button("📄 Show first occurrence in Full Text", key="entity_show",
+                              on_click=show_window, args=(window_at(windows, found[0]['start']),))
+                else:
+                    st.info(f"🔍 '{search}' was not found as a number, date, email or URL.")
+            
             st.markdown('</div>', unsafe_allow_html=True)
         
         with tab3:
@@ -242,16 +257,18 @@ if st.session_state.doc_data:
             
             col1, col2, col3 = st.columns(3)
             
+            # Downloads that carry the full text are only built when clicked
             with col1:
                 st.download_button(
                     "📥 Download Text (TXT)",
-                    data=text_content,
+                    data=lambda: text_content,
                     file_name="extracted_text.txt",
                     mime="text/plain"
                 )
             
             with col2:
-                summary = f"""Text Analysis Summary
+                def build_summary():
+                    return f"""Text Analysis Summary
 Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 BASIC STATISTICS:
@@ -266,7 +283,7 @@ FULL TEXT:
 """
                 st.download_button(
                     "📊 Download Analysis Report",
-                    data=summary,
+                    data=build_summary,
                     file_name="text_analysis_report.txt",
                     mime="text/plain"
                 )
@@ -295,7 +312,33 @@ FULL TEXT:
                     mime="application/json"
                 )
             
-            st.text_area("📄 Document Text:", value=text_content, height=400)
+            # Only the current page (or part of a long page) is sent to the browser
+            index = st.session_state.text_window
+            window = windows[index]
+            pages = sorted({w['page'] for w in windows if w['page']})
+            
+            nav1, nav2, nav3 = st.columns([1, 2, 1])
+            with nav1:
+                st.button("⬅️ Previous", key="text_prev", disabled=index == 0,
+                          on_click=show_window, args=(index - 1,), use_container_width=True)
+            with nav2:
+                if len(pages) > 1:
+                    st.number_input(f"Jump to page ({pages[0]}–{pages[-1]})", min_value=pages[0], max_value=pages[-1],
+                                    step=1, key="text_jump", on_change=jump_to_page)
+                elif len(windows) > 1:
+                    st.number_input(f"Jump to part (1–{len(windows)})", min_value=1, max_value=len(windows),
+                                    step=1, key="text_jump", on_change=jump_to_page)
+            with nav3:
+                st.button("Next ➡️", key="text_next", disabled=index == len(windows) - 1,
+                          on_click=show_window, args=(index + 1,), use_container_width=True)
+            
+            st.caption(f"{window_label(windows, index)} · characters {window['start']:,}–{window['end']:,} "
+                       f"of {len(text_content):,}")
+            window_text = text_content[window['start']:window['end']]
+            if window_text.strip():
+                st.text_area("📄 Document Text:", value=window_text, height=400)
+            else:
+                st.info("📄 No text was extracted from this page.")
             
             st.markdown('</div>', unsafe_allow_html=True)
 
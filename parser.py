@@ -30,8 +30,13 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-def parse_document(file_bytes, filename):
-    """Main router function that parses a file from bytes and extracts content."""
+def parse_document(file_bytes, filename, on_text=None):
+    """Main router function that parses a file from bytes and extracts content.
+
+    on_text, when given, is called as on_text(text, part, parts) with consecutive
+    pieces of full_text as they are extracted: page by page for PDFs, all at once
+    for other formats.
+    """
     extension = os.path.splitext(filename)[1].lower()
     
     parsers = {
@@ -41,11 +46,19 @@ def parse_document(file_bytes, filename):
         '.txt': _parse_txt,
         '.html': _parse_html,
         '.htm': _parse_html,
-        '.csv': _parse_csv
+        '.csv': _parse_csv,
+        '.parquet': _parse_parquet,
+        '.feather': _parse_arrow,
+        '.arrow': _parse_arrow
     }
     
+    if extension == '.pdf':
+        return _parse_pdf(file_bytes, on_text)
     if extension in parsers:
-        return parsers[extension](file_bytes)
+        result = parsers[extension](file_bytes)
+        if on_text is not None:
+            on_text(result["full_text"], 1, 1)
+        return result
     else:
         logger.error(f"Unsupported file type: {extension}")
         return {
@@ -55,11 +68,13 @@ def parse_document(file_bytes, filename):
             "metadata": {"error": f"Unsupported format: {extension}"}
         }
 
-def _parse_pdf(file_bytes):
+def _parse_pdf(file_bytes, on_text=None):
     """Enhanced PDF parser with better data structuring."""
     all_text = ""
     all_tables = []
     image_files = []
+    # (page number, start, end) of each page's block in all_text
+    page_offsets = []
     metadata = {"pages": 0, "extraction_method": "pdfplumber + fitz", "images_found": 0}
     
     try:
@@ -69,10 +84,13 @@ def _parse_pdf(file_bytes):
             
             for i, page in enumerate(pdf.pages):
                 page_text = page.extract_text()
+                page_block = ""
                 if page_text:
-                    all_text += f"--- PAGE {i+1} ---\n"
-                    all_text += clean_text(page_text)
-                    all_text += f"\n--- END PAGE {i+1} ---\n\n"
+                    page_block = f"--- PAGE {i+1} ---\n{clean_text(page_text)}\n--- END PAGE {i+1} ---\n\n"
+                page_offsets.append((i + 1, len(all_text), len(all_text) + len(page_block)))
+                all_text += page_block
+                if on_text is not None:
+                    on_text(page_block, i + 1, len(pdf.pages))
                 
                 tables = page.extract_tables()
                 for table in tables:
@@ -130,6 +148,7 @@ def _parse_pdf(file_bytes):
         "full_text": all_text,
         "tables": all_tables,
         "image_files": image_files,
+        "page_offsets": page_offsets,
         "metadata": metadata
     }
 
@@ -374,6 +393,40 @@ def _parse_csv(file_bytes):
         "metadata": metadata
     }
 
+def _parse_columnar(file_bytes, file_format):
+    """Reload a Parquet or Arrow table exported earlier, without re-parsing the source."""
+    from table_export import read_columnar
+    all_tables = []
+    all_text = ""
+    metadata = {"extraction_method": f"{file_format}_reader"}
+    
+    try:
+        df, table_name = read_columnar(file_bytes, file_format)
+        cells = df.astype(object).where(df.notna(), '').astype(str)
+        all_tables.append([[str(c) for c in df.columns]] + cells.values.tolist())
+        all_text = cells.to_csv(index=False)
+        metadata["tables_found"] = 1
+        metadata["rows"] = len(df)
+        if table_name:
+            metadata["table_name"] = table_name
+        
+    except Exception as e:
+        logger.error(f"Error reading {file_format}: {e}")
+        metadata["extraction_error"] = str(e)
+    
+    return {
+        "full_text": clean_text(all_text),
+        "tables": all_tables,
+        "image_files": [],
+        "metadata": metadata
+    }
+
+def _parse_parquet(file_bytes):
+    return _parse_columnar(file_bytes, 'parquet')
+
+def _parse_arrow(file_bytes):
+    return _parse_columnar(file_bytes, 'feather')
+
 def _is_structured_data(text):
     """Detect if text contains structured data patterns."""
     if not text or len(text) < 10:
@@ -0,0 +1,170 @@
+"""
+Tables as paginated PDF: page-sized reportlab Table flowables with a repeating header row
+
+Each flowable holds about one page of rows with fixed row heights, so layout cost stays
+linear in the row count instead of re-measuring one huge text block. Run as a script to
+time a large table:
+
+    python pdf_export.py --rows 100000
+"""
+import io
+import time
+import logging
+import argparse
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    reportlab_available = True
+except ImportError:
+    logger.warning("reportlab not available. PDF export will be disabled.")
+    reportlab_available = False
+
+# Rows beyond this are left out, with a note saying so
+MAX_ROWS = 100_000
+FONT_NAME = 'Helvetica'
+FONT_SIZE = 7
+CELL_PADDING = 3
+ROW_HEIGHT = FONT_SIZE + 2 * CELL_PADDING
+MARGIN = 36
+# Padding reportlab's default Frame keeps inside the margins, top plus bottom
+FRAME_PADDING = 12
+# Rough Helvetica advance per character, as a share of the font size
+CHAR_WIDTH = 0.55
+MIN_COLUMN_CHARS = 4
+MAX_COLUMN_CHARS = 40
+
+def _cell_text(df):
+    """Every cell as a one-line string, missing values blank"""
+    cells = df.astype(object).where(df.notna(), '').astype(str)
+    # pdfplumber keeps line breaks inside cells; a row is one line high
+    return cells.apply(lambda column: column.str.replace(r'\s+', ' ', regex=True).str.strip())
+
+def estimate_column_chars(headers, cells):
+    """Characters to allow per column: its header or longest cell, within bounds"""
+    chars = []
+    for position, header in enumerate(headers):
+        longest = int(cells.iloc[:, position].str.len().max()) if len(cells) else 0
+        chars.append(min(max(len(str(header)), longest, MIN_COLUMN_CHARS), MAX_COLUMN_CHARS))
+    return chars
+
+def _layout(chars):
+    """Page size and column widths in points, going landscape and shrinking to fit"""
+    # One spare character covers bold headers and wide glyphs
+    widths = [(n + 1) * FONT_SIZE * CHAR_WIDTH + 2 * CELL_PADDING for n in chars]
+    pagesize = letter
+    if sum(widths) > letter[0] - 2 * MARGIN:
+        pagesize = landscape(letter)
+    available = pagesize[0] - 2 * MARGIN
+    if sum(widths) > available:
+        widths = [w * available / sum(widths) for w in widths]
+    return pagesize, widths
+
+def _truncate(cells, widths):
+    """Cut cells to what fits their column so every row stays one line high"""
+    fitted = {}
+    for position, width in enumerate(widths):
+        limit = max(int((width - 2 * CELL_PADDING) / (FONT_SIZE * CHAR_WIDTH)), 1)
+        column = cells.iloc[:, position]
+        long = column.str.len() > limit
+        if long.any():
+            column = column.where(~long, column.str.slice(0, max(limit - 1, 1)) + '…')
+        fitted[position] = column
+    return pd.DataFrame(fitted)
+
+def table_pdf(headers, df, title, subtitle=None, max_rows=MAX_ROWS, progress=None):
+    """PDF bytes for a table given its header labels and body rows
+
+    progress, when given, is called as progress(rows_done, rows_total) while pages
+    are laid out.
+    """
+    total_rows = len(df)
+    body = df.iloc[:max_rows] if max_rows is not None else df
+    cells = _cell_text(body)
+    headers = [' '.join(str(h).split()) for h in headers]
+    pagesize, widths = _layout(estimate_column_chars(headers, cells))
+    cells = _truncate(cells, widths)
+    # A table without columns still gets a PDF: its title and a note in place of the grid
+    header_cells = list(_truncate(pd.DataFrame([headers]), widths).iloc[0]) if headers else []
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=pagesize, leftMargin=MARGIN, rightMargin=MARGIN,
+                            topMargin=MARGIN, bottomMargin=MARGIN, title=title)
+    styles = getSampleStyleSheet()
+    story = [Paragraph(escape(title), styles['Title'])]
+    if subtitle:
+        story.append(Paragraph(escape(subtitle), styles['Heading2']))
+    if len(body) < total_rows:
+        story.append(Paragraph(f"Showing the first {len(body):,} of {total_rows:,} rows.", styles['Italic']))
+    story.append(Spacer(1, 8))
+
+    # Size chunks to whole pages (the first one shares its page with the title) so none has to split
+    title_height = sum(f.wrap(doc.width, doc.height)[1] + f.getSpaceBefore() + f.getSpaceAfter() for f in story)
+    rows_per_page = max(int((doc.height - FRAME_PADDING) // ROW_HEIGHT) - 1, 1)
+    first_rows = max(int((doc.height - FRAME_PADDING - title_height) // ROW_HEIGHT) - 1, 1)
+    style = TableStyle([
+        ('FONT', (0, 0), (-1, -1), FONT_NAME, FONT_SIZE),
+        ('FONT', (0, 0), (-1, 0), FONT_NAME + '-Bold', FONT_SIZE),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E8EEF7')),
+        ('LINEBELOW', (0, 0), (-1, 0), 0.5, colors.grey),
+        ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING - 1),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING + 1),
+        ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ])
+    values = cells.values.tolist() if headers else []
+    bounds = [0] + list(range(first_rows, len(values), rows_per_page)) + [len(values)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if start >= end:
+            continue
+        chunk = Table([header_cells] + values[start:end], colWidths=widths,
+                      rowHeights=ROW_HEIGHT, repeatRows=1, hAlign='LEFT')
+        chunk.setStyle(style)
+        chunk.rows_done = end
+        story.append(chunk)
+    if not values:
+        story.append(Paragraph("No rows.", styles['Normal']))
+
+    if progress is not None:
+        def after_flowable(flowable):
+            rows_done = getattr(flowable, 'rows_done', None)
+            if rows_done is not None:
+                progress(rows_done, len(values))
+        doc.afterFlowable = after_flowable
+
+    start = time.perf_counter()
+    doc.build(story)
+    logger.info(f"Built PDF for {title}: {len(values):,} rows in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return buffer.getvalue()
+
+def _benchmark(rows, columns):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({f"column_{i}": rng.uniform(0, 1e5, rows).round(2) for i in range(columns)})
+    df.insert(0, 'label', [f"row {i}" for i in range(rows)])
+
+    last = [0.0]
+    def report(done, total):
+        if done == total or time.perf_counter() - last[0] > 2:
+            last[0] = time.perf_counter()
+            print(f"  {done:,}/{total:,} rows")
+
+    start = time.perf_counter()
+    data = table_pdf(list(df.columns), df, "Benchmark", max_rows=None, progress=report)
+    elapsed = time.perf_counter() - start
+    print(f"{rows:,} rows x {columns + 1} columns: {elapsed:.2f}s, {rows / elapsed:,.0f} rows/s, {len(data) / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark paginated PDF table export")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--columns", type=int, default=5)
+    args = parser.parse_args()
+    _benchmark(args.rows, args.columns)
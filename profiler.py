@@ -0,0 +1,112 @@
+"""
+Document profile computed once at ingest: table schemas, text statistics and entities
+"""
+import time
+import logging
+
+import pandas as pd
+
+from offline_ai import offline_ai
+from numeric_parser import NULL_TOKENS, parse_numeric
+from text_analysis import get_text_analysis
+from entity_index import EntityIndex, with_pages
+from text_pages import page_spans
+
+logger = logging.getLogger(__name__)
+
+# A column is numeric when at least this share of its non-empty cells parse as numbers
+NUMERIC_THRESHOLD = 0.8
+
+def profile_column(name, series):
+    """Inferred dtype, null count, cardinality and range of one raw column"""
+    text = series.astype(str).str.strip()
+    nulls = text.str.lower().isin(NULL_TOKENS)
+    values = series[~nulls]
+    info = {
+        'name': name,
+        'nulls': int(nulls.sum()),
+        'non_null': int(len(values)),
+        'unique': int(values.astype(str).nunique()),
+    }
+    if values.empty:
+        info['dtype'] = 'empty'
+        return info
+
+    numeric = parse_numeric(values)
+    if numeric.notna().mean() >= NUMERIC_THRESHOLD:
+        numeric = numeric.dropna()
+        info['dtype'] = 'integer' if (numeric % 1 == 0).all() else 'float'
+        info.update(min=float(numeric.min()), max=float(numeric.max()),
+                    mean=float(numeric.mean()), sum=float(numeric.sum()))
+    else:
+        counts = values.astype(str).value_counts()
+        info['dtype'] = 'text'
+        info.update(min=str(counts.index.min()), max=str(counts.index.max()),
+                    top=str(counts.index[0]), top_count=int(counts.iloc[0]))
+    return info
+
+def profile_table(table):
+    """Shape and per-column schema of a raw list-of-lists table"""
+    headers = [str(h) for h in table[0]] if table else []
+    profile = {
+        'rows': max(len(table) - 1, 0),
+        'columns': len(headers),
+        'headers': headers,
+        'schema': [],
+        'numeric_columns': [],
+        'text_columns': [],
+    }
+    df = offline_ai.table_to_dataframe(table)
+    if df is None:
+        return profile
+
+    # The de-duplicated names, so every header maps to exactly one column
+    profile['headers'] = list(df.columns)
+    for position, name in enumerate(df.columns):
+        column = profile_column(name, df.iloc[:, position])
+        profile['schema'].append(column)
+        if column['dtype'] in ('integer', 'float'):
+            profile['numeric_columns'].append(name)
+        elif column['dtype'] == 'text':
+            profile['text_columns'].append(name)
+    return profile
+
+def build_profile(doc_data, analysis=None):
+    """Profile a parsed document; every page reads these facts instead of recomputing them
+
+    analysis is the text analysis when it was already gathered during parsing.
+    """
+    start = time.perf_counter()
+    metadata = doc_data.get('metadata', {})
+    text = doc_data.get('full_text', '') or ''
+    if analysis is None:
+        analysis = get_text_analysis(text, doc_data.get('doc_hash'))
+    stats = analysis['text']
+
+    profile = {
+        'pages': metadata.get('pages') or metadata.get('slides'),
+        'extraction_method': metadata.get('extraction_method'),
+        'characters': stats['char_count'],
+        'words': stats['word_count'],
+        'images': len(doc_data.get('image_files', [])),
+        'tables': [profile_table(table) for table in doc_data.get('tables', [])],
+        'text': stats,
+        # PDFs record page spans; other formats fall back to their PAGE/SLIDE markers
+        'entities': with_pages(analysis['entities'], page_spans(text, doc_data.get('page_offsets'))),
+    }
+    profile['build_ms'] = (time.perf_counter() - start) * 1000
+    logger.info(f"Profiled document ({len(profile['tables'])} tables, {stats['word_count']:,} words) in {profile['build_ms']:.1f} ms")
+    return profile
+
+def get_document_profile(doc_data):
+    """Profile for the document, built on first use when ingest did not create one"""
+    if not doc_data.get('profile'):
+        doc_data['profile'] = build_profile(doc_data)
+    return doc_data['profile']
+
+def get_entity_index(doc_data):
+    """Lookups over the entities recorded in the document profile"""
+    if doc_data.get('entity_index') is None:
+        entities = get_document_profile(doc_data)['entities']
+        doc_data['entity_index'] = EntityIndex(doc_data.get('full_text', '') or '', entities)
+    return doc_data['entity_index']
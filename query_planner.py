@@ -0,0 +1,373 @@
+"""
+Query planning: route each question to the cheapest engine that can answer it
+"""
+import re
+import time
+import logging
+
+import pandas as pd
+
+import llm_handler
+import retrieval
+from offline_ai import offline_ai
+from context_builder import ContextBuilder, compress_table
+from profiler import get_document_profile, get_entity_index
+from text_analysis import ENTITY_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Tiers in cost order; the LLM is only asked when nothing local can answer
+TIERS = ['metadata', 'table_compute', 'table_lookup', 'extractive', 'llm']
+TIER_LABELS = {
+    'metadata': '📋 Document profile',
+    'table_compute': '🧮 Local table engine',
+    'table_lookup': '📊 Table lookup',
+    'extractive': '🔎 Retrieval + extractive answer',
+    'llm': '🤖 Language model'
+}
+
+TABLE_WORDS = ['table', 'data', 'row', 'column', 'chart', 'extract', 'show']
+IMAGE_WORDS = ['image', 'picture', 'photo', 'figure']
+SUMMARY_PATTERN = re.compile(r'\b(summar\w*|overview|main points|key points|key findings|main topics|tl;?dr)\b')
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+QUERY_FILLER = {
+    'where', 'when', 'why', 'whom', 'whose', 'tell', 'show', 'explain', 'describe', 'document',
+    'say', 'says', 'mention', 'mentioned', 'please', 'give', 'find', 'talk', 'talks', 'there',
+    'any', 'many', 'much', 'can', 'could', 'would', 'should', 'list', 'this', 'these', 'those'
+}
+EXTRACTIVE_MIN_COVERAGE = 0.75
+ENTITY_WORDS = {
+    'emails': r'e-?mails?(?: addresses)?|email addresses',
+    'urls': r'urls?|links|websites',
+    'dates': r'dates',
+}
+ENTITY_LISTING = re.compile(
+    r'\b(how many|what|which|list(?: the| all)?|show(?: me)?(?: the| all)?|all(?: the)?|any)\s+(?:the\s+)?('
+    + '|'.join(ENTITY_WORDS.values()) + r')\b'
+)
+ENTITY_LOCATION = re.compile(r'\b(where|which pages?|what pages?|mention\w*|appear\w*|occur\w*|find)\b')
+# Entities listed in one answer
+MAX_LISTED_ENTITIES = 20
+
+def new_results():
+    """Empty result dict shared by every tier"""
+    return {
+        'type': 'text',
+        'content': '',
+        'tables': [],
+        'images': [],
+        'specific_data': None,
+        'token_usage': None,
+        'stream': None,
+        'tier': None,
+        'elapsed_ms': None
+    }
+
+def plan_query(query, doc_data):
+    """Ordered list of tiers worth trying for this query"""
+    query_lower = query.lower()
+    has_tables = bool(doc_data.get('tables'))
+    plan = ['metadata']
+    if has_tables:
+        plan.append('table_compute')
+        if 'table' in query_lower:
+            plan.append('table_lookup')
+    # Questions about table contents or images need structured context, not a text snippet
+    if not any(word in query_lower for word in TABLE_WORDS + IMAGE_WORDS):
+        plan.append('extractive')
+    plan.append('llm')
+    return plan
+
+def answer_query(query, doc_data, should_cancel=None):
+    """Run the plan, stopping at the first tier that produces an answer"""
+    start = time.perf_counter()
+    llm_handler.last_token_usage.clear()
+    plan = plan_query(query, doc_data)
+
+    for tier in plan:
+        results = TIER_HANDLERS[tier](query, doc_data, should_cancel)
+        if results is not None:
+            results['tier'] = tier
+            results['elapsed_ms'] = (time.perf_counter() - start) * 1000
+            # Only report usage when this query actually built an LLM prompt
+            results['token_usage'] = dict(llm_handler.last_token_usage) or None
+            logger.info(f"Query answered by tier '{tier}' in {results['elapsed_ms']:.1f} ms (plan: {' > '.join(plan)})")
+            return results
+    return None
+
+def _metadata_answer(query, doc_data, should_cancel=None):
+    """Counts, listings and document facts straight from the profile"""
+    query_lower = query.lower().strip(' ?.!')
+    profile = get_document_profile(doc_data)
+    results = new_results()
+    tables = profile['tables']
+
+    shape = re.match(r'^how many (rows|columns) (?:are )?(?:there )?(?:in|does) table (\d+)(?: have)?$', query_lower)
+    if shape:
+        idx = int(shape.group(2)) - 1
+        if 0 <= idx < len(tables):
+            results['type'] = 'table'
+            results['content'] = f"Table {idx + 1} has {tables[idx][shape.group(1)]:,} {shape.group(1)}."
+            return results
+        return None
+
+    if re.search(r'\bhow many (pages|slides)\b', query_lower) and profile.get('pages'):
+        results['content'] = f"The document has {profile['pages']:,} pages."
+        return results
+
+    if re.search(r'\bhow many (words|characters)\b', query_lower):
+        results['content'] = f"The document contains {profile['words']:,} words ({profile['characters']:,} characters)."
+        return results
+
+    if re.search(r'\b(how many tables|all tables|what tables|which tables|list (?:the |all )?tables)\b', query_lower):
+        results['type'] = 'table'
+        results['tables'] = doc_data.get('tables', [])
+        overview = [f"Document contains {len(tables)} tables:\n"]
+        for i, info in enumerate(tables):
+            headers = info['headers']
+            overview.append(f"Table {i+1}: {info['rows']} rows, {info['columns']} columns")
+            if headers:
+                overview.append(f"  Headers: {', '.join(headers[:5])}{'...' if len(headers) > 5 else ''}")
+        results['content'] = "\n".join(overview)
+        return results
+
+    if re.search(r'\b(how many|what|which|list(?: the| all)?)\s+(images|pictures|photos|figures)\b', query_lower):
+        results['type'] = 'image'
+        results['images'] = doc_data.get('image_descriptions', [])
+        if not results['images']:
+            results['content'] = "No images found in the document."
+        else:
+            lines = [f"The document contains {len(results['images'])} images:"]
+            lines.extend(f"Image {i+1}: {img.get('description', 'No description')}" for i, img in enumerate(results['images']))
+            results['content'] = "\n".join(lines)
+        return results
+
+    entity_answer = _entity_answer(query, query_lower, doc_data)
+    if entity_answer:
+        results['content'] = entity_answer
+        return results
+
+    # Only questions about the uploaded file itself, not "what format are the dates in"
+    if re.search(r'\b(file ?name|document name|file type|(?:file|document) format'
+                 r'|(?:what|which) (?:format|kind of file|type of file) is (?:this|the) (?:file|document))\b', query_lower):
+        name = doc_data.get('filename') or 'the uploaded document'
+        results['content'] = f"{name} was parsed with {profile.get('extraction_method') or 'an unknown method'}."
+        return results
+
+    return None
+
+def _entity_answer(query, query_lower, doc_data):
+    """Listings and locations of emails, URLs and dates from the ingest-time entity index"""
+    listing = ENTITY_LISTING.search(query_lower)
+    mentioned = [(kind, match.group()) for kind in ('emails', 'urls', 'dates')
+                 for match in ENTITY_PATTERNS[kind].finditer(query)]
+    if not listing and not (mentioned and ENTITY_LOCATION.search(query_lower)):
+        return None
+    entities = get_entity_index(doc_data)
+
+    def page_ref(occurrence):
+        return f" (page {occurrence['page']})" if occurrence['page'] else ""
+
+    if mentioned:
+        lines = []
+        for kind, value in mentioned:
+            found = entities.lookup(value, kind)
+            if not found:
+                lines.append(f"{value} does not appear in the document.")
+                continue
+            pages = entities.pages(value, kind)
+            where = f" on page{'s' if len(pages) > 1 else ''} {', '.join(map(str, pages))}" if pages else ""
+            lines.append(f"{value} appears {len(found)} time{'s' if len(found) > 1 else ''}{where}:")
+            lines.extend(f"- {entities.context(occurrence)}{page_ref(occurrence)}" for occurrence in found[:5])
+        return "\n".join(lines)
+
+    word = listing.group(2)
+    kind = next(kind for kind, pattern in ENTITY_WORDS.items() if re.fullmatch(pattern, word))
+    total = entities.count(kind)
+    if not total:
+        return f"No {word} were found in the document."
+    distinct = entities.distinct(kind)
+    if listing.group(1) == 'how many':
+        return f"The document mentions {total:,} {word} ({len(distinct):,} distinct)."
+    lines = [f"The document mentions {total:,} {word} ({len(distinct):,} distinct):"]
+    seen = set()
+    for occurrence in entities.occurrences(kind):
+        key = occurrence['value'].lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        pages = entities.pages(key, kind)
+        where = f" (page{'s' if len(pages) > 1 else ''} {', '.join(map(str, pages))})" if pages else ""
+        lines.append(f"- {occurrence['value']}{where}")
+        if len(seen) == MAX_LISTED_ENTITIES:
+            break
+    if len(distinct) > MAX_LISTED_ENTITIES:
+        lines.append(f"... and {len(distinct) - MAX_LISTED_ENTITIES:,} more")
+    return "\n".join(lines)
+
+def _table_compute_answer(query, doc_data, should_cancel=None):
+    """Exact aggregations computed with pandas"""
+    computed = offline_ai.answer_table_query(query, doc_data.get('tables', []))
+    if not computed:
+        return None
+    results = new_results()
+    results['type'] = 'table'
+    results['content'] = computed['answer']
+    results['specific_data'] = f"Computed locally from Table {computed['table_index'] + 1} in {computed['elapsed_ms']:.1f} ms"
+    if isinstance(computed['result'], pd.DataFrame):
+        frame = computed['result']
+        results['tables'] = [[list(frame.columns)] + frame.astype(str).values.tolist()]
+    return results
+
+def _table_lookup_answer(query, doc_data, should_cancel=None):
+    """A specific table by number or by size"""
+    query_lower = query.lower()
+    tables = doc_data.get('tables', [])
+    results = new_results()
+    results['type'] = 'table'
+
+    # Specific table number
+    table_nums = re.findall(r'table\s*(\d+)', query_lower)
+    if table_nums:
+        table_idx = int(table_nums[0]) - 1
+        if not 0 <= table_idx < len(tables):
+            return None
+        results['tables'] = [tables[table_idx]]
+        results['specific_data'] = f"Table {table_nums[0]}"
+
+        # Enhanced table analysis
+        table = tables[table_idx]
+        headers = table[0] if table else []
+
+        analysis = f"Table {table_nums[0]} Analysis:\n"
+        analysis += f"- Rows: {max(len(table) - 1, 0)}\n"
+        analysis += f"- Columns: {len(headers)}\n"
+        analysis += f"- Headers: {', '.join(str(h) for h in headers)}\n"
+
+        # Column types from the ingest-time profile
+        profile = get_document_profile(doc_data)['tables'][table_idx]
+        if profile['numeric_columns']:
+            analysis += f"- Numeric columns: {', '.join(profile['numeric_columns'])}\n"
+        if profile['text_columns']:
+            analysis += f"- Text columns: {', '.join(profile['text_columns'])}\n"
+
+        results['content'] = analysis
+        return results
+
+    # Size-based queries
+    if any(phrase in query_lower for phrase in ['more rows', 'most rows', 'largest', 'biggest']):
+        largest_idx = max(range(len(tables)), key=lambda i: len(tables[i]))
+        results['tables'] = [tables[largest_idx]]
+        results['specific_data'] = f"Largest table (Table {largest_idx + 1})"
+        results['content'] = f"Found the largest table: Table {largest_idx + 1} with {max(len(tables[largest_idx]) - 1, 0)} rows and {len(tables[largest_idx][0]) if tables[largest_idx] else 0} columns."
+        return results
+
+    if any(phrase in query_lower for phrase in ['fewer rows', 'smallest', 'least rows']):
+        smallest_idx = min(range(len(tables)), key=lambda i: len(tables[i]))
+        results['tables'] = [tables[smallest_idx]]
+        results['specific_data'] = f"Smallest table (Table {smallest_idx + 1})"
+        results['content'] = f"Found the smallest table: Table {smallest_idx + 1} with {max(len(tables[smallest_idx]) - 1, 0)} rows and {len(tables[smallest_idx][0]) if tables[smallest_idx] else 0} columns."
+        return results
+
+    return None
+
+def _extractive_answer(query, doc_data, should_cancel=None):
+    """Answer with the best matching sentence when it covers the question's key terms"""
+    if SUMMARY_PATTERN.search(query.lower()):
+        return _extractive_summary(doc_data)
+
+    terms = set(retrieval.tokenize(query)) - QUERY_FILLER
+    if not terms:
+        return None
+
+    index = retrieval.get_document_index(doc_data)
+    total_weight = sum(index.idf(term) for term in terms)
+    best = None
+    for chunk, _ in retrieval.hybrid_search(doc_data, query, top_k=5):
+        if chunk['source'] != 'text':
+            continue
+        for sentence in SENTENCE_SPLIT.split(chunk['text']):
+            covered = terms & set(retrieval.tokenize(sentence))
+            coverage = sum(index.idf(term) for term in covered) / total_weight
+            if best is None or coverage > best[0]:
+                best = (coverage, sentence.strip(), chunk.get('page'))
+
+    if best is None or best[0] < EXTRACTIVE_MIN_COVERAGE:
+        return None
+
+    coverage, sentence, page = best
+    results = new_results()
+    results['content'] = sentence + (f" (page {page})" if page is not None else "")
+    results['specific_data'] = f"Extracted from the document ({coverage:.0%} of key terms matched)"
+    return results
+
+def _extractive_summary(doc_data, n_sentences=3, max_chunks=400):
+    """Pick the most central sentences, scored by how widely their terms occur across chunks"""
+    index = retrieval.get_document_index(doc_data)
+    candidates = []
+    text_chunks = [c for c in index.chunks if c['source'] == 'text'][:max_chunks]
+    for position, chunk in enumerate(text_chunks):
+        for sentence in SENTENCE_SPLIT.split(chunk['text']):
+            words = retrieval.tokenize(sentence)
+            if not words or not 8 <= len(sentence.split()) <= 40:
+                continue
+            score = sum(min(index.document_frequency(w), 50) for w in words) / len(words)
+            candidates.append((score, position, sentence.strip()))
+
+    if not candidates:
+        return None
+
+    top = sorted(candidates, reverse=True)[:n_sentences]
+    results = new_results()
+    results['content'] = "Summary: " + " ".join(sentence for _, _, sentence in sorted(top, key=lambda c: c[1]))
+    results['specific_data'] = "Extractive summary of the most representative sentences"
+    return results
+
+def _llm_answer(query, doc_data, should_cancel=None):
+    """Last resort: stream an answer from the language model with budgeted context"""
+    query_lower = query.lower()
+    results = new_results()
+
+    def build_enhanced_context(token_budget=350, semantic=False):
+        return retrieval.retrieve_context(doc_data, query, top_k=5, token_budget=token_budget, semantic=semantic)
+
+    if any(word in query_lower for word in TABLE_WORDS):
+        results['type'] = 'table'
+        results['tables'] = doc_data.get('tables', [])
+        if not results['tables']:
+            results['content'] = "No tables found in the document."
+            return results
+
+        # Compressed tables first, retrieved passages fill whatever budget is left
+        builder = ContextBuilder(llm_handler.TEXT_MODEL)
+        for i, table in enumerate(results['tables']):
+            builder.add(compress_table(table, f"Table {i+1}"), priority=0, label=f"table_{i+1}")
+        builder.add(build_enhanced_context(), priority=1, label="retrieved")
+
+        prompt = f"Based on the table data, answer the user's question: '{query}'. Provide accurate calculations and specific answers based on the actual data shown."
+        results['stream'] = llm_handler.stream_text_response(prompt, builder, should_cancel=should_cancel)
+        return results
+
+    if any(word in query_lower for word in IMAGE_WORDS):
+        results['type'] = 'image'
+        results['images'] = doc_data.get('image_descriptions', [])
+        if not results['images']:
+            results['content'] = "No images found in the document."
+            return results
+
+        image_context = f"Found {len(results['images'])} images:\n\n"
+        for i, img in enumerate(results['images']):
+            image_context += f"Image {i+1}: {img.get('description', 'No description')}\n"
+        results['content'] = llm_handler.get_image_query_response(f"{query}\n\nContext: {image_context}", results['images'])
+        return results
+
+    results['stream'] = llm_handler.stream_text_response(query, build_enhanced_context(semantic=True), should_cancel=should_cancel)
+    return results
+
+TIER_HANDLERS = {
+    'metadata': _metadata_answer,
+    'table_compute': _table_compute_answer,
+    'table_lookup': _table_lookup_answer,
+    'extractive': _extractive_answer,
+    'llm': _llm_answer
+}
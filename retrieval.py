@@ -0,0 +1,423 @@
+"""
+Document chunking and BM25 retrieval for grounding AI answers
+"""
+import re
+import os
+import math
+import json
+import time
+import zlib
+import logging
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+from context_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+PAGE_MARKER = re.compile(r'---\s*(?:PAGE|SLIDE)\s+(\d+)\s*---')
+END_MARKER = re.compile(r'---\s*END\s+(?:PAGE|SLIDE)\s+\d+\s*---')
+TOKEN_PATTERN = re.compile(r'\w+')
+# Cached document vectors live outside the working tree
+VECTOR_CACHE_DIR = os.path.join(tempfile.gettempdir(), "arixstructure_vector_cache")
+
+STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'was', 'were', 'be', 'been', 'it', 'this', 'that', 'what', 'which', 'who',
+    'how', 'do', 'does', 'did', 'me', 'about', 'from', 'as', 'i', 'you', 'we', 'they'
+}
+
+def tokenize(text):
+    """Lowercase word tokens without stop words"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOP_WORDS]
+
+def split_pages(full_text):
+    """Split text on page/slide markers into (page_number, text) pairs"""
+    markers = list(PAGE_MARKER.finditer(full_text))
+    if not markers:
+        return [(None, full_text)]
+
+    pages = []
+    preamble = full_text[:markers[0].start()].strip()
+    if preamble:
+        pages.append((None, preamble))
+
+    for i, match in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(full_text)
+        page_text = END_MARKER.sub(' ', full_text[match.end():end]).strip()
+        if page_text:
+            pages.append((int(match.group(1)), page_text))
+    return pages
+
+def chunk_document(doc_data, max_words=100):
+    """Build retrieval chunks from text pages, tables and image captions"""
+    chunks = []
+
+    for page, page_text in split_pages(doc_data.get('full_text', '') or ''):
+        words = page_text.split()
+        for start in range(0, len(words), max_words):
+            chunks.append({
+                'text': ' '.join(words[start:start + max_words]),
+                'page': page,
+                'source': 'text'
+            })
+
+    for table_idx, table in enumerate(doc_data.get('tables', []) or []):
+        if not table:
+            continue
+        header = ' | '.join(str(h) for h in table[0])
+        rows, row_words = [], 0
+        for row in table[1:] or [[]]:
+            line = ' | '.join(str(cell) for cell in row)
+            rows.append(line)
+            row_words += len(line.split())
+            if row_words >= max_words:
+                chunks.append({'text': f"Table {table_idx+1}: {header}\n" + '\n'.join(rows), 'page': None, 'source': 'table', 'table': table_idx})
+                rows, row_words = [], 0
+        if rows:
+            chunks.append({'text': f"Table {table_idx+1}: {header}\n" + '\n'.join(rows), 'page': None, 'source': 'table', 'table': table_idx})
+
+    for img_idx, img in enumerate(doc_data.get('image_descriptions', []) or []):
+        description = img.get('description', '')
+        if description:
+            chunks.append({'text': f"Image {img_idx+1}: {description}", 'page': None, 'source': 'image'})
+
+    return chunks
+
+class BM25Index:
+    """In-memory BM25 inverted index over document chunks"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.build_time = 0.0
+        self.last_query_time = 0.0
+        self._build()
+
+    def _build(self):
+        start = time.perf_counter()
+
+        postings = {}
+        lengths = np.zeros(len(self.chunks), dtype=np.float32)
+        for chunk_id, chunk in enumerate(self.chunks):
+            terms = tokenize(chunk['text'])
+            lengths[chunk_id] = len(terms)
+            for term, tf in Counter(terms).items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(chunk_id)
+                postings[term][1].append(tf)
+
+        n_chunks = len(self.chunks)
+        avg_length = float(lengths.mean()) if n_chunks else 0.0
+        # Length normalisation is per chunk, so fold it in once at build time
+        self._norm = self.k1 * (1 - self.b + self.b * lengths / avg_length) if avg_length else lengths
+
+        self._postings = {}
+        for term, (ids, tfs) in postings.items():
+            df = len(ids)
+            idf = math.log(1 + (n_chunks - df + 0.5) / (df + 0.5))
+            self._postings[term] = (np.array(ids, dtype=np.int32), np.array(tfs, dtype=np.float32), idf)
+
+        self.build_time = time.perf_counter() - start
+        logger.info(f"BM25 index built: {n_chunks} chunks, {len(self._postings)} terms in {self.build_time*1000:.1f} ms")
+
+    def idf(self, term):
+        """Inverse document frequency of a term; unseen terms get the maximum weight"""
+        if term in self._postings:
+            return self._postings[term][2]
+        return math.log(1 + (len(self.chunks) + 0.5) / 0.5)
+
+    def document_frequency(self, term):
+        """Number of chunks containing a term"""
+        return len(self._postings[term][0]) if term in self._postings else 0
+
+    def search(self, query, top_k=5):
+        """Return the top_k (chunk, score) pairs for a query"""
+        start = time.perf_counter()
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            ids, tfs, idf = self._postings[term]
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self._norm[ids])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k)[:top_k]]
+        ranked = matched[np.argsort(-scores[matched])]
+
+        self.last_query_time = time.perf_counter() - start
+        logger.info(f"BM25 query matched {len(ranked)} chunks in {self.last_query_time*1000:.2f} ms")
+        return [(self.chunks[i], float(scores[i])) for i in ranked]
+
+def get_document_index(doc_data):
+    """Return the document's BM25 index, building it once per document"""
+    index = doc_data.get('search_index')
+    if index is None:
+        index = BM25Index(chunk_document(doc_data))
+        doc_data['search_index'] = index
+    return index
+
+class HashingVectorIndex:
+    """Local semantic index: hashed word + character trigram TF-IDF vectors with cosine search"""
+
+    def __init__(self, chunks, n_features=2**18, use_lsh=None, n_bits=12, n_tables=4):
+        self.chunks = chunks
+        self.n_features = n_features
+        self.build_time = 0.0
+        self.last_query_time = 0.0
+        self._feature_cache = {}
+        self.lsh_tables = None
+        self.lsh_codes = None
+        if chunks:
+            self._build()
+            # Exact search stays fast up to a few hundred thousand chunks
+            if use_lsh or (use_lsh is None and len(chunks) > 200_000):
+                self._build_lsh(n_bits, n_tables)
+
+    def _token_features(self, token):
+        """Stable hashed feature ids and signs for a token and its character trigrams"""
+        features = self._feature_cache.get(token)
+        if features is None:
+            padded = f"<{token}>"
+            grams = [token] + [padded[i:i + 3] for i in range(len(padded) - 2)]
+            features = []
+            for position, gram in enumerate(grams):
+                h = zlib.crc32(gram.encode('utf-8'))
+                weight = 1.0 if position == 0 else 0.5
+                features.append((h % self.n_features, weight if (h >> 31) & 1 else -weight))
+            self._feature_cache[token] = features
+        return features
+
+    def _raw_vector(self, text):
+        """Sparse term-frequency vector as {feature: value}"""
+        vector = {}
+        for token, count in Counter(tokenize(text)).items():
+            tf = 1.0 + math.log(count)
+            for feature, weight in self._token_features(token):
+                vector[feature] = vector.get(feature, 0.0) + weight * tf
+        return vector
+
+    def _build(self):
+        start = time.perf_counter()
+
+        rows = [self._raw_vector(chunk['text']) for chunk in self.chunks]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        indices = np.fromiter((f for row in rows for f in row), dtype=np.int32, count=indptr[-1])
+        data = np.fromiter((v for row in rows for v in row.values()), dtype=np.float32, count=indptr[-1])
+
+        df = np.bincount(indices, minlength=self.n_features).astype(np.float32)
+        self.idf = np.log((1 + len(rows)) / (1 + df)).astype(np.float32) + 1.0
+        self._set_matrix(indptr, indices, data * self.idf[indices])
+
+        self.build_time = time.perf_counter() - start
+        logger.info(f"Vector index built: {len(rows)} chunks, {len(data):,} non-zeros in {self.build_time*1000:.1f} ms")
+
+    def _set_matrix(self, indptr, indices, data):
+        """Store an L2-normalised CSR matrix"""
+        row_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        norms = np.sqrt(np.bincount(row_ids, weights=data.astype(np.float64) ** 2, minlength=len(indptr) - 1))
+        norms[norms == 0] = 1.0
+        self.indptr = indptr
+        self.indices = indices
+        self.data = (data / norms[row_ids]).astype(np.float32)
+
+    def _query_matrix(self, queries):
+        """Dense, normalised query vectors of shape (n_queries, n_features)"""
+        matrix = np.zeros((len(queries), self.n_features), dtype=np.float32)
+        for i, query in enumerate(queries):
+            for feature, value in self._raw_vector(query).items():
+                matrix[i, feature] = value * self.idf[feature]
+            norm = np.linalg.norm(matrix[i])
+            if norm > 0:
+                matrix[i] /= norm
+        return matrix
+
+    def _scores(self, query_matrix, rows=None):
+        """Cosine scores of each query against every row (or the given rows)"""
+        indptr, indices, data = self.indptr, self.indices, self.data
+        if rows is not None:
+            spans = [np.arange(indptr[r], indptr[r + 1]) for r in rows]
+            lengths = np.array([len(span) for span in spans], dtype=np.int64)
+            gather = np.concatenate(spans) if spans else np.zeros(0, dtype=np.int64)
+            indptr = np.concatenate([[0], np.cumsum(lengths)])
+            indices, data = indices[gather], data[gather]
+
+        products = query_matrix[:, indices] * data
+        # reduceat needs a valid start for empty trailing rows, so pad with one zero column
+        products = np.concatenate([products, np.zeros((len(query_matrix), 1), dtype=np.float32)], axis=1)
+        starts = indptr[:-1]
+        scores = np.add.reduceat(products, np.minimum(starts, len(indices)), axis=1)
+        scores[:, starts == indptr[1:]] = 0.0
+        return scores
+
+    def _lsh_planes(self, n_bits, n_tables):
+        """Random hyperplanes, drawn from a fixed seed so saved bucket codes stay valid"""
+        rng = np.random.default_rng(0)
+        self._planes = rng.standard_normal((n_tables, self.n_features, n_bits)).astype(np.float32)
+
+    def _set_lsh_tables(self, codes):
+        """Bucket tables {code: rows}, one per row of bucket codes"""
+        self.lsh_codes = codes
+        self.lsh_tables = []
+        for table_codes in codes:
+            order = np.argsort(table_codes, kind='stable')
+            unique_codes, starts = np.unique(table_codes[order], return_index=True)
+            self.lsh_tables.append({int(code): rows for code, rows in zip(unique_codes, np.split(order, starts[1:]))})
+
+    def _build_lsh(self, n_bits, n_tables, block_rows=50_000):
+        """Random-projection LSH tables for sub-linear candidate lookup"""
+        self._lsh_planes(n_bits, n_tables)
+        weights = 1 << np.arange(n_bits)
+
+        all_codes = np.zeros((n_tables, len(self.chunks)), dtype=np.int64)
+        for planes, codes in zip(self._planes, all_codes):
+            # Project in row blocks so memory stays bounded for millions of chunks
+            for first in range(0, len(self.chunks), block_rows):
+                last = min(first + block_rows, len(self.chunks))
+                lo, hi = self.indptr[first], self.indptr[last]
+                local_rows = np.repeat(np.arange(last - first), np.diff(self.indptr[first:last + 1]))
+                projected = np.zeros((last - first, n_bits), dtype=np.float32)
+                np.add.at(projected, local_rows, self.data[lo:hi, None] * planes[self.indices[lo:hi]])
+                codes[first:last] = (projected > 0).astype(np.int64) @ weights
+        self._set_lsh_tables(all_codes)
+
+    def _lsh_candidates(self, query_vector):
+        """Rows sharing a bucket (or a one-bit neighbour) with the query in any table"""
+        candidates = []
+        n_bits = self._planes.shape[2]
+        for planes, table in zip(self._planes, self.lsh_tables):
+            code = int(((query_vector @ planes) > 0).astype(np.int64) @ (1 << np.arange(n_bits)))
+            for probe in [code] + [code ^ (1 << bit) for bit in range(n_bits)]:
+                if probe in table:
+                    candidates.append(table[probe])
+        return np.unique(np.concatenate(candidates)) if candidates else np.zeros(0, dtype=np.int64)
+
+    def search_batch(self, queries, top_k=5, batch_size=16):
+        """Return the top_k (chunk, score) pairs for each query"""
+        start = time.perf_counter()
+        results = []
+
+        for offset in range(0, len(queries), batch_size):
+            query_matrix = self._query_matrix(queries[offset:offset + batch_size])
+            if self.lsh_tables is None:
+                all_scores = self._scores(query_matrix)
+                candidate_sets = [None] * len(query_matrix)
+            else:
+                candidate_sets = [self._lsh_candidates(vector) for vector in query_matrix]
+                all_scores = [self._scores(vector[None, :], rows)[0] for vector, rows in zip(query_matrix, candidate_sets)]
+
+            for scores, rows in zip(all_scores, candidate_sets):
+                k = min(top_k, len(scores))
+                best = np.argpartition(-scores, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+                best = best[np.argsort(-scores[best])]
+                row_ids = best if rows is None else rows[best]
+                results.append([(self.chunks[r], float(scores[b])) for r, b in zip(row_ids, best) if scores[b] > 0])
+
+        self.last_query_time = time.perf_counter() - start
+        logger.info(f"Vector search for {len(queries)} queries took {self.last_query_time*1000:.2f} ms")
+        return results
+
+    def search(self, query, top_k=5):
+        """Return the top_k (chunk, score) pairs for a single query"""
+        if not self.chunks:
+            return []
+        return self.search_batch([query], top_k=top_k)[0]
+
+    def save(self, path):
+        """Persist vectors, chunks and any LSH bucket codes"""
+        lsh = {} if self.lsh_codes is None else {'lsh_codes': self.lsh_codes,
+                                                 'lsh_bits': np.array(self._planes.shape[2])}
+        np.savez_compressed(
+            path,
+            indptr=self.indptr, indices=self.indices, data=self.data, idf=self.idf,
+            n_features=np.array(self.n_features),
+            chunks=np.array(json.dumps(self.chunks)),
+            **lsh
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Restore an index saved with save()"""
+        with np.load(path, allow_pickle=False) as stored:
+            index = cls([], n_features=int(stored['n_features']))
+            index.chunks = json.loads(str(stored['chunks']))
+            index.idf = stored['idf']
+            index.indptr, index.indices, index.data = stored['indptr'], stored['indices'], stored['data']
+            if 'lsh_codes' in stored:
+                codes = stored['lsh_codes']
+                index._lsh_planes(int(stored['lsh_bits']), len(codes))
+                index._set_lsh_tables(codes)
+        return index
+
+def get_semantic_index(doc_data, cache_dir=VECTOR_CACHE_DIR):
+    """Return the document's vector index, loading cached embeddings when available"""
+    index = doc_data.get('semantic_index')
+    if index is not None:
+        return index
+
+    doc_hash = doc_data.get('doc_hash')
+    cache_path = os.path.join(cache_dir, f"{doc_hash}.npz") if doc_hash else None
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            index = HashingVectorIndex.load(cache_path)
+            logger.info(f"Loaded cached document embeddings from {cache_path}")
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load cached embeddings: {e}")
+
+    if index is None:
+        index = HashingVectorIndex(chunk_document(doc_data))
+        if cache_path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                index.save(cache_path)
+            except OSError as e:
+                logger.warning(f"Could not persist document embeddings: {e}")
+
+    doc_data['semantic_index'] = index
+    return index
+
+def format_chunk(chunk):
+    """Render a chunk with its location label"""
+    if chunk.get('page') is not None:
+        return f"[Page {chunk['page']}] {chunk['text']}"
+    return chunk['text']
+
+def hybrid_search(doc_data, query, top_k=5):
+    """Fuse BM25 and vector rankings with reciprocal rank fusion"""
+    fused = {}
+    for results in (get_document_index(doc_data).search(query, top_k=top_k * 2),
+                    get_semantic_index(doc_data).search(query, top_k=top_k * 2)):
+        for rank, (chunk, _) in enumerate(results):
+            key = (chunk['source'], chunk.get('page'), chunk['text'])
+            entry = fused.setdefault(key, [chunk, 0.0])
+            entry[1] += 1.0 / (60 + rank)
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    return [(chunk, score) for chunk, score in ranked[:top_k]]
+
+def retrieve_context(doc_data, query, top_k=5, token_budget=350, semantic=False):
+    """Collect the best matching chunks for a query without exceeding the token budget"""
+    index = get_document_index(doc_data)
+    matches = hybrid_search(doc_data, query, top_k=top_k) if semantic else index.search(query, top_k=top_k)
+    parts = []
+    used_tokens = 0
+
+    for chunk, score in matches:
+        text = format_chunk(chunk)
+        tokens = estimate_tokens(text)
+        if used_tokens + tokens > token_budget:
+            continue
+        parts.append(text)
+        used_tokens += tokens
+
+    # Nothing matched the query terms, fall back to the start of the document
+    if not parts and index.chunks:
+        parts.append(format_chunk(index.chunks[0])[:token_budget * 4])
+
+    return "\n\n".join(parts)
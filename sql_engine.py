@@ -0,0 +1,114 @@
+"""
+In-memory SQLite database over a document's extracted tables
+"""
+import re
+import time
+import sqlite3
+import logging
+import threading
+
+import pandas as pd
+
+from offline_ai import offline_ai
+from numeric_parser import NULL_TOKENS, parse_numeric
+
+logger = logging.getLogger(__name__)
+
+# Statements a console query may perform; everything else (writes, ATTACH, PRAGMA changes) is denied
+ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+def sql_identifier(name, taken):
+    """Safe, unique, lowercase SQL column name for a table header"""
+    base = re.sub(r'\W+', '_', str(name).strip().lower()).strip('_') or 'column'
+    if base[0].isdigit():
+        base = f"c_{base}"
+    identifier, n = base, 1
+    while identifier in taken:
+        n += 1
+        identifier = f"{base}_{n}"
+    taken.add(identifier)
+    return identifier
+
+def infer_column(series):
+    """Return (sql_type, converted_series) for a column of raw strings"""
+    numeric = parse_numeric(series)
+    present = ~series.astype(str).str.strip().str.lower().isin(NULL_TOKENS)
+    if present.any() and numeric[present].notna().all():
+        if (numeric.dropna() % 1 == 0).all():
+            return 'INTEGER', numeric.astype('Int64')
+        return 'REAL', numeric
+    # Null tokens become NULL so IS NULL filters find them
+    return 'TEXT', series.astype(str).where(present, None)
+
+class TableDatabase:
+    """Read-only SQL access to extracted tables, loaded once per document"""
+
+    def __init__(self, tables):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.lock = threading.Lock()
+        self.schema = {}
+        self.load_time = 0.0
+        self._load(tables)
+        self.conn.set_authorizer(self._authorize)
+
+    def _load(self, tables):
+        start = time.perf_counter()
+        for idx, table in enumerate(tables):
+            df = offline_ai.table_to_dataframe(table)
+            if df is None:
+                continue
+
+            name = f"table_{idx + 1}"
+            taken, columns, converted = set(), [], {}
+            for header in df.columns:
+                column = sql_identifier(header, taken)
+                sql_type, values = infer_column(df[header])
+                columns.append((column, sql_type, header))
+                converted[column] = values
+
+            column_defs = ", ".join(f'"{column}" {sql_type}' for column, sql_type, _ in columns)
+            self.conn.execute(f'CREATE TABLE "{name}" ({column_defs})')
+            frame = pd.DataFrame(converted).astype(object)
+            frame = frame.where(frame.notna(), None)
+            placeholders = ", ".join("?" for _ in columns)
+            self.conn.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', frame.itertuples(index=False, name=None))
+
+            # Index repeated-value columns: the usual join, filter and group-by keys
+            for column, _, _ in columns:
+                if converted[column].nunique(dropna=True) < len(df):
+                    self.conn.execute(f'CREATE INDEX "idx_{name}_{column}" ON "{name}" ("{column}")')
+
+            self.schema[name] = {'rows': len(df), 'columns': columns}
+
+        self.conn.commit()
+        self.load_time = time.perf_counter() - start
+        logger.info(f"Loaded {len(self.schema)} tables into SQLite in {self.load_time*1000:.1f} ms")
+
+    def _authorize(self, action, *args):
+        return sqlite3.SQLITE_OK if action in ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+    def query(self, sql, row_limit=1000, timeout_seconds=5.0):
+        """Run a read-only query; returns (DataFrame, elapsed_ms, truncated)"""
+        deadline = time.perf_counter() + timeout_seconds
+        with self.lock:
+            # Abort runaway queries (cartesian joins and the like)
+            self.conn.set_progress_handler(lambda: int(time.perf_counter() > deadline), 10_000)
+            start = time.perf_counter()
+            try:
+                cursor = self.conn.execute(sql)
+                rows = cursor.fetchmany(row_limit + 1)
+                columns = [d[0] for d in cursor.description] if cursor.description else []
+            finally:
+                self.conn.set_progress_handler(None, 0)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+        truncated = len(rows) > row_limit
+        return pd.DataFrame(rows[:row_limit], columns=columns), elapsed_ms, truncated
+
+    def describe(self):
+        """Schema text for display: table, row count and typed columns"""
+        lines = []
+        for name, info in self.schema.items():
+            cols = ", ".join(f"{column} {sql_type}" for column, sql_type, _ in info['columns'])
+            lines.append(f"{name} ({info['rows']} rows): {cols}")
+        return "\n".join(lines)
@@ -0,0 +1,436 @@
+"""
+Table downloads built on demand: each format is rendered the first time it is requested
+and cached by table fingerprint
+
+CSV and JSON Lines are written in fixed-size row batches, so large tables stream into a
+spooled file instead of being materialised several times over. Writing is bounded by one
+batch plus the spool's in-memory limit; st.download_button still takes the finished file
+as bytes, so the download itself holds one full copy. Run as a script to benchmark
+throughput and peak memory against the whole-table writers, and to check that the
+streamed writers stay within that bound:
+
+    python table_export.py --rows 1000000
+
+Excel sheets use openpyxl's write-only mode; compare it with pd.ExcelWriter using:
+
+    python table_export.py --excel --rows 500000
+"""
+import io
+import re
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from collections import OrderedDict
+from collections.abc import Mapping
+from datetime import datetime
+
+import pandas as pd
+
+from table_store import build_table, fingerprint
+import pdf_export
+
+logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+except ImportError:
+    logger.warning("openpyxl not available. Excel export will be disabled.")
+    openpyxl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:
+    logger.warning("pyarrow not available. Parquet and Arrow export will be disabled.")
+    pa = None
+
+MAX_CACHED_BYTES = 128 * 1024 * 1024
+# Rows per batch for the streaming writers
+CHUNK_ROWS = 50_000
+# Tables above this many rows stream CSV/JSONL to a spooled file instead of the byte cache
+STREAM_MIN_ROWS = 200_000
+# Control characters Excel rejects in cell text
+ILLEGAL_EXCEL_CHARACTERS = r'[\x00-\x08\x0b\x0c\x0e-\x1f]'
+# Spooled exports stay in memory up to this size, then move to a temporary file
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+PARQUET_COMPRESSIONS = ('snappy', 'zstd', 'gzip', 'none')
+DEFAULT_PARQUET_COMPRESSION = 'snappy'
+# Schema metadata key that marks columnar files written here
+ARROW_METADATA_KEY = b'arixstructure'
+
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'json': 'application/json',
+    'jsonl': 'application/x-ndjson',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'txt': 'text/plain',
+    'pdf': 'application/pdf',
+    'parquet': 'application/vnd.apache.parquet',
+    'feather': 'application/vnd.apache.arrow.file',
+}
+EXTENSIONS = {'excel': 'xlsx'}
+# Formats written from the typed table (real headers and dtypes) rather than the raw cells
+COLUMNAR_FORMATS = ('parquet', 'feather')
+
+_exports = OrderedDict()
+_cached_bytes = 0
+_lock = threading.Lock()
+stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def iter_csv(df, chunk_rows=CHUNK_ROWS):
+    """CSV bytes in batches of chunk_rows rows, header first"""
+    yield df.iloc[:0].to_csv(index=False).encode('utf-8')
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=False).encode('utf-8')
+
+def iter_jsonl(df, chunk_rows=CHUNK_ROWS):
+    """Newline-delimited JSON records in batches of chunk_rows rows"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_json(orient='records', lines=True).encode('utf-8')
+
+def spool(chunks, max_size=SPOOL_MAX_BYTES):
+    """Write byte chunks to a spooled temporary file and rewind it for reading"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_size, mode='w+b')
+    for chunk in chunks:
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+def to_csv(df, table_name):
+    return b''.join(iter_csv(df))
+
+def to_json(df, table_name):
+    json_data = {
+        "metadata": {
+            "table_name": table_name,
+            "rows": len(df),
+            "columns": list(df.columns),
+            "structured_at": datetime.now().replace(microsecond=0).isoformat() + "Z",
+            "source": "ArixStructure"
+        },
+        "data": df.to_dict('records')
+    }
+    return json.dumps(json_data, indent=2).encode('utf-8')
+
+def to_jsonl(df, table_name):
+    return b''.join(iter_jsonl(df))
+
+def _sheet_title(name, used):
+    """Excel-safe, unique sheet name (31 characters, no []:*?/\\)"""
+    base = re.sub(r'[\[\]:*?/\\]', '_', str(name)).strip("'")[:31] or "Sheet"
+    title, counter = base, 1
+    while title.lower() in used:
+        counter += 1
+        suffix = f"_{counter}"
+        title = base[:31 - len(suffix)] + suffix
+    used.add(title.lower())
+    return title
+
+def _write_sheet(workbook, df, title):
+    """Append a DataFrame to a write-only sheet in row batches, header first"""
+    sheet = workbook.create_sheet(title)
+    sheet.append([str(c) for c in df.columns])
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS].astype(object)
+        chunk = chunk.where(df.iloc[start:start + CHUNK_ROWS].notna(), None)
+        for name in df.columns[~df.dtypes.map(pd.api.types.is_numeric_dtype).to_numpy(dtype=bool)]:
+            column = chunk[name]
+            present = column.notna()
+            if present.any():
+                chunk.loc[present, name] = column[present].astype(str).str.replace(ILLEGAL_EXCEL_CHARACTERS, '', regex=True)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+
+def to_workbook(frames):
+    """One .xlsx holding every (name, DataFrame) pair as its own sheet, written in a single pass
+
+    The workbook is write-only: rows go straight to the compressed sheet XML
+    instead of being kept as cell objects, so memory does not grow with the table.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    used = set()
+    for name, df in frames:
+        _write_sheet(workbook, df, _sheet_title(name, used))
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def to_excel(df, table_name):
+    return to_workbook([(table_name, df)])
+
+def document_workbook(tables, names):
+    """Every raw table of a document as sheets of one workbook, cached by their fingerprints"""
+    frames = [(name, pd.DataFrame(table)) for name, table in zip(names, tables)]
+    key = (tuple(fingerprint(df) for _, df in frames), "all tables")
+    return get_export(key, 'excel', lambda: to_workbook(frames))
+
+def to_text(df, table_name):
+    text_content = f"ArixStructure - Structured Data Export\nTable: {table_name}\n" + "="*50 + "\n\n"
+    text_content += df.to_string(index=False)
+    return text_content.encode('utf-8')
+
+def to_pdf(df, table_name, max_rows=pdf_export.MAX_ROWS, progress=None):
+    """Paginated PDF of raw cells, the first row repeated as the header on every page"""
+    try:
+        headers = [str(h) for h in df.iloc[0]] if len(df) else [str(c) for c in df.columns]
+        return pdf_export.table_pdf(headers, df.iloc[1:], "ArixStructure - Structured Data Export",
+                                    subtitle=f"Table: {table_name}", max_rows=max_rows, progress=progress)
+    except Exception as e:
+        logger.error(f"PDF export failed for {table_name}: {e}")
+        return None
+
+def _arrow_table(df, table_name):
+    """Arrow table with the export's name and origin in its schema metadata"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    info = json.dumps({
+        "table_name": table_name,
+        "structured_at": datetime.now().replace(microsecond=0).isoformat() + "Z",
+        "source": "ArixStructure"
+    })
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), ARROW_METADATA_KEY: info.encode('utf-8')})
+
+def to_parquet(df, table_name, compression=DEFAULT_PARQUET_COMPRESSION):
+    buffer = pa.BufferOutputStream()
+    pq.write_table(_arrow_table(df, table_name), buffer, compression=compression)
+    return buffer.getvalue().to_pybytes()
+
+def to_feather(df, table_name):
+    """Feather V2, i.e. the Arrow IPC file format, LZ4-compressed"""
+    buffer = pa.BufferOutputStream()
+    feather.write_feather(_arrow_table(df, table_name), buffer, compression='lz4')
+    return buffer.getvalue().to_pybytes()
+
+def read_columnar(file_bytes, file_format):
+    """(DataFrame, table name) from Parquet or Arrow IPC/Feather bytes"""
+    if pa is None:
+        raise ImportError("pyarrow is required to read Parquet and Arrow files")
+    source = pa.BufferReader(file_bytes)
+    table = pq.read_table(source) if file_format == 'parquet' else feather.read_table(source)
+    info = json.loads((table.schema.metadata or {}).get(ARROW_METADATA_KEY, b'{}'))
+    return table.to_pandas(), info.get('table_name')
+
+EXPORTERS = {'csv': to_csv, 'json': to_json, 'jsonl': to_jsonl}
+if openpyxl:
+    EXPORTERS['excel'] = to_excel
+EXPORTERS['txt'] = to_text
+if pdf_export.reportlab_available:
+    EXPORTERS['pdf'] = to_pdf
+if pa is not None:
+    EXPORTERS['parquet'] = to_parquet
+    EXPORTERS['feather'] = to_feather
+STREAMERS = {'csv': iter_csv, 'jsonl': iter_jsonl}
+
+def _evict():
+    global _cached_bytes
+    while _exports and _cached_bytes > MAX_CACHED_BYTES:
+        _, data = _exports.popitem(last=False)
+        _cached_bytes -= len(data or b'')
+        stats['evictions'] += 1
+
+def get_export(key, export_format, build):
+    """Bytes for one format from the cache, building and storing them on a miss"""
+    global _cached_bytes
+    cache_key = key + (export_format,)
+    with _lock:
+        if cache_key in _exports:
+            _exports.move_to_end(cache_key)
+            stats['hits'] += 1
+            return _exports[cache_key]
+
+    start = time.perf_counter()
+    data = build()
+    logger.info(f"Built {export_format} export for {key[1]} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    with _lock:
+        stats['misses'] += 1
+        if cache_key not in _exports:
+            _exports[cache_key] = data
+            _cached_bytes += len(data or b'')
+            _evict()
+    return data
+
+class TableExports(Mapping):
+    """Read-only mapping of format name to export bytes, each built on first access
+
+    The DataFrame and its fingerprint are only computed when an export is needed;
+    loader(fmt) gives a zero-argument callable for st.download_button so nothing is
+    rendered until the user clicks. Columnar formats are written from the typed
+    table, passed in when the caller already has it.
+    """
+
+    def __init__(self, table, table_name="table", typed_df=None, compression=DEFAULT_PARQUET_COMPRESSION):
+        self.table = table
+        self.table_name = table_name
+        self.compression = compression
+        self._typed_df = typed_df
+        self._df = None
+        self._key = None
+
+    @property
+    def df(self):
+        if self._df is None:
+            self._df = pd.DataFrame(self.table)
+        return self._df
+
+    @property
+    def typed_df(self):
+        if self._typed_df is None:
+            self._typed_df = build_table(self.table)
+        return self._typed_df
+
+    @property
+    def key(self):
+        if self._key is None:
+            self._key = (fingerprint(self.df), self.table_name)
+        return self._key
+
+    def __getitem__(self, export_format):
+        exporter = EXPORTERS[export_format]
+        if export_format == 'parquet':
+            return get_export(self.key, f"parquet:{self.compression}",
+                              lambda: exporter(self.typed_df, self.table_name, self.compression))
+        columnar = export_format in COLUMNAR_FORMATS
+        return get_export(self.key, export_format,
+                          lambda: exporter(self.typed_df if columnar else self.df, self.table_name))
+
+    def __iter__(self):
+        return iter(EXPORTERS)
+
+    def __len__(self):
+        return len(EXPORTERS)
+
+    def streams(self, export_format):
+        """Whether this export is streamed to a spooled file rather than cached as bytes"""
+        return export_format in STREAMERS and len(self.table) > STREAM_MIN_ROWS
+
+    def stream(self, export_format):
+        """Spooled file holding the export, written in row batches"""
+        start = time.perf_counter()
+        spooled = spool(STREAMERS[export_format](self.df))
+        logger.info(f"Streamed {export_format} export for {self.table_name} ({len(self.df):,} rows) "
+                    f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return spooled
+
+    def loader(self, export_format):
+        """Callable that produces the export when invoked"""
+        if self.streams(export_format):
+            return lambda: self.read_stream(export_format)
+        return lambda: self[export_format] or b""
+
+    def read_stream(self, export_format):
+        """Streamed export as bytes
+
+        Streamlit keeps every download in memory, so this one copy grows with the
+        table; only writing the export is bounded.
+        """
+        with self.stream(export_format) as spooled:
+            return spooled.read()
+
+    def file_name(self, export_format):
+        return f"{self.table_name}.{EXTENSIONS.get(export_format, export_format)}"
+
+def _peak(write):
+    """Peak traced allocation of one export; timed separately since tracing slows it down"""
+    tracemalloc.start()
+    write()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def _benchmark(rows, trace):
+    import numpy as np
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'id': np.arange(rows),
+        'region': rng.choice(['North', 'South', 'East', 'West'], rows),
+        'amount': rng.uniform(0, 1e6, rows).round(2),
+        'note': [f"item {i}" for i in range(rows)],
+    })
+
+    def whole_csv():
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False)
+        return len(buffer.getvalue().encode('utf-8'))
+
+    def whole_json():
+        return len(json.dumps(df.to_dict('records'), indent=2).encode('utf-8'))
+
+    def streamed(chunks):
+        def write():
+            with spool(chunks(df)) as spooled:
+                return spooled.seek(0, io.SEEK_END)
+        return write
+
+    def one_batch(chunks):
+        return lambda: len(b''.join(chunks(df.iloc[:CHUNK_ROWS])))
+
+    print(f"{rows:,} rows, {CHUNK_ROWS:,} rows per batch")
+    for name, write, chunks in [("CSV whole", whole_csv, None), ("CSV streamed", streamed(iter_csv), iter_csv),
+                                ("JSON whole", whole_json, None), ("JSONL streamed", streamed(iter_jsonl), iter_jsonl)]:
+        start = time.perf_counter()
+        size = write()
+        elapsed = time.perf_counter() - start
+        line = f"{name:>15}: {elapsed:6.2f}s  {size / elapsed / 1e6:6.1f} MB/s  output {size / 1e6:7.1f} MB"
+        if trace:
+            peak = _peak(write)
+            line += f"  peak {peak / 1e6:7.1f} MB"
+            if chunks is not None:
+                # Streaming may hold the spool's memory buffer and the working set of one batch, whatever the rows
+                bound = SPOOL_MAX_BYTES + 2 * _peak(one_batch(chunks))
+                line += f"  ({'within' if peak <= bound else 'EXCEEDS'} bound of {bound / 1e6:.1f} MB)"
+        print(line)
+
+def _excel_frame(rows):
+    return pd.DataFrame({
+        'id': [str(i) for i in range(rows)],
+        'region': [('North', 'South', 'East', 'West')[i % 4] for i in range(rows)],
+        'amount': [f"{i * 1.25:.2f}" for i in range(rows)],
+        'note': [f"item {i}" for i in range(rows)],
+    })
+
+def _excel_worker(mode, rows):
+    """Write one workbook and print elapsed seconds, size and this process's peak RSS"""
+    import resource
+    df = _excel_frame(rows)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == 'pandas':
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name='table', index=False)
+        size = len(buffer.getvalue())
+    else:
+        size = len(to_excel(df, 'table'))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'elapsed': elapsed, 'size': size, 'peak_mb': peak / 1024, 'growth_mb': (peak - baseline) / 1024}))
+
+def _benchmark_excel(rows):
+    import sys
+    import subprocess
+    print(f"{rows:,} rows x 4 columns, one process per writer")
+    for mode, label in [('pandas', "pd.ExcelWriter"), ('write-only', "write-only")]:
+        output = subprocess.run([sys.executable, __file__, '--excel-worker', mode, '--rows', str(rows)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{label:>15}: {result['elapsed']:6.2f}s  output {result['size'] / 1e6:6.1f} MB  "
+              f"peak RSS {result['peak_mb']:7.0f} MB (+{result['growth_mb']:.0f} MB while writing)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark whole-table and streaming exports")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--no-trace", action="store_true", help="skip the (slow) peak memory pass")
+    parser.add_argument("--excel", action="store_true", help="compare Excel writers instead")
+    parser.add_argument("--excel-worker", choices=['pandas', 'write-only'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.excel_worker:
+        _excel_worker(args.excel_worker, args.rows)
+    elif args.excel:
+        _benchmark_excel(args.rows)
+    else:
+        _benchmark(args.rows, not args.no_trace)
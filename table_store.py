@@ -0,0 +1,120 @@
+"""
+Typed DataFrames for extracted tables, built once per document and shared by every page
+"""
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from offline_ai import offline_ai
+from numeric_parser import parse_numeric
+from profiler import get_document_profile, profile_table
+
+logger = logging.getLogger(__name__)
+
+MAX_TABLES = 64
+MAX_BYTES = 256 * 1024 * 1024
+# Strings repeating at least this often on average are stored as categoricals
+CATEGORY_MAX_RATIO = 0.5
+# pandas 3 always copies on write, so a shallow copy can never change the cached frame
+COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3
+
+_store = OrderedDict()
+_store_bytes = 0
+_lock = threading.Lock()
+stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def _compact_numeric(series, dtype):
+    """Numeric column in the smallest dtype that holds every value exactly"""
+    numeric = parse_numeric(series)
+    if dtype == 'integer' and numeric.notna().all():
+        return pd.to_numeric(numeric, downcast='integer')
+    values = numeric.to_numpy(dtype=np.float64)
+    as_float32 = values.astype(np.float32)
+    if np.array_equal(as_float32.astype(np.float64), values, equal_nan=True):
+        return pd.Series(as_float32, index=series.index, name=series.name)
+    return numeric
+
+def build_table(table, schema=None):
+    """Typed, compact DataFrame for a raw list-of-lists table (first row as headers)"""
+    df = offline_ai.table_to_dataframe(table)
+    if df is None:
+        headers = [str(h) for h in table[0]] if table else []
+        return pd.DataFrame(columns=headers)
+
+    if schema is None:
+        schema = profile_table(table)['schema']
+    for name, column in zip(df.columns, schema):
+        if column['dtype'] in ('integer', 'float'):
+            df[name] = _compact_numeric(df[name], column['dtype'])
+        elif column['dtype'] == 'text' and column['unique'] <= len(df) * CATEGORY_MAX_RATIO:
+            df[name] = df[name].astype('category')
+    return df
+
+def _evict():
+    global _store_bytes
+    while _store and (len(_store) > MAX_TABLES or _store_bytes > MAX_BYTES):
+        key, (_, size) = _store.popitem(last=False)
+        _store_bytes -= size
+        stats['evictions'] += 1
+        logger.info(f"Evicted typed table {key} ({size / 1024:.0f} KB)")
+
+def _detached(df):
+    """A frame callers may modify without reaching the cached one"""
+    return df.copy(deep=not COPY_ON_WRITE)
+
+def get_table(doc_data, index):
+    """Typed DataFrame for a document table, cached by (document hash, table index)
+
+    The cached frame is never handed out: callers get a copy-on-write view on
+    pandas 3, or a deep copy on pandas 2, so writing to the result in place
+    leaves the store untouched.
+    """
+    global _store_bytes
+    tables = doc_data.get('tables', [])
+    doc_hash = doc_data.get('doc_hash')
+    schema = get_document_profile(doc_data)['tables'][index]['schema']
+    if not doc_hash:
+        return build_table(tables[index], schema)
+
+    key = (doc_hash, index)
+    with _lock:
+        cached = _store.get(key)
+        if cached is not None:
+            _store.move_to_end(key)
+            stats['hits'] += 1
+            return _detached(cached[0])
+
+    start = time.perf_counter()
+    df = build_table(tables[index], schema)
+    size = int(df.memory_usage(index=True, deep=True).sum())
+    logger.info(f"Built typed table {key}: {df.shape[0]} rows x {df.shape[1]} columns, "
+                f"{size / 1024:.0f} KB in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    with _lock:
+        stats['misses'] += 1
+        if key not in _store:
+            _store[key] = (df, size)
+            _store_bytes += size
+            _evict()
+    return _detached(df)
+
+def lookup_table(doc_data, table):
+    """Typed DataFrame for a raw table, served from the store when it belongs to the document"""
+    for index, doc_table in enumerate(doc_data.get('tables', [])):
+        if doc_table is table:
+            return get_table(doc_data, index)
+    return build_table(table)
+
+def fingerprint(df):
+    """Content hash of a DataFrame, for caches keyed by data rather than by table position"""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(repr((list(map(str, df.columns)), list(map(str, df.dtypes)), df.shape)).encode('utf-8'))
+    # Rows without columns have nothing to hash, and pandas cannot hash them
+    if len(df.columns):
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
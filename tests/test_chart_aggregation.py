@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_aggregation
+from chart_aggregation import OTHER_LABEL, histogram_bins, top_n_counts, top_n_sums
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'city': [f"city {i}" for i in rng.integers(0, 40, 5000)],
+        'amount': rng.uniform(0, 100, 5000).round(2),
+        'channel': rng.choice(['web', 'store'], 5000),
+    })
+
+def test_top_counts_keep_the_total(sales):
+    counts = top_n_counts(sales['city'], n=5)
+    assert len(counts) == 6
+    assert counts['city'].iloc[-1] == OTHER_LABEL
+    assert counts['count'].sum() == len(sales)
+    expected = sales['city'].value_counts().head(5)
+    assert counts['count'].iloc[:5].tolist() == expected.tolist()
+
+def test_top_counts_by_colour_keep_the_total(sales):
+    counts = top_n_counts(sales['city'], n=5, color=sales['channel'])
+    assert counts['count'].sum() == len(sales)
+    assert set(counts['city']) == set(sales['city'].value_counts().head(5).index) | {OTHER_LABEL}
+
+def test_few_categories_have_no_other_bucket(sales):
+    counts = top_n_counts(sales['channel'], n=5)
+    assert OTHER_LABEL not in counts['channel'].tolist()
+
+@pytest.mark.parametrize('color_col', [None, 'channel'])
+def test_top_sums_keep_the_total_and_put_other_last(sales, color_col):
+    sums = top_n_sums(sales, 'city', 'amount', color_col, n=5)
+    assert sums['amount'].sum() == pytest.approx(sales['amount'].sum())
+    assert sums['city'].iloc[-1] == OTHER_LABEL
+    top = sales.groupby('city')['amount'].sum().nlargest(5)
+    assert set(sums['city']) - {OTHER_LABEL} == set(top.index)
+
+def test_histogram_bins_share_edges_across_colours(sales):
+    plain = histogram_bins(sales['amount'], 10)
+    coloured = histogram_bins(sales['amount'], 10, color=sales['channel'])
+    assert plain['count'].sum() == len(sales)
+    assert coloured.groupby('bin')['count'].sum().tolist() == plain['count'].tolist()
+    assert set(coloured['channel']) == {'web', 'store'}
+
+def test_cache_builds_once():
+    calls = []
+    key = ('test', 'chart')
+    chart_aggregation._cache.pop(key, None)
+    for _ in range(2):
+        assert chart_aggregation.cached(key, lambda: calls.append(1) or 'built') == 'built'
+    assert calls == [1]
+    chart_aggregation.cached(None, lambda: calls.append(1))
+    assert calls == [1, 1]
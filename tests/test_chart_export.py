@@ -0,0 +1,56 @@
+import io
+import zipfile
+
+import plotly.graph_objects as go
+import pytest
+
+import chart_export
+from chart_export import export_figure, export_figures, image_options, zip_figures
+
+IMAGE_MAGIC = {'png': b'\x89PNG', 'svg': b'<svg', 'pdf': b'%PDF'}
+
+@pytest.fixture
+def figure():
+    return go.Figure(go.Scatter(x=[1, 2, 3], y=[3, 1, 2]))
+
+def test_rasters_are_larger_than_vectors():
+    assert image_options('png')['scale'] == 2
+    assert image_options('svg')['scale'] == 1
+    assert image_options('pdf')['format'] == 'pdf'
+
+def test_html_is_exported_without_the_renderer(figure):
+    data, export_format = export_figure(figure, 'HTML')
+    assert export_format == 'html'
+    assert b'plotly' in data.lower()
+
+@pytest.mark.parametrize('export_format', ['png', 'svg'])
+def test_images_render_or_fall_back_to_html(figure, export_format):
+    # Without Chrome the renderer is unavailable and exports come back as HTML
+    data, actual = export_figure(figure, export_format)
+    assert actual in (export_format, 'html')
+    if actual == 'html':
+        assert b'<html' in data
+    else:
+        assert data.startswith(IMAGE_MAGIC[export_format])
+
+def test_batches_keep_their_order(figure):
+    other = go.Figure(go.Bar(x=['a'], y=[1]))
+    exported = export_figures([figure, other], 'html')
+    assert [export_format for _, export_format in exported] == ['html', 'html']
+    assert b'scatter' in exported[0][0] and b'bar' in exported[1][0]
+
+def test_zip_names_are_unique(figure):
+    archive, fallbacks = zip_figures([('sales', figure), ('sales', figure), ('costs', figure)], 'html')
+    with zipfile.ZipFile(io.BytesIO(archive)) as contents:
+        assert contents.namelist() == ['sales.html', 'sales_2.html', 'costs.html']
+    assert fallbacks == 0
+
+def test_zip_counts_fallbacks(figure, monkeypatch):
+    class Broken:
+        def render_many(self, jobs):
+            raise RuntimeError("no browser")
+    monkeypatch.setattr(chart_export, 'get_renderer', lambda: Broken())
+    archive, fallbacks = zip_figures([('a', figure), ('b', figure)], 'png')
+    with zipfile.ZipFile(io.BytesIO(archive)) as contents:
+        assert contents.namelist() == ['a.html', 'b.html']
+    assert fallbacks == 2
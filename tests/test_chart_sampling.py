@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import chart_sampling
+from chart_sampling import downsample_indices, lttb_indices, minmax_indices, reduce_line, reduce_scatter
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    x = np.arange(20_000, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=len(x)))
+    y[12_345] = 500.0
+    return x, y
+
+@pytest.mark.parametrize('n_out', [3, 10, 500, 4000])
+def test_lttb_keeps_endpoints_in_order(series, n_out):
+    x, y = series
+    picks = lttb_indices(x, y, n_out)
+    assert len(picks) == n_out
+    assert picks[0] == 0 and picks[-1] == len(x) - 1
+    assert np.all(np.diff(picks) > 0)
+
+def test_lttb_keeps_a_spike(series):
+    x, y = series
+    assert 12_345 in lttb_indices(x, y, 200)
+
+def test_short_series_are_untouched():
+    assert lttb_indices(np.arange(5.0), np.arange(5.0), 10).tolist() == list(range(5))
+    assert lttb_indices(np.arange(5.0), np.arange(5.0), 2).tolist() == list(range(5))
+
+def test_minmax_keeps_each_bucket_extremes(series):
+    _, y = series
+    picks = minmax_indices(y, 100)
+    assert picks[0] == 0 and picks[-1] == len(y) - 1
+    assert np.all(np.diff(picks) > 0)
+    assert y[picks].max() == y.max() and y[picks].min() == y.min()
+
+def test_long_series_are_preselected(series):
+    x, y = series
+    picks = downsample_indices(x, y, 100)
+    assert len(picks) == 100
+    assert picks[0] == 0 and picks[-1] == len(x) - 1
+    assert np.all(np.diff(picks) > 0)
+    assert 12_345 in picks
+
+def test_reduce_line_splits_the_budget_by_colour(series):
+    x, y = series
+    df = pd.DataFrame({'x': x, 'y': y, 'group': np.where(x < 15_000, 'a', 'b')})
+    reduced, info = reduce_line(df, 'x', 'y', 'group', max_points=1000)
+    assert info['original_points'] == len(df)
+    assert info['rendered_points'] == len(reduced) <= 1000
+    assert info['method'] == 'LTTB' and info['webgl']
+    for label, group in df.groupby('group'):
+        kept = reduced[reduced['group'] == label]
+        assert kept.index[0] == group.index[0] and kept.index[-1] == group.index[-1]
+    assert "Rendered" in chart_sampling.caption(info)
+
+def test_reduce_line_leaves_small_and_text_series(series):
+    df = pd.DataFrame({'x': range(10), 'y': list('abcdefghij')})
+    reduced, info = reduce_line(df, 'x', 'y', max_points=5)
+    assert reduced is df and info['method'] is None
+
+def test_reduce_scatter_is_a_repeatable_subset():
+    df = pd.DataFrame({'x': np.arange(30_000), 'group': ['a', 'b', 'c'] * 10_000})
+    reduced, info = reduce_scatter(df, 'group', max_points=3000)
+    again, _ = reduce_scatter(df, 'group', max_points=3000)
+    assert info['rendered_points'] == len(reduced) == 3000
+    assert reduced.index.equals(again.index)
+    assert reduced.index.is_monotonic_increasing and reduced.index.isin(df.index).all()
+    assert reduced['group'].value_counts().tolist() == [1000, 1000, 1000]
@@ -0,0 +1,63 @@
+import numpy as np
+
+from entity_index import EntityIndex, page_numbers, with_pages
+from profiler import build_profile, get_entity_index
+from text_analysis import analyze
+
+PAGES = [
+    "--- PAGE 1 ---\nWrite to Sales@Example.com by 2024-01-05.\n--- END PAGE 1 ---\n\n",
+    "--- PAGE 2 ---\nNothing to see here.\n--- END PAGE 2 ---\n\n",
+    "--- PAGE 3 ---\nsales@example.com again, and https://example.com/q3 too.\n--- END PAGE 3 ---\n\n",
+]
+TEXT = ''.join(PAGES)
+
+def page_offsets():
+    offsets, start = [], 0
+    for page, block in enumerate(PAGES, 1):
+        offsets.append((page, start, start + len(block)))
+        start += len(block)
+    return offsets
+
+def index(offsets):
+    return EntityIndex(TEXT, with_pages(analyze(TEXT)['entities'], offsets))
+
+def test_offsets_land_on_their_pages():
+    offsets = page_offsets()
+    starts = np.array([0, offsets[1][1] - 1, offsets[1][1], offsets[2][1] + 5, len(TEXT) - 1])
+    assert page_numbers(starts, offsets).tolist() == [1, 1, 2, 3, 3]
+    assert page_numbers(starts, None).tolist() == [0] * 5
+
+def test_lookup_is_case_insensitive_and_in_document_order():
+    entities = index(page_offsets())
+    found = entities.lookup(' SALES@example.com ')
+    assert [(hit['value'], hit['page']) for hit in found] == [('Sales@Example.com', 1), ('sales@example.com', 3)]
+    assert all(TEXT[hit['start']:hit['end']] == hit['value'] for hit in found)
+    assert entities.pages('sales@example.com', 'emails') == [1, 3]
+    assert entities.lookup('sales@example.com', 'urls') == []
+    assert entities.lookup('nobody@example.com') == []
+
+def test_counts_and_values_by_type():
+    entities = index(page_offsets())
+    assert entities.count('emails') == 2
+    assert entities.distinct('emails') == {'sales@example.com': 2}
+    assert entities.values('urls') == ['https://example.com/q3']
+    assert sum(entities.counts().values()) == len(entities)
+
+def test_context_bolds_the_entity_on_one_line():
+    entities = index(page_offsets())
+    context = entities.context(entities.lookup('2024-01-05')[0], chars=10)
+    assert '**2024-01-05**' in context
+    assert '\n' not in context
+
+def test_profile_pages_come_from_markers_without_offsets():
+    doc = {'full_text': TEXT, 'tables': [], 'metadata': {}}
+    doc['profile'] = build_profile(doc)
+    assert get_entity_index(doc).pages('sales@example.com') == [1, 3]
+    assert get_entity_index(doc) is get_entity_index(doc)
+
+def test_unpaged_text_reports_page_zero():
+    text = "Mail sales@example.com"
+    doc = {'full_text': text, 'tables': [], 'metadata': {}}
+    doc['profile'] = build_profile(doc)
+    assert [hit['page'] for hit in get_entity_index(doc).lookup('sales@example.com')] == [0]
+    assert get_entity_index(doc).pages('sales@example.com') == []
@@ -0,0 +1,60 @@
+import plotly.graph_objects as go
+import pytest
+
+import figure_cache
+from figure_cache import chart_key, get_export, get_figure, load_figure, timing_caption
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(figure_cache, '_figures', type(figure_cache._figures)())
+    monkeypatch.setattr(figure_cache, 'stats', {'hits': 0, 'misses': 0, 'evictions': 0, 'build_ms': 0.0, 'hit_ms': 0.0})
+
+def bar(title):
+    return go.Figure(go.Bar(x=['a', 'b'], y=[1, 2]), layout={'title': title})
+
+def test_key_covers_options_in_any_order():
+    first = chart_key('abc', 'Bar Chart', 'x', 'y', None, 'light', title='T', large_scatter='auto')
+    second = chart_key('abc', 'Bar Chart', 'x', 'y', None, 'light', large_scatter='auto', title='T')
+    assert first == second
+    assert first != chart_key('abc', 'Bar Chart', 'x', 'y', None, 'dark', title='T', large_scatter='auto')
+
+def test_figure_is_built_once():
+    calls = []
+
+    def build():
+        calls.append(1)
+        return bar('Sales'), {'rendered_points': 2}
+
+    key = chart_key('abc', 'Bar Chart', 'x', 'y', None, 'light')
+    fig, info, timing = get_figure(key, build)
+    cached_fig, cached_info, cached_timing = get_figure(key, build)
+    assert calls == [1]
+    assert not timing['hit'] and cached_timing['hit']
+    assert cached_fig.data == fig.data
+    assert cached_fig.layout.title.text == fig.layout.title.text
+    assert cached_info == info
+    assert "served from cache" in timing_caption(cached_timing)
+    assert load_figure(key).layout.title.text == 'Sales'
+
+def test_failed_builds_are_not_cached():
+    key = chart_key('abc', 'Pie Chart', 'x', None, None, 'light')
+    assert get_figure(key, lambda: (None, None))[0] is None
+    assert load_figure(key) is None
+
+def test_oldest_figures_are_evicted(monkeypatch):
+    monkeypatch.setattr(figure_cache, 'MAX_FIGURES', 2)
+    keys = [chart_key(str(i), 'Bar Chart', 'x', 'y', None, 'light') for i in range(3)]
+    for key in keys:
+        get_figure(key, lambda: (bar('t'), {}))
+    assert load_figure(keys[0]) is None
+    assert load_figure(keys[2]) is not None
+    assert figure_cache.stats['evictions'] == 1
+
+def test_exports_are_rendered_once_per_format():
+    key = chart_key('abc', 'Bar Chart', 'x', 'y', None, 'light')
+    get_figure(key, lambda: (bar('t'), {}))
+    renders = []
+    for _ in range(2):
+        assert get_export(key, 'svg', lambda: renders.append(1) or (b'<svg/>', 'svg')) == (b'<svg/>', 'svg')
+    get_export(key, 'png', lambda: renders.append(1) or (b'png', 'png'))
+    assert renders == [1, 1]
@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from numeric_parser import numeric_share, parse_number, parse_numeric
+
+@pytest.mark.parametrize('cell, expected', [
+    ('42', 42.0),
+    ('1e3', 1000.0),
+    ('1,234.5', 1234.5),
+    ('$1,200', 1200.0),
+    ('USD 40', 40.0),
+    ('Rs. 500', 500.0),
+    ('(300)', -300.0),
+    ('(12%)', -12.0),
+    ('-5%', -5.0),
+    ('−7', -7.0),
+    ('1.5k', 1500.0),
+    ('2bn', 2e9),
+    ('1 234', 1234.0),
+    ('1 234 567', 1234567.0),
+    ("1'234.50", 1234.5),
+    ('1\u00a0234,5', 1234.5),
+    ('12 345.6 k', 12345600.0),
+    ('€1.234,56', 1234.56),
+    ('12,5', 12.5),
+])
+def test_formatted_cells(cell, expected):
+    assert parse_number(cell) == pytest.approx(expected)
+
+@pytest.mark.parametrize('cell', ['', 'n/a', '—', 'abc', '3 apples', '(12',
+                                  '2019 2020', '555 1234', '12 34', '1 2345', "12'34", '1\u202f23'])
+def test_non_numbers_are_nan(cell):
+    assert math.isnan(parse_number(cell))
+
+def test_decimal_separator_is_detected_per_column():
+    assert parse_numeric(['1.234,5', '2.000,75', '3,1']).tolist() == [1234.5, 2000.75, 3.1]
+    assert parse_numeric(['1,234', '2,000']).tolist() == [1234.0, 2000.0]
+
+def test_explicit_decimal_separator():
+    assert parse_numeric(['1,5', '2,25'], decimal=',').tolist() == [1.5, 2.25]
+
+def test_numeric_series_passes_through():
+    series = pd.Series([1, 2, 3], index=[10, 20, 30])
+    result = parse_numeric(series)
+    assert result.dtype == np.float64
+    assert result.index.tolist() == [10, 20, 30]
+
+def test_index_is_kept_for_mixed_cells():
+    series = pd.Series(['1', '$2', 'x'], index=['a', 'b', 'c'])
+    result = parse_numeric(series)
+    assert result.index.tolist() == ['a', 'b', 'c']
+    assert result.iloc[:2].tolist() == [1.0, 2.0]
+    assert math.isnan(result['c'])
+
+def test_numeric_share_ignores_missing_cells():
+    assert numeric_share(pd.Series(['1', 'x', '', '2'])) == pytest.approx(2 / 3)
+    assert numeric_share(pd.Series(['', 'n/a'])) == 0.0
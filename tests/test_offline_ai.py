@@ -0,0 +1,23 @@
+import pytest
+
+from offline_ai import offline_ai
+
+@pytest.mark.parametrize('headers, expected', [
+    (['a', 'a', 'a_1'], ['a', 'a_1', 'a_1_1']),
+    (['a', 'a_1', 'a', 'a'], ['a', 'a_1', 'a_2', 'a_3']),
+    ([None, '', ' x ', 'x'], ['Column 1', 'Column 2', 'x', 'x_1']),
+])
+def test_headers_are_unique(headers, expected):
+    df = offline_ai.table_to_dataframe([headers, ['1'] * len(headers)])
+    assert list(df.columns) == expected
+
+def test_short_rows_are_padded_and_long_rows_cut():
+    df = offline_ai.table_to_dataframe([['a', 'b'], ['1'], ['2', '3', '4']])
+    assert df.values.tolist() == [['1', ''], ['2', '3']]
+
+def test_sums_skip_groups_without_numbers():
+    table = [['Region', 'Sales'], ['East', ''], ['West', '$10'], ['West', '5']]
+    answer = offline_ai.answer_table_query("total sales by region", [table])
+    assert answer['result'].values.tolist() == [['West', 15.0]]
+    answer = offline_ai.answer_table_query("total sales where region = east", [table])
+    assert "no numeric values found" in answer['answer']
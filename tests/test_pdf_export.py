@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+import pdf_export
+from table_export import TableExports
+
+pytestmark = pytest.mark.skipif(not pdf_export.reportlab_available, reason="reportlab is not installed")
+
+def pdf_text(data):
+    pymupdf = pytest.importorskip('pymupdf')
+    with pymupdf.open(stream=data, filetype='pdf') as document:
+        return '\n'.join(page.get_text() for page in document)
+
+@pytest.mark.parametrize('table', [[], [[]], [['Region', 'Sales']], [[], [], []]])
+def test_empty_tables_still_export(table):
+    data = TableExports(table, 'empty')['pdf']
+    assert data.startswith(b'%PDF')
+    assert "No rows." in pdf_text(data)
+
+def test_cells_are_flattened_to_one_line():
+    data = TableExports([['Name\nof item', 'Sales'], ['Total\nRevenue\nQ1', '10']], 'sales')['pdf']
+    lines = pdf_text(data).splitlines()
+    assert "Name of item" in lines
+    assert "Total Revenue Q1" in lines
+
+def test_long_tables_are_capped():
+    df = pd.DataFrame({'n': [str(i) for i in range(50)]})
+    text = pdf_text(pdf_export.table_pdf(['n'], df, 'numbers', max_rows=10))
+    assert "Showing the first 10 of 50 rows." in text
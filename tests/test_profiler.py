@@ -0,0 +1,30 @@
+from profiler import build_profile, profile_table
+from sql_engine import TableDatabase
+from table_store import build_table
+
+TABLE = [
+    ['Amount', 'Amount', None, 'Amount_1', ''],
+    ['1', 'x', '10', '2.5', 'n/a'],
+    ['2', 'y', '20', '3.5', ''],
+    ['3', 'x', '', '4.5', '-'],
+]
+
+def test_duplicate_and_missing_headers_are_profiled():
+    profile = profile_table(TABLE)
+    assert profile['headers'] == ['Amount', 'Amount_1', 'Column 3', 'Amount_1_1', 'Column 5']
+    assert [column['dtype'] for column in profile['schema']] == ['integer', 'text', 'integer', 'float', 'empty']
+    assert profile['numeric_columns'] == ['Amount', 'Column 3', 'Amount_1_1']
+    assert profile['schema'][2]['nulls'] == 1
+    assert profile['schema'][0]['sum'] == 6.0
+
+def test_duplicate_headers_load_everywhere():
+    doc = {'full_text': 'Some text.', 'tables': [TABLE], 'metadata': {}}
+    assert build_profile(doc)['tables'][0]['columns'] == 5
+    assert list(build_table(TABLE).columns) == ['Amount', 'Amount_1', 'Column 3', 'Amount_1_1', 'Column 5']
+    df, _, _ = TableDatabase([TABLE]).query('SELECT SUM(amount) AS total, COUNT(*) AS n FROM table_1')
+    assert df.values.tolist() == [[6, 3]]
+
+def test_profile_counts_rows_without_the_header():
+    profile = profile_table([['a'], ['1'], ['2']])
+    assert (profile['rows'], profile['columns']) == (2, 1)
+    assert profile_table([['a', 'b']])['schema'] == []
@@ -0,0 +1,74 @@
+import pytest
+
+import query_planner
+from profiler import build_profile
+from query_planner import answer_query, plan_query
+
+TEXT = (
+    "--- PAGE 1 ---\n"
+    "The quarterly report covers revenue growth across the northern region. "
+    "Revenue in the northern region grew twelve percent after the new warehouse opened in March. "
+    "Questions about the report go to finance@example.com before the board meeting.\n"
+    "--- END PAGE 1 ---\n\n"
+    "--- PAGE 2 ---\n"
+    "Customer satisfaction scores improved for the support team during the second half of the year. "
+    "It was what it was, and that is that, as it is and it was to be. "
+    "The board approved the hiring plan for the support team on 2024-03-04.\n"
+    "--- END PAGE 2 ---\n\n"
+)
+TABLES = [
+    [['Region', 'Sales'], ['North', '$1,200'], ['South', '800'], ['North', '300']],
+    [['Name', 'Team'], ['Ana', 'Support'], ['Raj', 'Finance']],
+]
+
+@pytest.fixture
+def doc_data():
+    doc = {'full_text': TEXT, 'tables': TABLES, 'image_files': [], 'image_descriptions': [],
+           'metadata': {'pages': 2, 'extraction_method': 'pdfplumber'}, 'filename': 'report.pdf'}
+    doc['profile'] = build_profile(doc)
+    return doc
+
+@pytest.fixture(autouse=True)
+def no_llm(monkeypatch):
+    """Every question here has a local answer; reaching the model is a failure"""
+    def llm_answer(query, doc_data, should_cancel=None):
+        raise AssertionError(f"'{query}' fell through to the language model")
+    monkeypatch.setitem(query_planner.TIER_HANDLERS, 'llm', llm_answer)
+
+def test_plan_skips_table_tiers_without_tables(doc_data):
+    assert plan_query("what grew", {'tables': []}) == ['metadata', 'extractive', 'llm']
+    assert plan_query("what grew", doc_data) == ['metadata', 'table_compute', 'extractive', 'llm']
+    assert plan_query("show table 2", doc_data) == ['metadata', 'table_compute', 'table_lookup', 'llm']
+
+@pytest.mark.parametrize('query, tier, expected', [
+    ("How many pages?", 'metadata', "2 pages"),
+    ("How many rows are in table 1?", 'metadata', "Table 1 has 3 rows"),
+    ("List the emails", 'metadata', "finance@example.com (page 1)"),
+    ("Where does 2024-03-04 appear?", 'metadata', "on page 2"),
+    ("What is the file format?", 'metadata', "report.pdf was parsed with pdfplumber"),
+    ("Total sales by region", 'table_compute', "North, 1,500"),
+    ("Show table 2", 'table_lookup', "Table 2 Analysis"),
+    ("When was the new warehouse opened?", 'extractive', "opened in March. (page 1)"),
+])
+def test_cheapest_tier_answers(doc_data, query, tier, expected):
+    results = answer_query(query, doc_data)
+    assert results['tier'] == tier
+    assert expected in results['content']
+    assert results['token_usage'] is None
+
+def test_summary_skips_stopword_sentences(doc_data):
+    results = answer_query("Give me a summary", doc_data)
+    assert results['tier'] == 'extractive'
+    assert results['content'].startswith("Summary: ")
+    assert "It was what it was" not in results['content']
+
+@pytest.mark.parametrize('query', ["What format are the dates in?", "Which number format does the table use?"])
+def test_format_questions_about_content_skip_the_file_answer(doc_data, query):
+    assert query_planner._metadata_answer(query, doc_data) is None
+
+def test_table_tiers_agree_on_row_counts(doc_data):
+    rows = answer_query("How many rows are in table 1?", doc_data)['content']
+    lookup = answer_query("Show table 1", doc_data)['content']
+    assert "Table 1 has 3 rows" in rows
+    assert "- Rows: 3\n" in lookup
+    assert "with 3 rows" in answer_query("Which table has the most rows?", doc_data)['content']
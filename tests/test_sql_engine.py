@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+from sql_engine import TableDatabase
+
+TABLES = [
+    [['Region', 'Sales', 'Units'],
+     ['East', '$1,200', '3'],
+     ['West', '950', '2'],
+     ['East', '300', '1']],
+    [['Name', 'Team'],
+     ['Ana', 'Support'],
+     ['Raj', 'n/a'],
+     ['Li', '']],
+]
+
+@pytest.fixture
+def db():
+    return TableDatabase(TABLES)
+
+def test_select_is_allowed(db):
+    df, _, truncated = db.query('SELECT region, SUM(sales) AS total FROM table_1 GROUP BY region ORDER BY region')
+    assert df.to_dict('records') == [{'region': 'East', 'total': 1500}, {'region': 'West', 'total': 950}]
+    assert not truncated
+
+def test_schema_types(db):
+    assert [(column, sql_type) for column, sql_type, _ in db.schema['table_1']['columns']] == [
+        ('region', 'TEXT'), ('sales', 'INTEGER'), ('units', 'INTEGER')]
+
+@pytest.mark.parametrize('sql', [
+    "INSERT INTO table_1 VALUES ('North', 1, 1)",
+    "UPDATE table_1 SET sales = 0",
+    "DELETE FROM table_1",
+    "DROP TABLE table_1",
+    "CREATE TABLE extra (x INTEGER)",
+    "ATTACH DATABASE ':memory:' AS other",
+    "PRAGMA writable_schema = 1",
+])
+def test_writes_and_attach_are_denied(db, sql):
+    with pytest.raises(sqlite3.DatabaseError):
+        db.query(sql)
+    df, _, _ = db.query('SELECT COUNT(*) AS n FROM table_1')
+    assert df['n'].iloc[0] == 3
+
+def test_recursive_queries_are_allowed(db):
+    df, _, _ = db.query('WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 5) '
+                        'SELECT SUM(i) AS total FROM n')
+    assert df['total'].iloc[0] == 15
+
+def test_null_tokens_are_stored_as_null(db):
+    df, _, _ = db.query('SELECT name FROM table_2 WHERE team IS NULL ORDER BY name')
+    assert df['name'].tolist() == ['Li', 'Raj']
+    df, _, _ = db.query("SELECT COUNT(*) AS n FROM table_2 WHERE team = ''")
+    assert df['n'].iloc[0] == 0
+
+def test_row_limit(db):
+    df, _, truncated = db.query('SELECT * FROM table_1', row_limit=2)
+    assert len(df) == 2
+    assert truncated
+
+def test_runaway_query_times_out(db):
+    sql = 'SELECT COUNT(*) FROM ' + ', '.join(f'table_1 AS t{i}' for i in range(20))
+    with pytest.raises(sqlite3.OperationalError):
+        db.query(sql, timeout_seconds=0.05)
@@ -0,0 +1,93 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import table_export
+from table_export import TableExports
+
+needs_pyarrow = pytest.mark.skipif(table_export.pa is None, reason="pyarrow is not installed")
+
+TABLE = [
+    ['Region', 'Sales', 'Units', 'Note'],
+    ['East', '1,200.50', '3', 'first'],
+    ['West', '950', '2', ''],
+    ['East', '300', '', 'third, with a comma'],
+    ['North', '', '7', 'line\nbreak'],
+]
+
+@pytest.fixture
+def exports():
+    return TableExports(TABLE, 'sales')
+
+@needs_pyarrow
+@pytest.mark.parametrize('file_format', table_export.COLUMNAR_FORMATS)
+def test_columnar_round_trip(exports, file_format):
+    df, name = table_export.read_columnar(exports[file_format], file_format)
+    assert name == 'sales'
+    pd.testing.assert_frame_equal(df, exports.typed_df, check_categorical=False)
+
+@needs_pyarrow
+@pytest.mark.parametrize('compression', table_export.PARQUET_COMPRESSIONS)
+def test_parquet_compressions_round_trip(compression):
+    exports = TableExports(TABLE, 'sales', compression=compression)
+    df, _ = table_export.read_columnar(exports['parquet'], 'parquet')
+    pd.testing.assert_frame_equal(df, exports.typed_df, check_categorical=False)
+
+@needs_pyarrow
+def test_columnar_keeps_types(exports):
+    df, _ = table_export.read_columnar(exports['parquet'], 'parquet')
+    assert pd.api.types.is_float_dtype(df['Sales'])
+    assert df['Sales'].iloc[0] == pytest.approx(1200.5)
+    assert df['Sales'].isna().tolist() == [False, False, False, True]
+
+def test_csv_round_trip(exports):
+    # Raw exports keep the header row as the first data row
+    df = pd.read_csv(io.BytesIO(exports['csv']), dtype=str, keep_default_na=False)
+    assert df.values.tolist() == TABLE
+
+def test_jsonl_matches_json(exports):
+    records = [json.loads(line) for line in exports['jsonl'].decode('utf-8').splitlines()]
+    assert records == json.loads(exports['json'])['data']
+
+def test_streamed_export_matches_cached_bytes(exports, monkeypatch):
+    monkeypatch.setattr(table_export, 'STREAM_MIN_ROWS', 0)
+    assert exports.streams('csv')
+    assert exports.read_stream('csv') == table_export.to_csv(exports.df, 'sales')
+    assert exports.loader('jsonl')() == table_export.to_jsonl(exports.df, 'sales')
+
+@pytest.mark.parametrize('chunks', [table_export.iter_csv, table_export.iter_jsonl])
+def test_streamed_writing_is_bounded_by_one_batch(chunks):
+    df = pd.DataFrame({'id': range(200_000), 'note': [f"item {i}" for i in range(200_000)]})
+    max_size, chunk_rows = 256 * 1024, 2_000
+
+    def write():
+        with table_export.spool(chunks(df, chunk_rows), max_size=max_size) as spooled:
+            return spooled.seek(0, io.SEEK_END)
+
+    batch_peak = table_export._peak(lambda: b''.join(chunks(df.iloc[:chunk_rows], chunk_rows)))
+    bound = max_size + 2 * batch_peak
+    assert write() > 2 * bound
+    assert table_export._peak(write) <= bound
+
+needs_openpyxl = pytest.mark.skipif(table_export.openpyxl is None, reason="openpyxl is not installed")
+
+@needs_openpyxl
+def test_excel_round_trip():
+    df = pd.DataFrame({'name': ['a\x07b', None, 'c'], 'amount': [1.5, None, 3.0], 'n': [1, 2, 3]})
+    read = pd.read_excel(io.BytesIO(table_export.to_excel(df, 'sales')), sheet_name='sales')
+    assert read['name'].tolist()[0::2] == ['ab', 'c']
+    assert read['name'].isna().tolist() == [False, True, False]
+    assert read['amount'].tolist()[0::2] == [1.5, 3.0]
+    assert read['n'].tolist() == [1, 2, 3]
+
+@needs_openpyxl
+def test_document_workbook_has_one_safe_sheet_per_table():
+    names = ['Table 1', 'Table 1', 'Revenue: Q1/Q2 [draft] with a very long sheet title']
+    data = table_export.document_workbook([TABLE, TABLE, TABLE], names)
+    sheets = pd.read_excel(io.BytesIO(data), sheet_name=None, header=None, dtype=str, keep_default_na=False)
+    assert list(sheets) == ['Table 1', 'Table 1_2', 'Revenue_ Q1_Q2 _draft_ with a v']
+    assert all(len(title) <= 31 for title in sheets)
+    # Raw tables keep their header row as data below the positional column names
+    assert sheets['Table 1'].iloc[1:].values.tolist() == TABLE
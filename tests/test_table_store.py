@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+import table_store
+from profiler import build_profile
+
+TABLE = [['Region', 'Sales'], ['North', '10'], ['South', '20'], ['North', '30']]
+
+@pytest.fixture
+def doc_data():
+    doc = {'full_text': '', 'tables': [TABLE], 'metadata': {}, 'doc_hash': 'table-store-test'}
+    doc['profile'] = build_profile(doc)
+    yield doc
+    table_store._store.pop((doc['doc_hash'], 0), None)
+
+def test_typed_columns(doc_data):
+    df = table_store.get_table(doc_data, 0)
+    assert pd.api.types.is_integer_dtype(df['Sales'])
+    assert df['Sales'].sum() == 60
+
+def set_cell(df):
+    df.iloc[0, 1] = 99
+
+def replace_column(df):
+    df['Sales'] *= 0
+
+def drop_column(df):
+    df.drop(columns='Region', inplace=True)
+
+def write_values(df):
+    values = df['Sales'].to_numpy()
+    if values.flags.writeable:
+        values[0] = 99
+
+@pytest.mark.parametrize('mutate', [set_cell, replace_column, drop_column, write_values])
+def test_mutations_do_not_reach_the_cache(doc_data, mutate):
+    first = table_store.get_table(doc_data, 0)
+    expected = first.copy(deep=True)
+    mutate(first)
+    pd.testing.assert_frame_equal(table_store.get_table(doc_data, 0), expected)
+
+def test_second_lookup_is_a_cache_hit(doc_data):
+    table_store.get_table(doc_data, 0)
+    hits = table_store.stats['hits']
+    table_store.get_table(doc_data, 0)
+    assert table_store.stats['hits'] == hits + 1
@@ -0,0 +1,106 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import text_analysis
+from text_analysis import (ENTITY_PATTERNS, IncrementalAnalyzer, TextStats, analyze, analyze_parallel,
+                           entity_lists, iter_chunks)
+
+# Pieces chosen to land cuts next to sentence ends, paragraph breaks and entities
+PIECES = ['a', 'b', '5', '15.', 'word', 'The', 'x.', '?!', '!', '. ', '\n', '\n\n', '\n\n\n', ' ', '  ', '\t',
+          '3.5', '1/2/2024', '2024-01-02', 'a@b.co', 'x@y.org.', 'http://x.y/z', 'end.', '..', 'é']
+
+def random_texts(seed, count=200, max_pieces=80):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(PIECES) for _ in range(rng.randint(0, max_pieces))) for _ in range(count)]
+
+def assert_same(result, expected):
+    assert result['text'] == expected['text']
+    for name in ('type', 'start', 'end'):
+        assert np.array_equal(result['entities'][name], expected['entities'][name])
+
+def test_single_pass_matches_legacy_regexes():
+    for text in random_texts(1):
+        result = analyze(text)
+        stats, entities = text_analysis._legacy(text)
+        stats['sentence_length_histogram'] = dict(sorted(Counter(stats.pop('sentence_lengths')).items()))
+        assert {key: result['text'][key] for key in stats} == stats, text
+        assert entity_lists(text, result['entities']) == entities, text
+
+def test_entity_offsets_match_finditer():
+    for text in random_texts(2):
+        entities = analyze(text)['entities']
+        for code, pattern in enumerate(ENTITY_PATTERNS.values()):
+            rows = entities['type'] == code
+            spans = list(zip(entities['start'][rows].tolist(), entities['end'][rows].tolist()))
+            assert spans == [match.span() for match in pattern.finditer(text)], text
+
+@pytest.mark.parametrize('chunk_chars', [1, 3, 7, 20])
+def test_merged_chunks_match_single_pass(chunk_chars):
+    for text in random_texts(3):
+        expected = analyze(text)
+        assert ''.join(iter_chunks(text, chunk_chars)) == text
+        total = TextStats()
+        for chunk in iter_chunks(text, chunk_chars):
+            total.merge(TextStats.from_text(chunk))
+        assert_same(total.result(), expected)
+        assert_same(analyze_parallel(text, workers=1, chunk_chars=chunk_chars), expected)
+
+def test_incremental_matches_single_pass():
+    rng = random.Random(4)
+    for text in random_texts(4):
+        analyzer = IncrementalAnalyzer()
+        position = 0
+        while position < len(text):
+            end = min(position + rng.randint(1, 10), len(text))
+            analyzer.feed(text[position:end])
+            position = end
+            assert analyzer.snapshot()['char_count'] == position
+        assert_same(analyzer.result(), analyze(text))
+
+def test_approximate_counts_keep_totals_and_top_words():
+    text = text_analysis._sample_text(0.2)
+    exact = analyze(text)['text']
+    approximate = analyze_parallel(text, workers=1, chunk_chars=20_000, approximate=True)['text']
+    assert approximate['approximate']
+    for key in ('char_count', 'word_count', 'sentence_count', 'paragraph_count', 'avg_sentence_length'):
+        assert approximate[key] == exact[key]
+    # Count-min estimates never undercount, and the vocabulary here is small enough to be exact
+    top = Counter(exact['filtered_words']).most_common(10)
+    assert [(word, approximate['filtered_words'][word]) for word, _ in top] == top
+    assert approximate['unique_words'] == pytest.approx(exact['unique_words'], rel=0.05)
+
+def test_incremental_goes_approximate_from_text_fed(monkeypatch):
+    monkeypatch.setattr(text_analysis, 'APPROXIMATE_MIN_CHARS', 5_000)
+    text = text_analysis._sample_text(0.02)
+    analyzer = IncrementalAnalyzer()
+    analyzer.feed(text[:1_000])
+    assert not analyzer.state.approximate
+    analyzer.feed(text[1_000:])
+    result = analyzer.result()['text']
+    assert result['approximate']
+    assert result['word_count'] == analyze(text)['text']['word_count']
+
+    small = IncrementalAnalyzer()
+    small.feed(text[:1_000])
+    assert not small.result()['text']['approximate']
+
+def test_snapshot_counts_everything_but_the_open_token():
+    analyzer = IncrementalAnalyzer()
+    analyzer.feed("One two. Three fo")
+    snapshot = analyzer.snapshot()
+    assert snapshot['char_count'] == len("One two. Three fo")
+    assert (snapshot['word_count'], snapshot['sentence_count']) == (3, 1)
+    analyzer.feed("ur five.")
+    assert analyzer.result()['text']['word_count'] == 5
+
+def test_feeding_can_continue_after_result():
+    pages = [f"--- PAGE {n} ---\nPage {n} mentions a{n}@b.co on 1/{n}/2024.\n--- END PAGE {n} ---\n\n" for n in range(1, 6)]
+    analyzer = IncrementalAnalyzer()
+    for n, page in enumerate(pages, 1):
+        analyzer.feed(page)
+        analyzer.feed('')
+        assert_same(analyzer.result(), analyze(''.join(pages[:n])))
+    assert analyzer.snapshot()['entities']['emails'] == 5
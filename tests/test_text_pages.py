@@ -0,0 +1,54 @@
+import pytest
+
+from text_pages import get_text_windows, page_spans, page_window, text_windows, window_at, window_label
+
+PAGED = ''.join(f"--- PAGE {n} ---\n{'word ' * 30 * n}\n--- END PAGE {n} ---\n\n" for n in range(1, 4))
+SLIDES = "--- SLIDE 1 ---\nTitle\n--- END SLIDE 1 ---\n\n--- SLIDE 2 ---\nBody\n--- END SLIDE 2 ---\n\n"
+
+def assert_covers(windows, text):
+    assert windows[0]['start'] == 0 and windows[-1]['end'] == len(text)
+    assert all(a['end'] == b['start'] for a, b in zip(windows, windows[1:]))
+    assert ''.join(text[w['start']:w['end']] for w in windows) == text
+
+def test_spans_follow_markers():
+    spans = page_spans(SLIDES)
+    assert [page for page, _, _ in spans] == [1, 2]
+    assert spans[0][1] == 0 and spans[-1][2] == len(SLIDES)
+    assert SLIDES[spans[1][1]:].startswith("--- SLIDE 2 ---")
+    assert page_spans("no markers") == [(0, 0, 10)]
+
+def test_recorded_offsets_win_over_markers():
+    assert page_spans(SLIDES, [(7, 0, len(SLIDES))]) == [(7, 0, len(SLIDES))]
+
+@pytest.mark.parametrize('window_chars', [50, 200, 10_000])
+def test_windows_cover_the_whole_text(window_chars):
+    windows = text_windows(PAGED, window_chars=window_chars)
+    assert_covers(windows, PAGED)
+    assert all(w['end'] - w['start'] <= window_chars for w in windows)
+    assert sorted({w['page'] for w in windows}) == [1, 2, 3]
+
+def test_long_pages_are_cut_after_whitespace():
+    windows = text_windows(PAGED, window_chars=50)
+    for window in windows:
+        if window['part'] < window['parts']:
+            assert PAGED[window['end'] - 1].isspace()
+    assert window_label(windows, page_window(windows, 3)) == f"Page 3 (part 1 of {windows[-1]['parts']})"
+
+def test_unbroken_text_is_still_split():
+    text = 'x' * 125
+    windows = text_windows(text, window_chars=50)
+    assert [w['end'] - w['start'] for w in windows] == [50, 50, 25]
+    assert window_label(windows, 1) == "Part 2 of 3"
+
+def test_offsets_and_pages_map_to_windows():
+    windows = text_windows(PAGED, window_chars=200)
+    for offset in (0, 199, 200, len(PAGED) // 2, len(PAGED) - 1):
+        window = windows[window_at(windows, offset)]
+        assert window['start'] <= offset < window['end']
+    assert windows[page_window(windows, 2)]['page'] == 2
+    assert page_window(windows, 9) is None
+
+def test_windows_are_computed_once_per_document():
+    doc = {'full_text': PAGED}
+    assert get_text_windows(doc) is get_text_windows(doc)
+    assert_covers(get_text_windows({'full_text': ''}), '')
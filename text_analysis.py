@@ -0,0 +1,599 @@
+"""
+Text statistics and entities from one tokenization pass, cached per document
+
+The text is split on whitespace once. Words, sentence boundaries and entities never
+span whitespace, so each distinct token is examined a single time with the compiled
+patterns and the results are scattered back over the token stream with NumPy.
+
+Very large texts are cut at whitespace into chunks that are analyzed in a process
+pool and merged in order; past a second threshold word frequencies are kept in a
+count-min sketch with a heavy-hitters list so memory no longer grows with the
+vocabulary. The same mergeable state backs IncrementalAnalyzer, which is fed page
+by page during parsing so ingest shows live counts and never re-reads full_text.
+
+Run as a script to compare with the multi-regex approach on a synthetic text:
+
+    python text_analysis.py --mb 50
+    python text_analysis.py --mb 400 --workers 4
+"""
+import os
+import re
+import time
+import hashlib
+import logging
+import argparse
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+WORDS_PER_MINUTE = 200
+MAX_CACHED = 8
+
+# Texts at least this long are analyzed in chunks across processes
+PARALLEL_MIN_CHARS = 32_000_000
+# ... and at least this long with sketched word frequencies
+APPROXIMATE_MIN_CHARS = 256_000_000
+CHUNK_CHARS = 8_000_000
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 8)
+# A paragraph break this close to a chunk's end is preferred as the cut
+BOUNDARY_WINDOW = 65_536
+SKETCH_WIDTH = 2 ** 18
+SKETCH_DEPTH = 4
+# Words kept exactly in approximate mode, and candidates tracked to find them
+TOP_WORDS = 500
+CANDIDATES = 4 * TOP_WORDS
+
+STOP_WORDS = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we', 'they', 'me', 'him', 'her', 'us', 'them'}
+
+WORD = re.compile(r'\w+')
+SENTENCE_END = re.compile(r'[.!?]+')
+DIGIT = re.compile(r'\d')
+WHITESPACE = re.compile(r'\s+')
+# The last token of a text, with the whitespace before it and the character ahead of that
+TRAILING_TOKEN = re.compile(r'\S\s+\S*\s*\Z')
+ENTITY_PATTERNS = {
+    'numbers': re.compile(r'\b\d+(?:\.\d+)?\b'),
+    'dates': re.compile(r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b|\b\d{4}[/-]\d{1,2}[/-]\d{1,2}\b'),
+    'emails': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
+    'urls': re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'),
+}
+
+ENTITY_KINDS = tuple(ENTITY_PATTERNS)
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def _entity_candidate(token):
+    """Cheap test for tokens that could hold any entity; most words fail it"""
+    return DIGIT.search(token) is not None or '@' in token or 'http' in token
+
+def _find_token(text, token, position):
+    """Offset of the next whole-token occurrence of token at or after position"""
+    while True:
+        start = text.find(token, position)
+        end = start + len(token)
+        if (start == 0 or text[start - 1].isspace()) and (end == len(text) or text[end].isspace()):
+            return start
+        position = start + 1
+
+def _entity_offsets(text, codes, uniques, entity_matches):
+    """(type, start, end) arrays of every entity, in document order
+
+    Only tokens holding an entity are located, walking forward through the text so
+    the whole search stays linear.
+    """
+    holders = np.zeros(len(uniques), dtype=bool)
+    holders[list(entity_matches)] = True
+    types, starts, ends = [], [], []
+    position = 0
+    for code in codes[holders[codes]]:
+        token = uniques[code]
+        offset = _find_token(text, token, position)
+        for kind, start, end in entity_matches[code]:
+            types.append(kind)
+            starts.append(offset + start)
+            ends.append(offset + end)
+        position = offset + len(token)
+    return np.array(types, dtype=np.uint8), np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+def _sentence_lengths(codes, ends, first, last):
+    """Words per sentence, empty ones included, from per-token sentence-end counts
+
+    A token with k sentence-end runs closes k sentences: the text before its first
+    run belongs to the open sentence, each piece between runs is a one-word
+    sentence, and the text after its last run opens the next one. The first and
+    last entries are the sentences left open at either end of the text.
+    """
+    runs = ends[codes]
+    sentence = np.cumsum(runs) - runs
+    has_end = runs > 0
+    parts = [
+        sentence[~has_end],
+        sentence[has_end & first[codes]],
+        (sentence + runs)[has_end & last[codes]],
+    ]
+    inner = runs > 1
+    if inner.any():
+        repeats = runs[inner] - 1
+        offsets = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats) + 1
+        parts.append(np.repeat(sentence[inner], repeats) + offsets)
+    return np.bincount(np.concatenate(parts), minlength=int(runs.sum()) + 1)
+
+class CountMinSketch:
+    """Fixed-size word counts that never underestimate; sketches of chunks add up
+
+    Words are hashed with BLAKE2 rather than hash() so sketches built in other
+    processes line up.
+    """
+
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH):
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def _columns(self, words):
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(w.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
+             for w in words),
+            dtype=np.uint64, count=len(words))
+        depth, width = self.table.shape
+        rows = np.arange(depth, dtype=np.uint64)[:, None]
+        return ((hashes & 0xFFFFFFFF) + rows * (hashes >> np.uint64(32))) % np.uint64(width)
+
+    def add(self, words, counts):
+        columns = self._columns(words)
+        for row in range(self.table.shape[0]):
+            np.add.at(self.table[row], columns[row], counts)
+
+    def estimate(self, words):
+        if not words:
+            return np.zeros(0, dtype=np.int64)
+        columns = self._columns(words)
+        return self.table[np.arange(self.table.shape[0])[:, None], columns].min(axis=0)
+
+    def distinct(self):
+        """Linear-counting estimate of how many different words were added"""
+        width = self.table.shape[1]
+        empty = max(int((self.table[0] == 0).sum()), 1)
+        return int(round(-width * np.log(empty / width)))
+
+    def merge(self, other):
+        self.table += other.table
+        return self
+
+class TextStats:
+    """Mergeable statistics of a text span
+
+    Spans must be cut next to whitespace, never inside a token or between two
+    newlines; merging the states of consecutive spans gives the state of the
+    joined text.
+    Sentences and paragraphs left open at a span's edges are joined on merge.
+    """
+
+    def __init__(self, approximate=False):
+        self.approximate = approximate
+        self.char_count = 0
+        self.word_count = 0
+        self.word_chars = 0
+        self.word_freq = Counter()
+        self.sketch = CountMinSketch() if approximate else None
+        self.candidates = set()
+        # Words in the sentence open at the start, {length: complete sentences}, words after the last end
+        self.sentence_count = 0
+        self.head_words = 0
+        self.sentence_histogram = Counter()
+        self.tail_words = 0
+        # Non-blank pieces between '\n\n' breaks, and whether the edge pieces are blank
+        self.paragraph_breaks = 0
+        self.paragraph_count = 0
+        self.first_blank = True
+        self.last_blank = True
+        # (type, start, end) arrays per merged span, offsets relative to this state's text
+        self.entity_parts = []
+
+    @classmethod
+    def from_text(cls, text, approximate=False):
+        state = cls(approximate)
+        state.char_count = len(text)
+        tokens = np.array(text.split(), dtype=object)
+        codes, uniques = pd.factorize(tokens)
+        del tokens
+        counts = np.bincount(codes, minlength=len(uniques))
+
+        ends = np.zeros(len(uniques), dtype=np.int64)
+        first = np.zeros(len(uniques), dtype=bool)
+        last = np.zeros(len(uniques), dtype=bool)
+        word_freq = Counter()
+        entity_matches = {}
+        for index, token in enumerate(uniques):
+            count = int(counts[index])
+            for word in WORD.findall(token.lower()):
+                word_freq[word] += count
+            pieces = SENTENCE_END.split(token)
+            if len(pieces) > 1:
+                ends[index] = len(pieces) - 1
+                first[index] = pieces[0] != ''
+                last[index] = pieces[-1] != ''
+            if _entity_candidate(token):
+                found = [(kind, match.start(), match.end())
+                         for kind, pattern in enumerate(ENTITY_PATTERNS.values()) for match in pattern.finditer(token)]
+                if found:
+                    entity_matches[index] = found
+
+        lengths = _sentence_lengths(codes, ends, first, last)
+        state.sentence_count = len(lengths) - 1
+        state.head_words = int(lengths[0])
+        if state.sentence_count:
+            sizes, counts = np.unique(lengths[1:-1], return_counts=True)
+            state.sentence_histogram = Counter({int(n): int(c) for n, c in zip(sizes, counts) if n > 0})
+            state.tail_words = int(lengths[-1])
+
+        paragraphs = [bool(p.strip()) for p in text.split('\n\n')]
+        state.paragraph_breaks = len(paragraphs) - 1
+        state.paragraph_count = sum(paragraphs)
+        state.first_blank = not paragraphs[0]
+        state.last_blank = not paragraphs[-1]
+
+        if entity_matches:
+            state.entity_parts.append(_entity_offsets(text, codes, uniques, entity_matches))
+
+        state.word_count = len(codes)
+        state.word_chars = sum(len(word) * count for word, count in word_freq.items())
+        if approximate:
+            words = list(word_freq)
+            state.sketch.add(words, np.fromiter(word_freq.values(), dtype=np.int64, count=len(words)))
+            state.candidates = _top_candidates(word_freq)
+        else:
+            state.word_freq = word_freq
+        return state
+
+    def merge(self, other):
+        """Append the state of the text that follows this one"""
+        self.char_count += other.char_count
+        self.word_count += other.word_count
+        self.word_chars += other.word_chars
+        if self.approximate:
+            self.sketch.merge(other.sketch)
+            self.candidates |= other.candidates
+            if len(self.candidates) > 2 * CANDIDATES:
+                words = list(self.candidates)
+                self.candidates = _top_candidates(dict(zip(words, self.sketch.estimate(words).tolist())))
+        else:
+            self.word_freq.update(other.word_freq)
+
+        if not self.sentence_count:
+            self.head_words += other.head_words
+            self.tail_words = other.tail_words
+        elif not other.sentence_count:
+            self.tail_words += other.head_words
+        else:
+            joined = self.tail_words + other.head_words
+            if joined:
+                self.sentence_histogram[joined] += 1
+            self.tail_words = other.tail_words
+        self.sentence_histogram.update(other.sentence_histogram)
+        self.sentence_count += other.sentence_count
+
+        self.paragraph_count += other.paragraph_count - (not self.last_blank and not other.first_blank)
+        if not self.paragraph_breaks:
+            self.first_blank = self.first_blank and other.first_blank
+        self.last_blank = other.last_blank if other.paragraph_breaks else self.last_blank and other.last_blank
+        self.paragraph_breaks += other.paragraph_breaks
+
+        offset = self.char_count - other.char_count
+        self.entity_parts.extend((types, starts + offset, ends + offset) for types, starts, ends in other.entity_parts)
+        return self
+
+    def to_approximate(self):
+        """Move exact word counts into a sketch, as if the state had been approximate all along"""
+        if not self.approximate:
+            words = list(self.word_freq)
+            self.sketch = CountMinSketch()
+            self.sketch.add(words, np.fromiter(self.word_freq.values(), dtype=np.int64, count=len(words)))
+            self.candidates = _top_candidates(self.word_freq)
+            self.word_freq = Counter()
+            self.approximate = True
+        return self
+
+    def entity_counts(self):
+        """Entities found so far per type"""
+        counts = np.zeros(len(ENTITY_KINDS), dtype=np.int64)
+        for types, _, _ in self.entity_parts:
+            counts += np.bincount(types, minlength=len(ENTITY_KINDS))
+        return dict(zip(ENTITY_KINDS, counts.tolist()))
+
+    def result(self):
+        """{'text': statistics, 'entities': {'type', 'start', 'end'} arrays in document order}
+
+        Entity types index ENTITY_KINDS; start and end are offsets into the text.
+        """
+        histogram = Counter(self.sentence_histogram)
+        for words in (self.head_words, self.tail_words if self.sentence_count else 0):
+            if words:
+                histogram[words] += 1
+        sentences = sum(histogram.values())
+        if self.approximate:
+            words = list(self.candidates)
+            word_freq = Counter(dict(zip(words, self.sketch.estimate(words).tolist())))
+            filtered = Counter({w: c for w, c in word_freq.items() if w not in STOP_WORDS and len(w) > 2})
+            word_freq = Counter(dict(word_freq.most_common(TOP_WORDS)))
+            filtered_words = dict(filtered.most_common(TOP_WORDS))
+            unique_words = self.sketch.distinct()
+        else:
+            word_freq = self.word_freq
+            filtered_words = {w: c for w, c in word_freq.items() if w not in STOP_WORDS and len(w) > 2}
+            unique_words = len(word_freq)
+        stats = {
+            'char_count': self.char_count,
+            'word_count': self.word_count,
+            'sentence_count': self.sentence_count,
+            'paragraph_count': self.paragraph_count,
+            'word_freq': word_freq,
+            'filtered_words': filtered_words,
+            'unique_words': unique_words,
+            'avg_word_length': self.word_chars / self.word_count if self.word_count else 0,
+            'sentence_length_histogram': dict(sorted(histogram.items())),
+            'avg_sentence_length': sum(n * c for n, c in histogram.items()) / sentences if sentences else 0,
+            'reading_time_minutes': self.word_count / WORDS_PER_MINUTE,
+            'approximate': self.approximate,
+        }
+        parts = self.entity_parts or [(np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))]
+        entities = {name: np.concatenate([part[i] for part in parts]) for i, name in enumerate(('type', 'start', 'end'))}
+        return {'text': stats, 'entities': entities}
+
+def entity_lists(text, entities):
+    """{kind: matched strings in document order} from entity offsets into text"""
+    lists = {kind: [] for kind in ENTITY_KINDS}
+    for kind, start, end in zip(entities['type'].tolist(), entities['start'].tolist(), entities['end'].tolist()):
+        lists[ENTITY_KINDS[kind]].append(text[start:end])
+    return lists
+
+def _top_candidates(counts):
+    """Most frequent words overall and among non-stop words, kept as heavy-hitter candidates"""
+    counts = Counter(counts)
+    filtered = Counter({w: c for w, c in counts.items() if w not in STOP_WORDS and len(w) > 2})
+    return {w for w, _ in counts.most_common(CANDIDATES)} | {w for w, _ in filtered.most_common(CANDIDATES)}
+
+def analyze(text):
+    """Counts, word frequencies, sentence lengths and entities of a text
+
+    Returns {'text': statistics, 'entities': entity offset arrays}; the values match
+    what separate regex passes over the whole text would give.
+    """
+    start = time.perf_counter()
+    result = TextStats.from_text(text).result()
+    logger.info(f"Analyzed {len(text):,} characters ({result['text']['word_count']:,} tokens, "
+                f"{result['text']['unique_words']:,} distinct words) in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return result
+
+def iter_chunks(text, chunk_chars=CHUNK_CHARS):
+    """Consecutive slices of about chunk_chars, cut after a whitespace run
+
+    A paragraph break near the target is preferred so most chunks hold whole
+    paragraphs; every chunk after the first starts on a non-space character.
+    """
+    start = 0
+    while start < len(text):
+        end = start + chunk_chars
+        if end >= len(text):
+            yield text[start:]
+            return
+        paragraph = text.rfind('\n\n', max(start, end - BOUNDARY_WINDOW), end)
+        if paragraph > start:
+            end = paragraph
+        space = WHITESPACE.search(text, end)
+        if space is None:
+            yield text[start:]
+            return
+        yield text[start:space.end()]
+        start = space.end()
+
+def _map_chunks(text, workers, chunk_chars, approximate):
+    """States of the chunks in order, with at most two chunks per worker in flight"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in iter_chunks(text, chunk_chars):
+            pending.append(pool.submit(TextStats.from_text, chunk, approximate))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _chunked_state(text, workers, chunk_chars, approximate):
+    """Merged TextStats of a text's chunks, counted in a process pool when there are several"""
+    total = TextStats(approximate)
+    if workers == 1 or len(text) <= chunk_chars:
+        states = (TextStats.from_text(chunk, approximate) for chunk in iter_chunks(text, chunk_chars))
+    else:
+        states = _map_chunks(text, workers, chunk_chars, approximate)
+    for state in states:
+        total.merge(state)
+    return total
+
+def analyze_parallel(text, workers=None, chunk_chars=CHUNK_CHARS, approximate=False):
+    """analyze() over whitespace-cut chunks counted in a process pool
+
+    Exact mode gives the same result as analyze(). Approximate mode keeps word
+    frequencies in a count-min sketch: word_freq and filtered_words then hold
+    estimated counts of the top TOP_WORDS words and unique_words is an estimate.
+    """
+    start = time.perf_counter()
+    workers = workers or DEFAULT_WORKERS
+    result = _chunked_state(text, workers, chunk_chars, approximate).result()
+    logger.info(f"Analyzed {len(text):,} characters in chunks of {chunk_chars:,} with {workers} workers "
+                f"({'approximate' if approximate else 'exact'}) in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return result
+
+def _cut(text):
+    """Where text can be split safely: just after the last token but one, so the
+    held-back rest starts with whitespace and the last token may still grow"""
+    window = 4096
+    while True:
+        start = max(len(text) - window, 0)
+        match = TRAILING_TOKEN.search(text, start)
+        if match is not None:
+            return match.start() + 1
+        if start == 0:
+            return 0
+        window *= 4
+
+class IncrementalAnalyzer:
+    """Text statistics fed piece by piece while a document is parsed
+
+    Pieces are taken to be consecutive parts of the final text. Everything but
+    the trailing token is analyzed as it arrives, so snapshot() is cheap at any
+    time and result() never goes back over text that was already fed.
+    With approximate=None word counts go approximate once the text fed reaches
+    APPROXIMATE_MIN_CHARS, the same rule get_text_analysis applies to a whole text.
+    """
+
+    def __init__(self, approximate=None):
+        self.auto = approximate is None
+        self.state = TextStats(bool(approximate))
+        self._pending = ''
+
+    @property
+    def char_count(self):
+        return self.state.char_count + len(self._pending)
+
+    def feed(self, text):
+        if not text:
+            return
+        buffer = self._pending + text
+        cut = _cut(buffer)
+        if cut:
+            ready = buffer[:cut]
+            if len(ready) >= PARALLEL_MIN_CHARS:
+                state = _chunked_state(ready, DEFAULT_WORKERS, CHUNK_CHARS, self.state.approximate)
+            else:
+                state = TextStats.from_text(ready, self.state.approximate)
+            self.state.merge(state)
+            if self.auto and self.state.char_count >= APPROXIMATE_MIN_CHARS:
+                self.state.to_approximate()
+        self._pending = buffer[cut:]
+
+    def snapshot(self):
+        """Headline counts of the text fed so far, minus its last token"""
+        state = self.state
+        return {
+            'char_count': self.char_count,
+            'word_count': state.word_count,
+            'sentence_count': state.sentence_count,
+            'paragraph_count': state.paragraph_count,
+            'unique_words': state.sketch.distinct() if state.approximate else len(state.word_freq),
+            'entities': state.entity_counts(),
+        }
+
+    def result(self):
+        """The full analysis of everything fed so far, in the form analyze() returns"""
+        total = TextStats(self.state.approximate).merge(self.state)
+        if self._pending:
+            total.merge(TextStats.from_text(self._pending, self.state.approximate))
+        if self.auto and total.char_count >= APPROXIMATE_MIN_CHARS:
+            total.to_approximate()
+        return total.result()
+
+def get_text_analysis(text, key=None):
+    """Analysis of a text, reused for the same key (the document hash)"""
+    if key is not None:
+        with _lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+
+    if len(text) >= PARALLEL_MIN_CHARS:
+        result = analyze_parallel(text, approximate=len(text) >= APPROXIMATE_MIN_CHARS)
+    else:
+        result = analyze(text)
+    if key is not None:
+        with _lock:
+            _cache[key] = result
+            while len(_cache) > MAX_CACHED:
+                _cache.popitem(last=False)
+    return result
+
+def _legacy(text):
+    """The previous implementation: one regex pass per statistic and entity type"""
+    words = re.findall(r'\b\w+\b', text.lower())
+    word_freq = Counter(words)
+    sentence_lengths = [len(s.split()) for s in re.split(r'[.!?]+', text) if s.strip()]
+    return {
+        'word_count': len(text.split()),
+        'sentence_count': len(re.findall(r'[.!?]+', text)),
+        'paragraph_count': len([p for p in text.split('\n\n') if p.strip()]),
+        'word_freq': word_freq,
+        'sentence_lengths': sentence_lengths,
+    }, {kind: pattern.findall(text) for kind, pattern in ENTITY_PATTERNS.items()}
+
+def _sample_text(megabytes):
+    rng = np.random.default_rng(0)
+    vocabulary = np.array("the quarterly revenue report shows growth across every region while costs in the "
+                          "north fell and customer service scores improved for the product team".split())
+    sentences = []
+    size = 0
+    while size < megabytes * 1_000_000:
+        sentence = ' '.join(rng.choice(vocabulary, rng.integers(5, 25)))
+        roll = rng.random()
+        if roll < 0.1:
+            sentence += f" {rng.integers(1, 99999)}.{rng.integers(0, 99)}"
+        if roll < 0.02:
+            sentence += f" on {rng.integers(1, 28)}/{rng.integers(1, 12)}/2024"
+        if roll < 0.005:
+            sentence += " contact analyst@example.com or see https://example.com/report?id=7"
+        sentence = sentence.capitalize() + rng.choice(['.', '.', '!', '?']) + ('\n\n' if rng.random() < 0.1 else ' ')
+        sentences.append(sentence)
+        size += len(sentence)
+    return ''.join(sentences)
+
+def _measure(label, run, baseline=None):
+    """Time one run, then repeat it under tracemalloc for its peak allocation"""
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    line = f"{label:<22} {elapsed:6.2f}s  peak {peak / 1e6:7.0f} MB (this process)"
+    if baseline is not None:
+        line += f"  {baseline / elapsed:.1f}x"
+    print(line)
+    return result, elapsed
+
+def _benchmark(megabytes, workers, chunk_chars, legacy):
+    text = _sample_text(megabytes)
+    print(f"{len(text) / 1e6:.0f} MB of text")
+
+    if legacy:
+        (legacy_stats, legacy_entities), _ = _measure("multi-regex", lambda: _legacy(text))
+    single, single_time = _measure("single pass", lambda: analyze(text))
+    exact, _ = _measure(f"{workers} workers exact", lambda: analyze_parallel(text, workers, chunk_chars), single_time)
+    approx, _ = _measure(f"{workers} workers sketch", lambda: analyze_parallel(text, workers, chunk_chars, True), single_time)
+
+    same = exact['text'] == single['text'] and all(
+        np.array_equal(exact['entities'][name], single['entities'][name]) for name in single['entities'])
+    print(f"chunked exact results {'identical' if same else 'DIFFER'} to single pass")
+    if legacy:
+        legacy_stats['sentence_length_histogram'] = dict(sorted(Counter(legacy_stats.pop('sentence_lengths')).items()))
+        same = (all(single['text'][k] == v for k, v in legacy_stats.items())
+                and entity_lists(text, single['entities']) == legacy_entities)
+        print(f"single pass results {'identical' if same else 'DIFFER'} to multi-regex")
+
+    top = [w for w, _ in single['text']['word_freq'].most_common(20)]
+    errors = [approx['text']['word_freq'].get(w, 0) / single['text']['word_freq'][w] - 1 for w in top]
+    found = len(set(top) & set(w for w, _ in approx['text']['word_freq'].most_common(20)))
+    print(f"sketch: top-20 words recovered {found}/20, worst count error {max(errors) * 100:+.3f}%, "
+          f"distinct words {approx['text']['unique_words']:,} (exact {single['text']['unique_words']:,})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark single-pass and chunked text analysis")
+    parser.add_argument("--mb", type=float, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_CHARS / 1e6)
+    parser.add_argument("--no-legacy", action="store_true", help="skip the slow multi-regex baseline")
+    args = parser.parse_args()
+    _benchmark(args.mb, args.workers, int(args.chunk_mb * 1e6), not args.no_legacy)
@@ -0,0 +1,77 @@
+"""
+Page-sized windows over full_text for the paginated text viewer
+
+Windows follow the page spans the PDF parser records, or the --- PAGE n --- and
+--- SLIDE n --- markers in the text, and long pages are split at whitespace, so
+the viewer only ever sends one window of text to the browser.
+"""
+import bisect
+import logging
+
+from retrieval import PAGE_MARKER
+
+logger = logging.getLogger(__name__)
+
+WINDOW_CHARS = 20_000
+
+def page_spans(text, page_offsets=None):
+    """(page, start, end) of every page; page 0 when the text has no pages"""
+    if page_offsets:
+        return [tuple(span) for span in page_offsets]
+    markers = list(PAGE_MARKER.finditer(text))
+    if not markers:
+        return [(0, 0, len(text))]
+    bounds = [0] + [marker.start() for marker in markers[1:]] + [len(text)]
+    return [(int(marker.group(1)), start, end) for marker, start, end in zip(markers, bounds[:-1], bounds[1:])]
+
+def _split(text, start, end, window_chars):
+    """(start, end) pieces of a span, at most window_chars long, cut after whitespace"""
+    pieces = []
+    while end - start > window_chars:
+        limit = start + window_chars
+        cut = max(text.rfind(' ', start, limit), text.rfind('\n', start, limit)) + 1
+        if cut <= start:
+            cut = limit
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+def text_windows(text, page_offsets=None, window_chars=WINDOW_CHARS):
+    """Windows covering the text in order, as {'page', 'part', 'parts', 'start', 'end'}"""
+    windows = []
+    for page, start, end in page_spans(text, page_offsets):
+        pieces = _split(text, start, end, window_chars)
+        for part, (piece_start, piece_end) in enumerate(pieces, 1):
+            windows.append({'page': page, 'part': part, 'parts': len(pieces), 'start': piece_start, 'end': piece_end})
+    return windows
+
+def window_at(windows, offset):
+    """Index of the window holding a character offset"""
+    starts = [window['start'] for window in windows]
+    return max(bisect.bisect_right(starts, offset) - 1, 0)
+
+def page_window(windows, page):
+    """Index of the first window of a page, or None when the page is not in the text"""
+    for index, window in enumerate(windows):
+        if window['page'] == page:
+            return index
+    return None
+
+def window_label(windows, index):
+    """'Page 3', 'Page 3 (part 2 of 4)' or, for unpaged text, 'Part 2 of 9'"""
+    window = windows[index]
+    if not window['page']:
+        return f"Part {index + 1} of {len(windows)}"
+    label = f"Page {window['page']}"
+    if window['parts'] > 1:
+        label += f" (part {window['part']} of {window['parts']})"
+    return label
+
+def get_text_windows(doc_data):
+    """Windows over the document's full text, computed once per document"""
+    if doc_data.get('text_windows') is None:
+        text = doc_data.get('full_text', '') or ''
+        doc_data['text_windows'] = text_windows(text, doc_data.get('page_offsets'))
+        logger.info(f"Split {len(text):,} characters into {len(doc_data['text_windows']):,} viewer windows")
+    return doc_data['text_windows']
@@ -3,29 +3,17 @@ import pandas as pd
 import os
 import shutil
 import time
-import io
-import json
+import hashlib
 import logging
-from datetime import datetime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-try:
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    reportlab_available = True
-except ImportError:
-    logger.warning("reportlab not available. PDF export will be disabled.")
-    reportlab_available = False
+from table_export import TableExports, DEFAULT_PARQUET_COMPRESSION
 
-try:
-    import openpyxl
-except ImportError:
-    logger.warning("openpyxl not available. Excel export will be disabled.")
-    openpyxl = None
+# Seconds between live text statistics updates while a document is parsed
+LIVE_STATS_INTERVAL = 0.25
 
 def init_theme_mode():
     """Initialize theme mode safely"""
@@ -1031,10 +1019,32 @@ def clear_temp_folder():
 def process_document_with_progress(file_bytes, filename):
     """Process document with progress indicator"""
     from parser import parse_document
+    from profiler import build_profile
+    from text_analysis import IncrementalAnalyzer
     import llm_handler
     
     progress_bar = st.progress(0)
     status_text = st.empty()
+    live_stats = st.empty()
+    # Text statistics are gathered page by page as the parser extracts them, going
+    # approximate once the text itself (not the file) passes the size threshold
+    analyzer = IncrementalAnalyzer()
+    last_update = [0.0]
+    
+    def on_text(text, part, parts):
+        analyzer.feed(text)
+        now = time.perf_counter()
+        if part == parts or now - last_update[0] >= LIVE_STATS_INTERVAL:
+            last_update[0] = now
+            progress_bar.progress(20 + int(30 * part / parts))
+            counts = analyzer.snapshot()
+            entities = sum(counts['entities'].values())
+            page = f"Page {part:,}/{parts:,} · " if parts > 1 else ""
+            live_stats.caption(
+                f"📄 {page}{counts['word_count']:,} words · "
+                f"{counts['sentence_count']:,} sentences · {counts['paragraph_count']:,} paragraphs · "
+                f"{counts['unique_words']:,} distinct words · {entities:,} entities"
+            )
     
     try:
         status_text.text("🏗️ Initializing ArixStructure...")
@@ -1042,13 +1052,23 @@ def process_document_with_progress(file_bytes, filename):
         progress_bar.progress(20)
         
         status_text.text(f"📄 Parsing unstructured data from {filename}...")
-        doc_data = parse_document(file_bytes, filename)
+        doc_data = parse_document(file_bytes, filename, on_text=on_text)
         progress_bar.progress(50)
         
         if doc_data is None:
             st.error(f"❌ Could not structure {filename}. Unsupported format or corrupted file.")
             return None
         
+        # Stable identity for per-document caches (search indexes, embeddings)
+        doc_data["doc_hash"] = hashlib.sha256(file_bytes).hexdigest()[:16]
+        doc_data["filename"] = filename
+        
+        status_text.text("🧮 Profiling tables and text...")
+        # Only trust the streamed statistics when they covered exactly the final text
+        fed_all = analyzer.char_count == len(doc_data.get("full_text") or "")
+        doc_data["profile"] = build_profile(doc_data, analyzer.result() if fed_all else None)
+        progress_bar.progress(60)
+        
         if doc_data.get("image_files"):
             status_text.text("🖼️ Structuring image data with AI...")
             doc_data["image_descriptions"] = llm_handler.get_image_descriptions(doc_data["image_files"])
@@ -1065,12 +1085,14 @@ def process_document_with_progress(file_bytes, filename):
         time.sleep(0.3)
         progress_bar.empty()
         status_text.empty()
+        live_stats.empty()
         
         return doc_data
         
     except (ImportError, AttributeError, IOError) as e:
         progress_bar.empty()
         status_text.empty()
+        live_stats.empty()
         logger.error(f"Error structuring document: {e}")
         st.error(f"❌ Error structuring document: {e}")
         return None
@@ -1100,126 +1122,6 @@ def safe_file_operation(file_path, operation):
         st.error(f"File operation failed: {str(e)}")
         return None
 
-def save_plot_as_image(fig, filename, format="png"):
-    """Save plotly figure as image with optimized settings"""
-    try:
-        # Sanitize filename to prevent path traversal
-        import re
-        safe_filename = re.sub(r'[^a-zA-Z0-9_-]', '_', str(filename))
-        safe_format = re.sub(r'[^a-zA-Z0-9]', '', str(format).lower())
-        
-        temp_dir = "temp_plots"
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
-        
-        # Validate temp directory is safe
-        temp_dir_abs = os.path.abspath(temp_dir)
-        current_dir = os.path.abspath(os.getcwd())
-        if not temp_dir_abs.startswith(current_dir):
-            raise ValueError("Invalid temp directory")
-        
-        # Optimize image settings based on format
-        if safe_format in ['png', 'jpg', 'jpeg']:
-            width, height, scale = 1400, 900, 2
-        elif safe_format == 'svg':
-            width, height, scale = 1200, 800, 1
-        else:
-            width, height, scale = 1200, 800, 2
-        
-        # Try kaleido first, fallback to HTML if not available
-        try:
-            img_bytes = fig.to_image(
-                format=safe_format, 
-                width=width, 
-                height=height, 
-                scale=scale,
-                engine="kaleido"
-            )
-        except Exception as e:
-            logger.warning(f"Kaleido not available: {e}")
-            # Fallback: save as HTML if kaleido not available
-            if safe_format == 'html' or safe_format not in ['png', 'jpg', 'jpeg', 'svg']:
-                filepath = os.path.join(temp_dir, f"{safe_filename}.html")
-                fig.write_html(filepath)
-                with open(filepath, "rb") as f:
-                    img_bytes = f.read()
-                return img_bytes, filepath
-            else:
-                st.warning("⚠️ Kaleido not available. Install with: pip install kaleido")
-                # Save as HTML instead
-                filepath = os.path.join(temp_dir, f"{safe_filename}.html")
-                fig.write_html(filepath)
-                with open(filepath, "rb") as f:
-                    img_bytes = f.read()
-                return img_bytes, filepath
-        
-        filepath = os.path.join(temp_dir, f"{safe_filename}.{safe_format}")
-        with open(filepath, "wb") as f:
-            f.write(img_bytes)
-        
-        return img_bytes, filepath
-    except Exception as e:
-        logger.error(f"Error saving plot: {e}")
-        st.error(f"❌ Error saving plot: {str(e)[:100]}")
-        return None, None
-
-def create_comprehensive_export(table, table_name="table"):
-    """Create multiple export formats for a table"""
-    df = pd.DataFrame(table)
-    exports = {}
-    
-    # CSV
-    csv_buffer = io.StringIO()
-    df.to_csv(csv_buffer, index=False)
-    exports['csv'] = csv_buffer.getvalue().encode('utf-8')
-    
-    # JSON
-    json_data = {
-        "metadata": {
-            "table_name": table_name,
-            "rows": len(df),
-            "columns": list(df.columns),
-            "structured_at": datetime.now().replace(microsecond=0).isoformat() + "Z",
-            "source": "ArixStructure"
-        },
-        "data": df.to_dict('records')
-    }
-    exports['json'] = json.dumps(json_data, indent=2).encode('utf-8')
-    
-    # Excel
-    if openpyxl:
-        excel_buffer = io.BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=table_name, index=False)
-        excel_buffer.seek(0)
-        exports['excel'] = excel_buffer.getvalue()
-    
-    # Text
-    text_content = f"ArixStructure - Structured Data Export\nTable: {table_name}\n" + "="*50 + "\n\n"
-    text_content += df.to_string(index=False)
-    exports['txt'] = text_content.encode('utf-8')
-    
-    # PDF
-    if reportlab_available:
-        try:
-            pdf_buffer = io.BytesIO()
-            doc = SimpleDocTemplate(pdf_buffer, pagesize=letter)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            story.append(Paragraph("ArixStructure - Structured Data Export", styles['Title']))
-            story.append(Paragraph(f"Table: {table_name}", styles['Heading1']))
-            story.append(Spacer(1, 12))
-            
-            table_text = df.to_string(index=False)
-            story.append(Paragraph(table_text.replace('\n', '<br/>'), styles['Normal']))
-            
-            doc.build(story)
-            pdf_buffer.seek(0)
-            exports['pdf'] = pdf_buffer.getvalue()
-        except:
-            exports['pdf'] = None
-    else:
-        exports['pdf'] = None
-    
-    return exports
\ No newline at end of file
+def create_comprehensive_export(table, table_name="table", typed_df=None, compression=DEFAULT_PARQUET_COMPRESSION):
+    """Export formats for a table; each one is built only when it is first read"""
+    return TableExports(table, table_name, typed_df=typed_df, compression=compression)